@@ -0,0 +1,155 @@
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+from unittest.mock import patch
+
+from benchmarks.synthetic import generate_transactions, parse_size
+from src.memo import MemoCache
+from src.reports import search_category
+from src.services import filter_state
+from src.store import TransactionStore
+from src.topk import grouped_top
+from src.utils import read_files
+from src.views import card_info, create_operations, sum_amount_of_card, top_5_transactions
+
+BASELINE = Path(__file__).with_name("baseline.json")
+MARKET = {"currency_rates": {"USD": 90.0, "EUR": 100.0}, "stock_prices": {"AAPL": 150.0}}
+START_DATE, END_DATE = "01.01.2021", "31.12.2021"
+# Список словарей для 10M строк не помещается в память рабочей машины, '.xlsx' - больше 1 048 575 строк
+MAX_RECORDS_ROWS = 1_000_000
+MAX_XLSX_ROWS = 100_000
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """
+    возвращает лучшее время из repeat запусков и пиковую память отдельного запуска под tracemalloc.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(best, 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def cases(rows: int, seed: int, workdir: Path) -> dict[str, Callable[[], Any]]:
+    """
+    возвращает измеряемые вызовы для набора данных из rows строк.
+    """
+    frame = generate_transactions(rows, seed)
+    store = TransactionStore.from_frame(frame)
+    date = datetime(2021, 12, 10)
+    result: dict[str, Callable[[], Any]] = {}
+
+    if rows <= MAX_XLSX_ROWS:
+        path = workdir / f"operations_{rows}.xlsx"
+        frame.to_excel(path, index=False)
+        result["read_files"] = lambda: read_files(path, use_cache=False)
+        read_files(path)
+        result["read_files_cached"] = lambda: read_files(path)
+
+    inputs: dict[str, Any] = {"store": store}
+    if rows <= MAX_RECORDS_ROWS:
+        inputs["records"] = frame.to_dict(orient="records")
+    for kind, data in inputs.items():
+        cards = card_info(data)
+        result[f"card_info[{kind}]"] = lambda data=data: card_info(data)
+        result[f"sum_amount_of_card[{kind}]"] = lambda data=data: sum_amount_of_card(
+            data, "*7197", START_DATE, END_DATE
+        )
+        result[f"top_5_transactions[{kind}]"] = lambda data=data: top_5_transactions(data, START_DATE, END_DATE)
+        result[f"grouped_top[{kind}]"] = lambda data=data: grouped_top(
+            data, 5, start_date=START_DATE, end_date=END_DATE
+        )
+        result[f"filter_state[{kind}]"] = lambda data=data: filter_state(data, "магнит", output=None)
+        result[f"search_category[{kind}]"] = lambda data=data: search_category(data, "Супермаркеты", date)
+        result[f"create_operations[{kind}]"] = lambda data=data, cards=cards: create_operations(
+            "Добрый день!", cards, data, START_DATE, END_DATE, market=MARKET
+        )
+    return result
+
+
+def run_benchmarks(sizes: list[str], repeat: int = 3, seed: int = 0) -> dict[str, dict[str, dict[str, float]]]:
+    """
+    измеряет все функции на синтетических данных заданных размеров.
+    """
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    # Кэш результатов выключен: иначе лучшим из повторов оказывается попадание в кэш, а не вычисление
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        patch("src.views.fetch_market_data", return_value=MARKET),
+        patch("src.memo._default_cache", MemoCache(max_entries=0)),
+    ):
+        for size in sizes:
+            results[size] = {}
+            for name, func in cases(parse_size(size), seed, Path(tmp)).items():
+                results[size][name] = measure(func, repeat)
+                seconds, peak_mb = results[size][name]["seconds"], results[size][name]["peak_mb"]
+                print(f"{size:>5} {name:<32} {seconds:>10.4f} с {peak_mb:>10.2f} МБ")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    возвращает список регрессий: время или пиковая память больше базовых в tolerance раз.
+    """
+    regressions = []
+    for size, functions in results.items():
+        for name, current in functions.items():
+            expected: Optional[dict] = baseline.get(size, {}).get(name)
+            if expected is None:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                if metric not in expected or metric not in current:
+                    continue
+                # Очень короткие замеры сравниваются с запасом, чтобы не ловить шум таймера
+                limit = max(expected[metric] * tolerance, expected[metric] + (0.001 if metric == "seconds" else 0.1))
+                if current[metric] > limit:
+                    regressions.append(f"{size} {name}: {metric} {current[metric]} > {expected[metric]} x {tolerance}")
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    python -m benchmarks.run [--sizes 10k,100k] [--update-baseline] [--tolerance 2.0]
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарки views, services и reports на синтетических данных")
+    parser.add_argument("--sizes", default="10k", help="размеры через запятую: 10k, 100k, 1M, 10M")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes.split(","), args.repeat, args.seed)
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    if args.update_baseline:
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=4, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Базовые значения сохранены в {baseline_path}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("РЕГРЕССИЯ ПРОИЗВОДИТЕЛЬНОСТИ:", *regressions, sep="\n  ")
+        return 1
+    print("Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
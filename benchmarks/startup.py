@@ -0,0 +1,93 @@
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.run import BASELINE, compare
+
+ROOT = Path(__file__).resolve().parent.parent
+# Модули точек входа, время импорта которых измеряется
+ENTRY_POINTS = ("src.main", "src.services", "src.batch", "src.server")
+# Зависимости, которые не должны выполняться при импорте - только при первом использовании
+HEAVY_MODULES = ("pandas", "numpy", "yfinance", "requests", "openpyxl", "dotenv")
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """
+    импортирует module в отдельном процессе с '-X importtime' и возвращает
+    накопленное время импорта (мкс) каждого загруженного модуля.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def eager_heavy_modules(profile: dict[str, int]) -> list[str]:
+    """
+    возвращает тяжёлые зависимости, которые были выполнены при импорте.
+    """
+    return sorted({name.split(".")[0] for name in profile if name.split(".")[0] in HEAVY_MODULES})
+
+
+def measure_startup(modules: tuple[str, ...] = ENTRY_POINTS, repeat: int = 5) -> dict[str, dict[str, float]]:
+    """
+    возвращает лучшее из repeat время холодного импорта каждой точки входа в секундах.
+    """
+    results = {}
+    for module in modules:
+        best = min(import_profile(module)[module] for _ in range(repeat))
+        results[f"import {module}"] = {"seconds": round(best / 1e6, 6)}
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    python -m benchmarks.startup [--update-baseline] [--tolerance 2.0]
+    """
+    parser = argparse.ArgumentParser(description="Время холодного импорта точек входа")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = {"startup": measure_startup(repeat=args.repeat)}
+    failed = False
+    for module in ENTRY_POINTS:
+        eager = eager_heavy_modules(import_profile(module))
+        seconds = results["startup"][f"import {module}"]["seconds"]
+        print(f"{module:<14} {seconds:>8.4f} с  загружены при импорте: {', '.join(eager) or '-'}")
+        failed = failed or bool(eager)
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    if args.update_baseline:
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=4, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Базовые значения сохранены в {baseline_path}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions or failed:
+        print("РЕГРЕССИЯ ВРЕМЕНИ ЗАПУСКА:", *regressions, sep="\n  ")
+        return 1
+    print("Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# Категории и описания с частотами, близкими к data/operations.xlsx
+CATEGORIES = {
+    "Супермаркеты": (0.34, 5411.0, ["Колхоз", "Магнит", "SPAR", "Дикси", "Перекрёсток"]),
+    "Фастфуд": (0.19, 5814.0, ["McDonald's", "Бургер Кинг", "Rumyanyj Khleb", "Kofe s sobojj"]),
+    "Транспорт": (0.06, 4131.0, ["Яндекс Такси", "Метро Санкт-Петербург"]),
+    "Переводы": (0.05, np.nan, ["Перевод с карты", "Азер Г.", "Константин Л.", "Светлана Т."]),
+    "Ж/д билеты": (0.04, 4112.0, ["РЖД"]),
+    "Различные товары": (0.04, 5399.0, ["OZON.ru", "Wildberries"]),
+    "Связь": (0.03, 4814.0, ["МТС", "Билайн"]),
+    "Пополнения": (0.03, np.nan, ["Пополнение через Газпромбанк", "Внесение наличных"]),
+    "Аптеки": (0.03, 5912.0, ["Аптека Вита", "Улыбка радуги"]),
+    "Каршеринг": (0.02, 7512.0, ["Ситидрайв", "Делимобиль"]),
+    "Рестораны": (0.02, 5812.0, ["OOO Frittella", "Тануки"]),
+    "Наличные": (0.02, 6011.0, ["Снятие в банкомате"]),
+    "Дом и ремонт": (0.02, 5200.0, ["Леруа Мерлен", "OBI"]),
+    "Услуги банка": (0.02, np.nan, ["Плата за обслуживание"]),
+    "Топливо": (0.02, 5541.0, ["Лукойл", "Роснефть"]),
+    "Образование": (0.02, 8220.0, ["СПбПУ"]),
+    "Одежда и обувь": (0.01, 5651.0, ["Zara", "Спортмастер"]),
+    "еда": (0.04, 5499.0, ["Вкусвилл", "Пятёрочка"]),
+}
+CARDS = ["*7197", "*4556", "*5091", "*5441", "*1112"]
+CARD_WEIGHTS = [0.72, 0.17, 0.01, 0.005, 0.005]
+CURRENCIES = ["RUB", "TRY", "EUR", "CNY", "USD"]
+CURRENCY_WEIGHTS = [0.98, 0.011, 0.005, 0.003, 0.001]
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+
+def parse_size(value: str) -> int:
+    """
+    переводит размер ('10k', '1M' или число) в число строк.
+    """
+    return SIZES.get(value) or int(value)
+
+
+def generate_transactions(
+    rows: int, seed: int = 0, start: str = "2018-01-01", end: str = "2021-12-31"
+) -> pd.DataFrame:
+    """
+    возвращает DataFrame с синтетическими операциями в формате data/operations.xlsx.
+    Одинаковые rows и seed дают одинаковые данные.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+    weights = np.array([CATEGORIES[name][0] for name in names])
+    category_ids = rng.choice(len(names), size=rows, p=weights / weights.sum())
+
+    description_ids = rng.integers(0, 1 << 30, size=rows)
+    descriptions = np.empty(rows, dtype=object)
+    mcc = np.empty(rows, dtype=float)
+    for i, name in enumerate(names):
+        rows_of_category = category_ids == i
+        options = np.array(CATEGORIES[name][2], dtype=object)
+        descriptions[rows_of_category] = options[description_ids[rows_of_category] % len(options)]
+        mcc[rows_of_category] = CATEGORIES[name][1]
+
+    span = int((pd.Timestamp(end) - pd.Timestamp(start)).total_seconds())
+    seconds = np.sort(rng.integers(0, span, size=rows))[::-1]
+    dates = pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")
+
+    amounts = -np.round(rng.lognormal(mean=5.0, sigma=1.2, size=rows), 2)
+    income = np.isin(category_ids, [names.index("Пополнения"), names.index("Переводы")]) & (rng.random(rows) < 0.4)
+    amounts[income] = -amounts[income] * 10
+
+    cards = np.array(CARDS + [np.nan], dtype=object)
+    card_weights = np.array(CARD_WEIGHTS + [1 - sum(CARD_WEIGHTS)])
+    card_numbers = cards[rng.choice(len(cards), size=rows, p=card_weights)]
+    currencies = np.array(CURRENCIES, dtype=object)[rng.choice(len(CURRENCIES), size=rows, p=CURRENCY_WEIGHTS)]
+    status = np.where(rng.random(rows) < 0.994, "OK", "FAILED").astype(object)
+
+    return pd.DataFrame(
+        {
+            "Дата операции": dates.strftime("%d.%m.%Y %H:%M:%S"),
+            "Дата платежа": dates.strftime("%d.%m.%Y"),
+            "Номер карты": card_numbers,
+            "Статус": status,
+            "Сумма операции": amounts,
+            "Валюта операции": currencies,
+            "Сумма платежа": amounts,
+            "Валюта платежа": "RUB",
+            "Кэшбэк": np.nan,
+            "Категория": np.array(names, dtype=object)[category_ids],
+            "MCC": mcc,
+            "Описание": descriptions,
+            "Бонусы (включая кэшбэк)": np.maximum((-amounts // 100).astype(np.int64), 0),
+            "Округление на инвесткопилку": 0,
+            "Сумма операции с округлением": np.abs(amounts),
+        }
+    )
+
+
+def write_statement(path: Any, rows: int, seed: int = 0) -> Any:
+    """
+    сохраняет синтетическую выписку в '.xlsx' (формат ограничен 1 048 575 строками данных).
+    """
+    generate_transactions(rows, seed).to_excel(path, index=False)
+    return path
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from src.lazy import lazy_import
+from src.parallel import ShardedStore
+from src.query import Query
+from src.utils import setup_logging
+
+np = lazy_import("numpy")
+
+logger = setup_logging()
+
+
+def period_rows(data: Any, start_date: Optional[str], end_date: Optional[str]) -> Optional[np.ndarray]:
+    """
+    возвращает позиции строк, попадающих в период (в исходном порядке), или None, если период не задан.
+    Для TransactionStore используется индекс дат, без просмотра всех строк.
+    """
+    if not (start_date and end_date):
+        return None
+    return Query(data).period(start_date, end_date).rows()
+
+
+def card_totals(
+    data: Any, cards: list[str], start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> list[float]:
+    """
+    возвращает суммы операций по каждой карте из списка за один проход по данным.
+
+    Суммы считаются в целых копейках, как в 'sum_amount_of_card' и ShardedStore,
+    поэтому результат совпадает с ними. Для карты без операций возвращается 0.
+    """
+    if data is None or len(data) == 0:
+        return [0 for _ in cards]
+    if isinstance(data, ShardedStore):
+        return data.card_totals(cards, start_date, end_date)
+
+    sums = Query(data).period(start_date, end_date).group_sum("Номер карты", kopecks=True)
+    totals: list[float] = [sums.get(card, 0) if card else 0 for card in cards]
+    logger.info("Результат 'card_totals' для %s карт", len(totals))
+    return totals
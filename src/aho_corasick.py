@@ -0,0 +1,55 @@
+from collections import deque
+from typing import Iterable
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо-Корасик: находит все шаблоны из набора за один проход по тексту,
+    время поиска не зависит от числа шаблонов.
+    """
+
+    __slots__ = ("patterns", "goto", "fail", "output")
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = list(patterns)
+        self.goto: list[dict[str, int]] = [{}]
+        self.output: list[set[int]] = [set()]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.output.append(set())
+                state = next_state
+            self.output[state].add(pattern_id)
+
+        # Ссылки неудачи строятся обходом бора в ширину
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> set[int]:
+        """
+        возвращает номера шаблонов, которые входят в text.
+        """
+        found: set[int] = set()
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from src.fx import normalize_transactions
+from src.market import fetch_market_data
+from src.parallel import ShardedStore
+from src.reports import search_category
+from src.services import filter_state
+from src.utils import read_files, setup_logging, start_logging, write_data
+from src.views import card_info, create_operations, send_greeting
+
+logger = setup_logging()
+
+
+def collect_files(source: Any) -> list[Path]:
+    """
+    возвращает список файлов выписок: все '.xlsx' каталога или пути из манифеста
+    (текстовый файл по одному пути в строке или JSON-список). Относительные пути
+    манифеста отсчитываются от его каталога.
+    """
+    source = Path(source)
+    if source.is_dir():
+        return sorted(source.glob("*.xlsx"))
+    if source.suffix.lower() == ".json":
+        with open(source, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [path if path.is_absolute() else source.parent / path for path in map(Path, entries)]
+
+
+def process_file(file_path: Path, output_dir: Path, params: dict[str, Any]) -> dict[str, Any]:
+    """
+    строит главную страницу, поиск и отчёт по категории для одной выписки
+    и сохраняет их в output_dir/<имя файла>/. Выполняется в процессе пула.
+    """
+    start = time.perf_counter()
+    data = read_files(file_path, output="store", use_cache=params.get("use_cache", False))
+    if params.get("to_rub"):
+        data = normalize_transactions(data)
+    if params.get("shards"):
+        # Большая выписка считается по шардам в нескольких процессах
+        with ShardedStore(data, workers=params["shards"]) as sharded:
+            write_outputs(sharded, output_dir / file_path.stem, params)
+    else:
+        write_outputs(data, output_dir / file_path.stem, params)
+    return {"file": str(file_path), "rows": len(data), "seconds": time.perf_counter() - start}
+
+
+def write_outputs(data: Any, target: Path, params: dict[str, Any]) -> None:
+    """
+    сохраняет главную страницу, поиск и отчёт по категории для набора данных в каталог target.
+    """
+    target.mkdir(parents=True, exist_ok=True)
+
+    greeting = send_greeting(params.get("time"))
+    views = create_operations(
+        greeting, card_info(data), data, params.get("start_date"), params.get("end_date"), market=params["market"]
+    )
+    write_data(str(target / "views.json"), views, compact=True)
+    services = {query: filter_state(data, query, output=None) for query in params.get("queries", [])}
+    write_data(str(target / "services.json"), services, compact=True)
+    report_date = params.get("report_date")
+    report = search_category(data, params["category"], report_date) if params.get("category") else {}
+    write_data(str(target / "reports.json"), report, compact=True)
+
+
+def run_batch(
+    files: Iterable[Path], output_dir: Any, params: dict[str, Any], workers: Optional[int] = None, max_pending: int = 0
+) -> dict[str, Any]:
+    """
+    обрабатывает выписки в пуле процессов. В работе одновременно не больше max_pending файлов
+    (по умолчанию - удвоенное число процессов), поэтому очередь задач не растёт без ограничений.
+    Возвращает сводку: число файлов, строк, ошибок и пропускную способность.
+    """
+    output_dir = Path(output_dir)
+    summary: dict[str, Any] = {"files": 0, "rows": 0, "failed": []}
+    started = time.perf_counter()
+    files = iter(files)
+    workers = workers or os.cpu_count() or 1
+    limit = max_pending or 2 * workers
+    start_logging()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: dict[Future, Path] = {}
+        while True:
+            for file_path in files:
+                pending[executor.submit(process_file, file_path, output_dir, params)] = file_path
+                if len(pending) >= limit:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = pending.pop(future)
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    logger.error("Ошибка обработки %s: %s", file_path, e)
+                    summary["failed"].append(str(file_path))
+                    continue
+                summary["files"] += 1
+                summary["rows"] += stats["rows"]
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    summary["files_per_second"] = round(summary["files"] / elapsed, 2) if elapsed else 0.0
+    summary["rows_per_second"] = round(summary["rows"] / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> dict[str, Any]:
+    """
+    пакетный режим без диалога: python -m src.batch <каталог или манифест> [параметры].
+    """
+    parser = argparse.ArgumentParser(description="Пакетная обработка выписок")
+    parser.add_argument("source", help="каталог с файлами '.xlsx' или манифест (.txt / .json)")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--time", help="время для приветствия, DD.MM.YYYY HH:MM")
+    parser.add_argument("--start-date", help="начало периода, DD.MM.YYYY")
+    parser.add_argument("--end-date", help="конец периода, DD.MM.YYYY")
+    parser.add_argument("--query", action="append", default=[], help="строка поиска (можно несколько)")
+    parser.add_argument("--category", default="еда", help="категория для отчёта")
+    parser.add_argument("--report-date", help="дата отчёта, DD.MM.YYYY")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=0)
+    parser.add_argument("--offline", action="store_true", help="не запрашивать курсы валют и акций")
+    parser.add_argument("--cache", action="store_true", help="использовать колоночный кэш файлов")
+    parser.add_argument("--rub", action="store_true", help="пересчитать суммы в рубли по историческим курсам")
+    parser.add_argument(
+        "--shards", type=int, default=0, help="считать каждую выписку в N процессах по шардам (для больших выписок)"
+    )
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.source)
+    # Котировки одинаковы для всех файлов, поэтому запрашиваются один раз
+    market = {"currency_rates": {}, "stock_prices": {}} if args.offline else fetch_market_data()
+    params = {
+        "time": args.time,
+        "start_date": args.start_date,
+        "end_date": args.end_date,
+        "queries": args.query,
+        "category": args.category,
+        "report_date": datetime.strptime(args.report_date, "%d.%m.%Y") if args.report_date else None,
+        "market": market,
+        "use_cache": args.cache,
+        "to_rub": args.rub,
+        "shards": args.shards,
+    }
+    summary = run_batch(files, args.output_dir, params, args.workers, args.max_pending)
+    print(
+        f"Обработано файлов: {summary['files']} из {len(files)}, строк: {summary['rows']}, "
+        f"время: {summary['seconds']} с, {summary['files_per_second']} файлов/с, "
+        f"{summary['rows_per_second']} строк/с, ошибок: {len(summary['failed'])}"
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    main()
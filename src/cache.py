@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+from src.lazy import lazy_import
+from src.utils import setup_logging
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = setup_logging()
+
+CACHE_DIR_NAME = ".cache"
+META_FILE = "meta.json"
+
+
+def file_fingerprint(file_path: Any) -> dict[str, Any]:
+    """
+    возвращает ключ снимка: абсолютный путь, время изменения и хэш содержимого файла.
+    """
+    path = Path(file_path).resolve()
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return {"path": str(path), "mtime_ns": path.stat().st_mtime_ns, "hash": digest.hexdigest()}
+
+
+def snapshot_dir(file_path: Any, cache_dir: Optional[Any] = None) -> Path:
+    """
+    возвращает каталог, в котором хранится колоночный снимок указанного файла.
+    """
+    path = Path(file_path).resolve()
+    root = Path(cache_dir) if cache_dir is not None else path.parent / CACHE_DIR_NAME
+    path_hash = hashlib.blake2b(str(path).encode("utf-8"), digest_size=6).hexdigest()
+    return root / f"{path.stem}-{path_hash}"
+
+
+def write_snapshot(df: pd.DataFrame, target: Path, key: dict[str, Any]) -> None:
+    """
+    сохраняет DataFrame по колонкам в формате .npy, строковые колонки кодируются словарём.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=target.parent))
+    columns = []
+    try:
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            file_name = f"{i}.npy"
+            if series.dtype.kind in "biufcmM":
+                np.save(tmp_dir / file_name, series.to_numpy())
+                columns.append({"name": name, "kind": "plain", "dtype": str(series.dtype), "file": file_name})
+            else:
+                codes, uniques = pd.factorize(series)
+                np.save(tmp_dir / file_name, codes.astype(np.int32))
+                columns.append(
+                    {
+                        "name": name,
+                        "kind": "dictionary",
+                        "dtype": str(series.dtype),
+                        "file": file_name,
+                        "values": list(uniques.tolist()),
+                    }
+                )
+        with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "rows": len(df), "columns": columns}, f, ensure_ascii=False)
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(tmp_dir, target)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def read_snapshot(target: Path) -> pd.DataFrame:
+    """
+    читает колоночный снимок, массивы открываются через memory mapping.
+    """
+    with open(target / META_FILE, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    data = {}
+    for column in meta["columns"]:
+        array = np.load(target / column["file"], mmap_mode="r")
+        if column["kind"] == "dictionary":
+            values = np.array(column["values"] + [np.nan], dtype=object)
+            data[column["name"]] = pd.Series(values.take(array), dtype=column["dtype"])
+        else:
+            data[column["name"]] = pd.Series(array, dtype=column["dtype"], copy=False)
+    return pd.DataFrame(data)
+
+
+def load_frame(file_path: Any, cache_dir: Optional[Any] = None) -> pd.DataFrame:
+    """
+    возвращает DataFrame файла '.xlsx', при совпадении ключа читает его из кэша,
+    иначе перечитывает файл и пересобирает снимок.
+    """
+    key = file_fingerprint(file_path)
+    target = snapshot_dir(file_path, cache_dir)
+    meta_path = target / META_FILE
+    if meta_path.exists():
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f)["key"] == key:
+                    return read_snapshot(target)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Снимок %s повреждён и будет пересобран: %s", target, e)
+
+    df = pd.read_excel(file_path)
+    try:
+        write_snapshot(df, target, key)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Не удалось сохранить снимок %s: %s", target, e)
+    return df
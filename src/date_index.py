@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from src.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+
+
+def to_datetime64(value: Any) -> np.datetime64:
+    """
+    приводит дату (datetime, pd.Timestamp или строку 'DD.MM.YYYY') к numpy.datetime64[ns].
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%d.%m.%Y")
+    return pd.Timestamp(value).to_datetime64()
+
+
+class DateIndex:
+    """
+    Индекс строк, отсортированных по дате операции.
+
+    Строится один раз для набора данных; запрос периода находит границы бинарным поиском
+    и возвращает позиции только попавших в него строк - O(log n + k).
+    """
+
+    __slots__ = ("order", "timestamps")
+
+    def __init__(self, dates: Any) -> None:
+        parsed = pd.to_datetime(pd.Series(dates), format=DATE_FORMAT).to_numpy()
+        self.order = np.argsort(parsed, kind="stable")
+        self.timestamps = parsed[self.order]
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def between(self, start: Any, end: Any) -> np.ndarray:
+        """
+        возвращает позиции строк с датой в [start, end] в исходном порядке строк.
+        """
+        low = np.searchsorted(self.timestamps, to_datetime64(start), side="left")
+        high = np.searchsorted(self.timestamps, to_datetime64(end), side="right")
+        return np.sort(self.order[low:high])
+
+    def last_days(self, days: int, anchor: Optional[Any] = None) -> np.ndarray:
+        """
+        возвращает позиции строк за последние days дней до anchor включительно (по умолчанию - сейчас).
+        """
+        end = pd.Timestamp(anchor) if anchor is not None else pd.Timestamp.now()
+        return self.between(end - timedelta(days=days), end)
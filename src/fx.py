@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+from src import metrics
+from src.date_index import DATE_FORMAT
+from src.lazy import lazy_import
+from src.market import DEFAULT_DEADLINE, exchange_api_url, get_session
+from src.store import TransactionStore
+from src.utils import get_setting, setup_logging
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = setup_logging()
+
+BASE_CURRENCY = "RUB"
+# Сумма -> колонка её валюты
+AMOUNT_COLUMNS = {"Сумма операции": "Валюта операции", "Сумма платежа": "Валюта платежа"}
+# Ограничение API на длину периода одного запроса timeseries
+TIMESERIES_MAX_DAYS = 365
+ISO_FORMAT = "%Y-%m-%d"
+# Период запроса начинается раньше первой операции, чтобы для выходных и праздников нашёлся предыдущий курс
+LOOKBACK_DAYS = 7
+
+_rate_table: Optional["RateTable"] = None
+_rate_table_lock = threading.Lock()
+
+
+def _merge_ranges(ranges: list[Any]) -> list[tuple[str, str]]:
+    """
+    возвращает периоды (строки 'YYYY-MM-DD' или даты), объединённые в отсортированный список непересекающихся.
+    Пара строк вместо списка пар - прежний формат файла, в котором хранился один период.
+    """
+    if len(ranges) == 2 and all(isinstance(day, str) for day in ranges):
+        ranges = [ranges]
+    bounds = sorted(
+        tuple(day if isinstance(day, date) else datetime.strptime(day, ISO_FORMAT).date() for day in period)
+        for period in ranges
+    )
+    merged: list[list[date]] = []
+    for low, high in bounds:
+        if merged and low <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return [(low.strftime(ISO_FORMAT), high.strftime(ISO_FORMAT)) for low, high in merged]
+
+
+class RateTable:
+    """
+    Локальная таблица дневных курсов валют к рублю.
+
+    Для каждой валюты хранится список непересекающихся периодов, за которые курсы уже запрошены,
+    поэтому повторная конвертация запрашивает по сети только даты вне их.
+    При указании path таблица сохраняется в JSON и читается при создании.
+    """
+
+    def __init__(self, path: Optional[Any] = None) -> None:
+        self.path = Path(path) if path is not None else None
+        self._rates: dict[str, dict[str, float]] = {}
+        self._ranges: dict[str, list[tuple[str, str]]] = {}
+        self._lock = threading.RLock()
+        self._frame: Optional[pd.DataFrame] = None
+        self._load()
+
+    def currencies(self) -> list[str]:
+        with self._lock:
+            return sorted(self._rates)
+
+    def rate(self, currency: str, day: Any) -> Optional[float]:
+        """
+        возвращает курс валюты на дату day (строка 'YYYY-MM-DD', date или datetime) или None.
+        """
+        key = day if isinstance(day, str) else day.strftime(ISO_FORMAT)
+        with self._lock:
+            return self._rates.get(currency, {}).get(key)
+
+    def missing(self, currency: str, start: date, end: date) -> list[tuple[date, date]]:
+        """
+        возвращает периоды внутри [start, end], курсы за которые ещё не запрашивались.
+        """
+        with self._lock:
+            covered = list(self._ranges.get(currency, []))
+        result = []
+        for low, high in covered:
+            low, high = (datetime.strptime(day, ISO_FORMAT).date() for day in (low, high))
+            if high < start or low > end:
+                continue
+            if start < low:
+                result.append((start, low - timedelta(days=1)))
+            start = high + timedelta(days=1)
+            if start > end:
+                return result
+        result.append((start, end))
+        return result
+
+    def put(self, currency: str, rates: dict[str, float], start: date, end: date) -> None:
+        """
+        добавляет курсы валюты и период, за который они запрошены; пересекающиеся
+        и соседние периоды объединяются.
+        """
+        with self._lock:
+            self._rates.setdefault(currency, {}).update(rates)
+            self._ranges[currency] = _merge_ranges([*self._ranges.get(currency, []), (start, end)])
+            self._frame = None
+            self._save()
+
+    def frame(self) -> pd.DataFrame:
+        """
+        возвращает таблицу курсов (date, currency, rate), отсортированную по дате, для merge_asof.
+        """
+        with self._lock:
+            if self._frame is None:
+                rows = [
+                    (day, currency, rate) for currency, rates in self._rates.items() for day, rate in rates.items()
+                ]
+                frame = pd.DataFrame(rows, columns=["date", "currency", "rate"])
+                frame["date"] = pd.to_datetime(frame["date"], format=ISO_FORMAT).astype("datetime64[ns]")
+                frame["rate"] = frame["rate"].astype(float)
+                self._frame = frame.sort_values("date", kind="stable", ignore_index=True)
+            return self._frame
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            self._rates = {currency: dict(rates) for currency, rates in stored["rates"].items()}
+            self._ranges = {currency: _merge_ranges(ranges) for currency, ranges in stored["ranges"].items()}
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning("Не удалось прочитать таблицу курсов %s: %s", self.path, e)
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        # Таблицу могут дополнять несколько процессов пакетного режима, у каждого свой временный файл
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"rates": self._rates, "ranges": self._ranges}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error("Не удалось сохранить таблицу курсов %s: %s", self.path, e)
+
+
+def default_rate_table() -> RateTable:
+    """
+    возвращает общую таблицу курсов, файл задаётся переменной окружения FX_RATES_PATH.
+    """
+    global _rate_table
+    with _rate_table_lock:
+        if _rate_table is None:
+            _rate_table = RateTable(get_setting("FX_RATES_PATH", "fx_rates.json") or None)
+        return _rate_table
+
+
+def fetch_timeseries(currency: str, start: date, end: date, timeout: float = DEFAULT_DEADLINE) -> dict[str, float]:
+    """
+    возвращает дневные курсы валюты к рублю за период: один запрос timeseries
+    на каждые TIMESERIES_MAX_DAYS дней периода.
+    """
+    rates: dict[str, float] = {}
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(end, chunk_start + timedelta(days=TIMESERIES_MAX_DAYS - 1))
+        with metrics.network_timer("exchange_rates_timeseries"):
+            response = get_session().get(
+                f"{exchange_api_url()}/timeseries",
+                params={
+                    "start_date": chunk_start.strftime(ISO_FORMAT),
+                    "end_date": chunk_end.strftime(ISO_FORMAT),
+                    "base": currency,
+                    "symbols": BASE_CURRENCY,
+                },
+                headers={"apikey": get_setting("API_KEY")},
+                timeout=timeout,
+            )
+            response.raise_for_status()
+        for day, values in response.json()["rates"].items():
+            if values.get(BASE_CURRENCY) is not None:
+                rates[day] = float(values[BASE_CURRENCY])
+        chunk_start = chunk_end + timedelta(days=1)
+    return rates
+
+
+def update_rates(
+    table: RateTable, ranges: dict[str, tuple[date, date]], timeout: float = DEFAULT_DEADLINE
+) -> dict[str, bool]:
+    """
+    дозапрашивает в таблицу курсы за периоды ranges (валюта -> (начало, конец)), которых в ней нет.
+    Валюты запрашиваются параллельно. Возвращает признак успеха по каждой валюте.
+    """
+    result = {currency: True for currency in ranges}
+    tasks = [(currency, *period) for currency, bounds in ranges.items() for period in table.missing(currency, *bounds)]
+    if not tasks:
+        return result
+    with ThreadPoolExecutor(max_workers=min(len(tasks), 8), thread_name_prefix="fx") as executor:
+        futures = {executor.submit(fetch_timeseries, *task, timeout): task for task in tasks}
+        for future, (currency, start, end) in futures.items():
+            try:
+                table.put(currency, future.result(), start, end)
+            except Exception as e:
+                logger.error("Ошибка получения курсов %s за %s - %s: %s", currency, start, end, e)
+                result[currency] = False
+    return result
+
+
+def _columns(data: Any) -> dict[str, np.ndarray]:
+    """
+    возвращает колонки дат, сумм и валют, которые есть в данных.
+    """
+    names = ["Дата операции", *AMOUNT_COLUMNS, *AMOUNT_COLUMNS.values()]
+    if isinstance(data, TransactionStore):
+        columns = {name: data.column(name) for name in names[1:] if name in data.columns}
+        if "Дата операции" in data.columns:
+            # Даты уже разобраны в индексе дат, возвращаются в исходном порядке строк
+            index = data.date_index
+            columns["Дата операции"] = np.empty_like(index.timestamps)
+            columns["Дата операции"][index.order] = index.timestamps
+        return columns
+    frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(list(data))
+    return {name: frame[name].to_numpy() for name in names if name in frame}
+
+
+def required_ranges(days: np.ndarray, currencies: np.ndarray) -> dict[str, tuple[date, date]]:
+    """
+    возвращает для каждой валюты, кроме рубля, период от первой (минус LOOKBACK_DAYS)
+    до последней даты операций в ней.
+    """
+    frame = pd.DataFrame({"date": days, "currency": currencies})
+    frame = frame[frame["currency"].notna() & (frame["currency"] != BASE_CURRENCY) & frame["date"].notna()]
+    bounds = frame.groupby("currency")["date"].agg(["min", "max"])
+    lookback = timedelta(days=LOOKBACK_DAYS)
+    return {currency: ((low - lookback).date(), high.date()) for currency, (low, high) in bounds.iterrows()}
+
+
+def rub_rates(days: np.ndarray, currencies: np.ndarray, table: RateTable) -> np.ndarray:
+    """
+    возвращает курс к рублю для каждой пары (дата, валюта) одним соединением merge_asof:
+    берётся курс на дату операции или последний известный до неё, но не старше LOOKBACK_DAYS дней.
+    Для рубля - 1, без курса - nan.
+    """
+    currencies = pd.Series(currencies, dtype=object)
+    known = (currencies.notna() & pd.notna(days)).to_numpy()
+    rub = (currencies == BASE_CURRENCY).to_numpy() & known
+    rates = np.where(rub, 1.0, np.nan)
+    foreign = np.flatnonzero(known & ~rub)
+    right = table.frame()
+    if len(foreign) and len(right):
+        left = pd.DataFrame({"date": days[foreign], "currency": currencies.to_numpy()[foreign], "row": foreign})
+        left = left.astype({"currency": "str"}).sort_values("date", kind="stable")
+        right = right.astype({"currency": "str"})
+        joined = pd.merge_asof(
+            left, right, on="date", by="currency", direction="backward", tolerance=pd.Timedelta(days=LOOKBACK_DAYS)
+        )
+        rates[joined["row"].to_numpy()] = joined["rate"].to_numpy()
+    return rates
+
+
+def _to_rub(columns: dict[str, np.ndarray], table: RateTable, fetch: bool) -> dict[str, np.ndarray]:
+    if "Дата операции" not in columns:
+        return {}
+    days = columns["Дата операции"]
+    if days.dtype.kind != "M":
+        days = pd.to_datetime(pd.Series(days), format=DATE_FORMAT).to_numpy()
+    days = days.astype("datetime64[D]").astype("datetime64[ns]")
+    pairs = [(amount, currency) for amount, currency in AMOUNT_COLUMNS.items() if {amount, currency} <= set(columns)]
+    if fetch:
+        ranges: dict[str, tuple[date, date]] = {}
+        for _, currency in pairs:
+            for code, (low, high) in required_ranges(days, columns[currency]).items():
+                known = ranges.get(code)
+                ranges[code] = (min(low, known[0]), max(high, known[1])) if known else (low, high)
+        update_rates(table, ranges)
+    metrics.count("rows_scanned", len(days), "to_rub")
+    return {
+        amount: columns[amount].astype(float) * rub_rates(days, columns[currency], table) for amount, currency in pairs
+    }
+
+
+def to_rub(data: Any, table: Optional[RateTable] = None, fetch: bool = True) -> dict[str, np.ndarray]:
+    """
+    возвращает суммы 'Сумма операции' и 'Сумма платежа', пересчитанные в рубли по курсу на дату операции.
+
+    Перед пересчётом в таблицу дозапрашиваются курсы за недостающие даты: по одному запросу
+    на валюту и период (fetch=False - только по имеющимся курсам). Суммы без курса - nan.
+    """
+    return _to_rub(_columns(data), table or default_rate_table(), fetch)
+
+
+@metrics.timed
+def normalize_transactions(data: Any, table: Optional[RateTable] = None, fetch: bool = True) -> Any:
+    """
+    возвращает данные того же вида (список словарей, DataFrame или TransactionStore), в которых
+    суммы пересчитаны в рубли, а валюты заменены на 'RUB'. Строки, для которых курс не найден,
+    остаются без изменений. После этого 'sum_amount_of_card', 'top_5_transactions'
+    и 'search_category' складывают суммы в одной валюте.
+    """
+    columns = _columns(data)
+    updates: dict[str, np.ndarray] = {}
+    for amount, values in _to_rub(columns, table or default_rate_table(), fetch).items():
+        currency = AMOUNT_COLUMNS[amount]
+        keep = np.isnan(values)
+        lost = keep & pd.notna(columns[currency]) & (columns[currency] != BASE_CURRENCY)
+        if lost.any():
+            logger.warning("Нет курса для %s строк '%s', суммы оставлены в исходной валюте", int(lost.sum()), amount)
+        updates[amount] = np.where(keep, columns[amount].astype(float), values)
+        updates[currency] = np.where(keep, columns[currency], BASE_CURRENCY).astype(object)
+
+    if isinstance(data, TransactionStore):
+        return data.with_columns(updates)
+    if isinstance(data, pd.DataFrame):
+        return data.assign(**updates)
+    records = [dict(row) for row in data]
+    for name, values in updates.items():
+        for record, value in zip(records, values.tolist()):
+            record[name] = value
+    return records
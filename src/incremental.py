@@ -0,0 +1,216 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from src.date_index import DATE_FORMAT
+from src.streaming import iter_batches
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+TOP_SIZE = 5
+
+
+def row_fingerprint(row: dict[str, Any]) -> str:
+    """
+    возвращает отпечаток строки выписки по всем её значениям.
+    """
+    payload = json.dumps([[name, str(value)] for name, value in sorted(row.items())], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def bucket_key(date: datetime) -> str:
+    """
+    возвращает ключ дневной корзины. Операции ровно в 00:00:00 хранятся отдельно ('YYYY-MM-DDT00'),
+    чтобы запросы с границей периода в полночь совпадали с построчным расчётом.
+    """
+    day = date.strftime("%Y-%m-%d")
+    return f"{day}T00" if date.time() == datetime.min.time() else day
+
+
+def _in_window(key: str, start_day: Optional[str], end_day: Optional[str]) -> bool:
+    """
+    корзина попадает в период [start_day 00:00, end_day 00:00]: все дни до end_day и полночь end_day.
+    """
+    if start_day is None or end_day is None:
+        return True
+    day = key[:10]
+    return start_day <= day < end_day or (day == end_day and key.endswith("T00"))
+
+
+class IncrementalAggregates:
+    """
+    Материализованные агрегаты выписки, которые дополняются только новыми строками.
+
+    Уже загруженные строки отсекаются по водяному знаку 'Дата операции' и отпечаткам строк
+    с датой, равной водяному знаку. Хранятся суммы по картам и по категориям (в целых копейках) в разрезе дней,
+    признак строк без номера карты и топ операций каждого дня; состояние сохраняется в JSON-файл.
+    """
+
+    def __init__(self, path: Optional[Any] = None) -> None:
+        self.path = Path(path) if path is not None else None
+        self.watermark: Optional[datetime] = None
+        self.watermark_fingerprints: set[str] = set()
+        self.rows = 0
+        self.cards: dict[str, dict[str, float]] = {}
+        self.missing_card = False
+        self.categories: dict[str, dict[str, int]] = {}
+        self.top: dict[str, list[list[Any]]] = {}
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def ingest(self, file_path: Any, batch_size: int = 10_000) -> int:
+        """
+        дочитывает новые строки файла в агрегаты и сохраняет состояние, возвращает число новых строк.
+        """
+        added = self.ingest_rows(row for batch in iter_batches(file_path, batch_size) for row in batch.rows)
+        self.save()
+        logger.info("Инкрементальная загрузка %s: добавлено %s строк", file_path, added)
+        return added
+
+    def ingest_rows(self, rows: Iterable[dict[str, Any]]) -> int:
+        """
+        добавляет в агрегаты строки, которые ещё не были загружены.
+        """
+        old_watermark, old_fingerprints = self.watermark, self.watermark_fingerprints
+        added = 0
+        for row in rows:
+            date = datetime.strptime(row["Дата операции"], DATE_FORMAT)
+            if old_watermark is not None and date < old_watermark:
+                continue
+            fingerprint = row_fingerprint(row)
+            if date == old_watermark and fingerprint in old_fingerprints:
+                continue
+            self._fold(row, date)
+            added += 1
+            if self.watermark is None or date > self.watermark:
+                self.watermark = date
+                self.watermark_fingerprints = set()
+            if date == self.watermark:
+                self.watermark_fingerprints.add(fingerprint)
+        return added
+
+    def _fold(self, row: dict[str, Any], date: datetime) -> None:
+        key = bucket_key(date)
+        amount = row["Сумма операции"]
+        card, category = row["Номер карты"], row["Категория"]
+        if isinstance(card, str):
+            buckets = self.cards.setdefault(card, {})
+            buckets[key] = buckets.get(key, 0) + amount
+        else:
+            self.missing_card = True
+        if isinstance(category, str) and not math.isnan(amount):
+            # Суммы категорий - в копейках без пропусков, как в 'search_category' для строк
+            buckets = self.categories.setdefault(category, {})
+            buckets[key] = buckets.get(key, 0) + round(amount * 100)
+        item = [
+            amount,
+            -self.rows,
+            {
+                "date": row["Дата операции"],
+                "amount": round(amount, 2),
+                "category": category,
+                "description": row["Описание"],
+            },
+        ]
+        top = self.top.setdefault(key, [])
+        top.append(item)
+        if len(top) > TOP_SIZE:
+            top.remove(min(top, key=lambda entry: entry[:2]))
+        self.rows += 1
+
+    @staticmethod
+    def _period(start_date: Optional[str], end_date: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+        if not (start_date and end_date):
+            return None, None
+        start = datetime.strptime(start_date, "%d.%m.%Y").strftime("%Y-%m-%d")
+        end = datetime.strptime(end_date, "%d.%m.%Y").strftime("%Y-%m-%d")
+        return start, end
+
+    def card_list(self) -> list[Any]:
+        """
+        возвращает номера карт, как 'card_info' для полной выписки: пропуск (nan) - последним, если он был.
+        """
+        return list(self.cards) + [float("nan")] if self.missing_card else list(self.cards)
+
+    def card_totals(self, cards: list[str], start_date: Optional[str] = None, end_date: Optional[str] = None) -> list:
+        """
+        возвращает суммы операций по картам за период, как 'card_totals' для полной выписки.
+        """
+        start, end = self._period(start_date, end_date)
+        totals = []
+        for card in cards:
+            buckets = self.cards.get(card, {})
+            selected = [total for key, total in buckets.items() if _in_window(key, start, end)]
+            totals.append(sum(selected) if selected else 0)
+        return totals
+
+    def top_transactions(
+        self, start_date: Optional[str] = None, end_date: Optional[str] = None, n: int = TOP_SIZE
+    ) -> list[dict[str, Any]]:
+        """
+        возвращает n крупнейших операций за период, объединяя топы дневных корзин.
+        В корзине хранится TOP_SIZE операций, поэтому n больше TOP_SIZE не поддерживается.
+        """
+        if n > TOP_SIZE:
+            raise ValueError(f"В агрегатах хранится не больше {TOP_SIZE} крупнейших операций за день, запрошено {n}")
+        start, end = self._period(start_date, end_date)
+        candidates = (item for key, top in self.top.items() if _in_window(key, start, end) for item in top)
+        return [item[2] for item in heapq.nlargest(n, candidates, key=lambda item: item[:2])]
+
+    def category_total(self, category: str, date: Optional[datetime] = None, days: int = 90) -> float:
+        """
+        возвращает сумму операций категории за days дней до date, со знаком как в 'search_category'.
+        Агрегаты хранятся по дням, поэтому время date отбрасывается: период считается от полуночи
+        за days дней до полуночи дня date (по умолчанию - сегодня). Для даты в полночь сумма
+        совпадает с 'search_category' по строкам.
+        """
+        date = datetime.combine((date or datetime.now()).date(), datetime.min.time())
+        start = (date - timedelta(days=days)).strftime("%Y-%m-%d")
+        end = date.strftime("%Y-%m-%d")
+        selected = [total for key, total in self.categories.get(category, {}).items() if _in_window(key, start, end)]
+        return -sum(selected) / 100 + 0.0 if selected else 0.0
+
+    def save(self) -> None:
+        """
+        сохраняет состояние в файл, если он задан.
+        """
+        if self.path is None:
+            return
+        state = {
+            "watermark": self.watermark.strftime(DATE_FORMAT) if self.watermark else None,
+            "watermark_fingerprints": sorted(self.watermark_fingerprints),
+            "rows": self.rows,
+            "cards": self.cards,
+            "missing_card": self.missing_card,
+            "category_kopecks": self.categories,
+            "top": self.top,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:  # type: ignore[arg-type]
+            state = json.load(f)
+        watermark = state["watermark"]
+        self.watermark = datetime.strptime(watermark, DATE_FORMAT) if watermark else None
+        self.watermark_fingerprints = set(state["watermark_fingerprints"])
+        self.rows = state["rows"]
+        self.cards = state["cards"]
+        self.missing_card = state.get("missing_card", False)
+        if "category_kopecks" in state:
+            self.categories = state["category_kopecks"]
+        else:
+            # Состояние прежнего формата: суммы категорий в рублях
+            self.categories = {
+                category: {key: round(total * 100) for key, total in buckets.items()}
+                for category, buckets in state["categories"].items()
+            }
+        self.top = state["top"]
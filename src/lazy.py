@@ -0,0 +1,60 @@
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+_lock = threading.RLock()
+
+
+class _LazyModule(ModuleType):
+    """
+    Модуль, который выполняется при первом обращении к любому атрибуту.
+
+    То же, что importlib.util.LazyLoader, но загрузка выполняется под общей блокировкой
+    и класс модуля меняется только после её завершения: до Python 3.12 LazyLoader позволял
+    другому потоку увидеть модуль без атрибутов, пока первый поток его выполнял.
+    """
+
+    def __getattribute__(self, attr: str) -> object:
+        with _lock:
+            if type(self) is _LazyModule:
+                state = ModuleType.__getattribute__(self, "__spec__").loader_state
+                # Повторное обращение из того же потока во время выполнения модуля
+                if not state["loading"]:
+                    state["loading"] = True
+                    try:
+                        state["loader"].exec_module(self)
+                    finally:
+                        state["loading"] = False
+                    self.__class__ = ModuleType
+        return ModuleType.__getattribute__(self, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    возвращает модуль name, который будет выполнен при первом обращении к его атрибуту.
+
+    Модуль регистрируется в sys.modules, поэтому обычный 'import name' в других местах
+    получает тот же объект, а unittest.mock.patch('name.attr') работает как с обычным модулем.
+    Уже загруженный модуль возвращается как есть.
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader_state = {"loader": spec.loader, "loading": False}
+        module.__class__ = _LazyModule
+        sys.modules[name] = module
+        return module
+
+
+def is_loaded(name: str) -> bool:
+    """
+    возвращает True, если модуль name импортирован и уже выполнен (а не отложен lazy_import).
+    """
+    module = sys.modules.get(name)
+    return module is not None and type(module) is not _LazyModule
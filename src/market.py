@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Optional
+
+from src import metrics
+from src.lazy import lazy_import
+from src.quote_cache import FRESH, STALE, QuoteCache
+from src.utils import get_setting, setup_logging, summarize
+
+requests = lazy_import("requests")
+yf = lazy_import("yfinance")
+
+logger = setup_logging()
+
+DEFAULT_EXCHANGE_API_URL = "https://api.apilayer.com/exchangerates_data"
+DEFAULT_CURRENCIES = "USD,EUR"
+DEFAULT_STOCKS = "AAPL,AMZN,GOOGL,MSFT,TSLA"
+DEFAULT_DEADLINE = 15.0
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_quote_cache: Optional[QuoteCache] = None
+
+
+def _split(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def user_currencies() -> list[str]:
+    """
+    возвращает список валют из переменной окружения USER_CURRENCIES (по умолчанию USD, EUR).
+    """
+    return _split(get_setting("USER_CURRENCIES", DEFAULT_CURRENCIES))
+
+
+def user_stocks() -> list[str]:
+    """
+    возвращает список тикеров из переменной окружения USER_STOCKS.
+    """
+    return _split(get_setting("USER_STOCKS", DEFAULT_STOCKS))
+
+
+def exchange_api_url() -> str:
+    """
+    возвращает адрес API курсов валют (переменная окружения EXCHANGE_API_URL).
+    """
+    return get_setting("EXCHANGE_API_URL", DEFAULT_EXCHANGE_API_URL).rstrip("/")
+
+
+def get_session() -> requests.Session:
+    """
+    возвращает общую HTTP-сессию с пулом соединений, создаётся при первом вызове.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def default_quote_cache() -> QuoteCache:
+    """
+    возвращает общий кэш котировок, настроенный переменными окружения
+    QUOTE_CACHE_TTL, QUOTE_CACHE_PATH и QUOTE_CACHE_SWR.
+    """
+    global _quote_cache
+    with _session_lock:
+        if _quote_cache is None:
+            _quote_cache = QuoteCache(
+                ttl=float(get_setting("QUOTE_CACHE_TTL", "60")),
+                path=get_setting("QUOTE_CACHE_PATH", "quote_cache.json") or None,
+                stale_while_revalidate=get_setting("QUOTE_CACHE_SWR", "1") == "1",
+            )
+        return _quote_cache
+
+
+def fetch_rate(currency: str, timeout: float = DEFAULT_DEADLINE) -> float:
+    """
+    возвращает курс валюты к рублю, запрос идёт через общую сессию.
+    """
+    with metrics.network_timer("exchange_rates"):
+        response = get_session().get(
+            f"{exchange_api_url()}/latest",
+            params={"symbols": "RUB", "base": currency},
+            headers={"apikey": get_setting("API_KEY")},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+    return float(response.json()["rates"]["RUB"])
+
+
+def fetch_stock_prices(stocks: list[str]) -> dict[str, float]:
+    """
+    возвращает максимальные цены акций за день, все тикеры запрашиваются одним запросом.
+    """
+    if not stocks:
+        return {}
+    with metrics.network_timer("yfinance"):
+        data = yf.download(stocks, period="1d", group_by="ticker", progress=False, threads=False)
+    prices = {}
+    for stock in stocks:
+        high = data[stock]["High"].dropna() if stock in data.columns.get_level_values(0) else None
+        prices[stock] = float(high.iloc[0]) if high is not None and not high.empty else 0.0
+    return prices
+
+
+def _from_cache(cache: QuoteCache, key: str, loader: Any) -> tuple[Optional[float], bool]:
+    """
+    возвращает значение из кэша и признак того, что его нужно запросить сейчас.
+    """
+    value, state = cache.lookup(key)
+    if state == FRESH:
+        return value, False
+    if state == STALE:
+        cache.refresh(key, loader)
+        return value, False
+    return None, True
+
+
+def _fetch_stock_price(stock: str) -> float:
+    return fetch_stock_prices([stock])[stock]
+
+
+def _read_cache(
+    cache: QuoteCache,
+    rates: dict[str, Optional[float]],
+    prices: dict[str, Optional[float]],
+    deadline: float,
+) -> tuple[list[str], list[str]]:
+    """
+    заполняет rates и prices значениями из кэша и возвращает валюты и тикеры, которых в нём нет.
+    """
+    missing_currencies, missing_stocks = [], []
+    for currency in rates:
+        rates[currency], missing = _from_cache(cache, f"rate:{currency}", partial(fetch_rate, currency, deadline))
+        if missing:
+            missing_currencies.append(currency)
+    for stock in prices:
+        prices[stock], missing = _from_cache(cache, f"stock:{stock}", partial(_fetch_stock_price, stock))
+        if missing:
+            missing_stocks.append(stock)
+    return missing_currencies, missing_stocks
+
+
+def _store(cache: Optional[QuoteCache], key: str, value: float) -> None:
+    if cache is not None:
+        cache.put(key, value)
+
+
+@metrics.timed
+def fetch_market_data(
+    currencies: Optional[list[str]] = None,
+    stocks: Optional[list[str]] = None,
+    deadline: float = DEFAULT_DEADLINE,
+    cache: Optional[QuoteCache] = None,
+) -> dict[str, dict[str, Optional[float]]]:
+    """
+    параллельно получает курсы валют и цены акций с общим ограничением по времени.
+
+    Значения, которые не успели прийти до deadline или завершились ошибкой, возвращаются как None.
+    Если передан cache, по сети запрашиваются только отсутствующие в нём котировки.
+    """
+    currencies = user_currencies() if currencies is None else currencies
+    stocks = user_stocks() if stocks is None else stocks
+    rates: dict[str, Optional[float]] = {currency: None for currency in currencies}
+    prices: dict[str, Optional[float]] = {stock: None for stock in stocks}
+
+    missing_currencies, missing_stocks = list(currencies), list(stocks)
+    if cache is not None:
+        missing_currencies, missing_stocks = _read_cache(cache, rates, prices, deadline)
+        if not missing_currencies and not missing_stocks:
+            return {"currency_rates": rates, "stock_prices": prices}
+
+    executor = ThreadPoolExecutor(max_workers=len(missing_currencies) + 1, thread_name_prefix="market")
+    rate_futures = {executor.submit(fetch_rate, currency, deadline): currency for currency in missing_currencies}
+    stock_future = executor.submit(fetch_stock_prices, missing_stocks) if missing_stocks else None
+    futures: list[Any] = list(rate_futures) + ([stock_future] if stock_future else [])
+    done, not_done = wait(futures, timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for future, currency in rate_futures.items():
+        if future in done and future.exception() is None:
+            rates[currency] = future.result()
+            _store(cache, f"rate:{currency}", future.result())
+        elif future in done:
+            logger.error("Ошибка получения курса %s: %s", currency, future.exception())
+    if stock_future is not None and stock_future in done:
+        if stock_future.exception() is None:
+            for stock, price in stock_future.result().items():
+                prices[stock] = price
+                _store(cache, f"stock:{stock}", price)
+        else:
+            logger.error("Ошибка получения цен акций: %s", stock_future.exception())
+    if not_done:
+        logger.warning("Не получено %s из %s ответов за %s с", len(not_done), len(futures), deadline)
+
+    logger.info("Результат 'fetch_market_data' - %s, %s", summarize(rates), summarize(prices))
+    return {"currency_rates": rates, "stock_prices": prices}
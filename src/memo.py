@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.lazy import lazy_import
+from src.parallel import ShardedStore
+from src.store import TransactionStore
+from src.utils import get_setting, setup_logging
+
+np = lazy_import("numpy")
+
+logger = setup_logging()
+
+_default_lock = threading.Lock()
+_default_cache: Optional["MemoCache"] = None
+
+
+def dataset_fingerprint(data: Any) -> Optional[str]:
+    """
+    возвращает отпечаток содержимого набора данных или None, если результат для него не кэшируется.
+
+    Отпечаток есть только у неизменяемых хранилищ: TransactionStore считает его один раз,
+    новая или изменённая выписка загружается в новое хранилище с другим отпечатком.
+    Список словарей, DataFrame и IncrementalAggregates могут меняться на месте, а отпечаток по содержимому
+    пришлось бы считать при каждом вызове, поэтому результаты для них не кэшируются - в том числе
+    для 'read_files' с форматом по умолчанию (список словарей). Для кэширования выписку нужно читать
+    с output="store".
+    """
+    if isinstance(data, ShardedStore):
+        # Результаты по шардам совпадают с последовательными, поэтому запись у них общая
+        return data.store.fingerprint()
+    if isinstance(data, TransactionStore):
+        return data.fingerprint()
+    return None
+
+
+def _normalize(value: Any) -> Any:
+    """
+    приводит параметр к виду, одинаковому для равных значений: даты - к ISO, коллекции - к спискам.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return _normalize(value.item()) if not isinstance(value, np.datetime64) else str(value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(item) for item in value), key=repr)
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    return repr(value)
+
+
+def make_key(name: str, fingerprint: str, params: dict[str, Any]) -> str:
+    """
+    возвращает ключ записи: хэш имени функции, отпечатка данных и нормализованных параметров.
+    """
+    payload = json.dumps([name, fingerprint, _normalize(params)], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class MemoCache:
+    """
+    Двухуровневый кэш результатов: LRU в памяти и, если задан каталог, файлы на диске.
+
+    Значения хранятся сериализованными в pickle, каждое попадание возвращает новую копию,
+    поэтому изменения результата вызывающим не портят запись.
+    В памяти хранится не больше max_entries записей общим размером не больше max_bytes; запись больше
+    max_bytes в память не попадает. На диске каждая запись - отдельный файл pickle;
+    когда их общий размер превышает max_disk_bytes, удаляются давно не использованные.
+    Запись с диска при попадании поднимается в память.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        path: Optional[Any] = None,
+        max_disk_bytes: int = 64 * 2**20,
+        max_bytes: int = 64 * 2**20,
+    ) -> None:
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self.max_disk_bytes = max_disk_bytes
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.pkl"
+
+    def lookup(self, key: str) -> tuple[bool, Any]:
+        """
+        возвращает (True, копия значения) при попадании в память или на диск, иначе (False, None).
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, pickle.loads(self._entries[key])
+            loaded = self._read(key) if self.path is not None else None
+            if loaded is None:
+                self._stats["misses"] += 1
+                return False, None
+            payload, value = loaded
+            self._stats["disk_hits"] += 1
+            self._remember(key, payload)
+            return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        сохраняет копию значения в память и, если задан каталог, на диск.
+        """
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning("Значение для записи кэша %s не сериализуется: %s", key, e)
+            return
+        with self._lock:
+            self._remember(key, payload)
+            if self.path is not None:
+                self._write(key, payload)
+
+    def _remember(self, key: str, payload: bytes) -> None:
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        if len(payload) > self.max_bytes:
+            return
+        self._entries[key] = payload
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._bytes -= len(self._entries.popitem(last=False)[1])
+            self._stats["evictions"] += 1
+
+    def _read(self, key: str) -> Optional[tuple[bytes, Any]]:
+        file_ = self._file(key)
+        try:
+            with open(file_, "rb") as f:
+                payload = f.read()
+            value = pickle.loads(payload)
+            # Время изменения файла - время последнего использования для вытеснения
+            os.utime(file_)
+            return payload, value
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logger.warning("Не удалось прочитать запись кэша %s: %s", file_, e)
+            return None
+
+    def _write(self, key: str, payload: bytes) -> None:
+        file_ = self._file(key)
+        tmp_file = file_.with_name(f"{file_.name}.{os.getpid()}.tmp")
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_file, file_)
+        except OSError as e:
+            logger.warning("Не удалось сохранить запись кэша %s: %s", file_, e)
+            tmp_file.unlink(missing_ok=True)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = []
+        for file_ in self.path.glob("*.pkl"):
+            try:
+                stat = file_.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, file_))
+        total = sum(size for _, size, _ in files)
+        for _, size, file_ in sorted(files, key=lambda item: item[0]):
+            if total <= self.max_disk_bytes:
+                break
+            file_.unlink(missing_ok=True)
+            total -= size
+            self._stats["disk_evictions"] += 1
+
+    def clear(self) -> None:
+        """
+        очищает память и удаляет файлы записей с диска.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self.path is not None:
+                for file_ in self.path.glob("*.pkl"):
+                    file_.unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, int]:
+        """
+        возвращает счётчики попаданий, промахов и вытеснений.
+        """
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "bytes": self._bytes}
+
+
+def default_memo_cache() -> MemoCache:
+    """
+    возвращает общий кэш результатов, настроенный переменными окружения
+    MEMO_CACHE_SIZE (0 - кэш выключен), MEMO_CACHE_MB, MEMO_CACHE_DIR (пусто - без диска) и MEMO_CACHE_DISK_MB.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = MemoCache(
+                max_entries=int(get_setting("MEMO_CACHE_SIZE", "256")),
+                max_bytes=int(float(get_setting("MEMO_CACHE_MB", "64")) * 2**20),
+                path=get_setting("MEMO_CACHE_DIR", "") or None,
+                max_disk_bytes=int(float(get_setting("MEMO_CACHE_DISK_MB", "64")) * 2**20),
+            )
+        return _default_cache
+
+
+def memoize(func: Optional[Callable] = None, *, name: Optional[str] = None, cache: Optional[MemoCache] = None) -> Any:
+    """
+    декоратор: кэширует результат функции по отпечатку набора данных (первый параметр)
+    и нормализованным остальным параметрам. Позиционные и именованные аргументы дают один ключ.
+
+    Каждый вызов возвращает отдельную копию результата, как и без кэша.
+    Для данных без отпечатка (см. 'dataset_fingerprint') функция просто вызывается.
+    """
+
+    def decorator(target: Callable) -> Callable:
+        label = name or f"{target.__module__}.{target.__qualname__}"
+        signature = inspect.signature(target)
+        dataset = next(iter(signature.parameters))
+
+        @functools.wraps(target)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            memo = cache or default_memo_cache()
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            fingerprint = dataset_fingerprint(params.pop(dataset))
+            if fingerprint is None or memo.max_entries <= 0:
+                return target(*args, **kwargs)
+            key = make_key(label, fingerprint, params)
+            found, value = memo.lookup(key)
+            if found:
+                return value
+            value = target(*args, **kwargs)
+            memo.put(key, value)
+            return value
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
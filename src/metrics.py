@@ -0,0 +1,254 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+
+# utils сам импортирует этот модуль, поэтому логгер берётся напрямую, без setup_logging
+logger = logging.getLogger(__name__)
+
+PREFIX = "bank"
+# Границы корзин гистограмм в секундах
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Счётчики строк и байт, которые пишут функции модулей
+COUNTERS = {
+    "rows_scanned": "Просмотрено строк",
+    "rows_matched": "Отобрано строк",
+    "bytes_read": "Прочитано байт",
+}
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с фиксированными границами корзин.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """
+        возвращает накопленные значения корзин в виде пар (граница, число наблюдений), последняя - '+Inf'.
+        """
+        result, total = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class MetricsRegistry:
+    """
+    Хранилище метрик процесса: гистограммы длительностей функций и сетевых вызовов,
+    счётчики ошибок, строк и байт. Все изменения выполняются под одной блокировкой.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS, enabled: Optional[bool] = None) -> None:
+        self.buckets = buckets
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._functions: dict[str, Histogram] = {}
+        self._network: dict[str, Histogram] = {}
+        self._errors: dict[tuple[str, str], int] = {}
+        self._counters: dict[tuple[str, str], float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """
+        признак записи метрик; если он не задан явно, при первом обращении читается настройка METRICS_ENABLED.
+        """
+        if self._enabled is None:
+            # utils импортирует этот модуль, поэтому настройка (вместе с файлом .env) читается не при импорте
+            from src.utils import get_setting
+
+            self._enabled = get_setting("METRICS_ENABLED", "1") == "1"
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self._enabled = value
+
+    def observe(self, name: str, seconds: float, network: bool = False) -> None:
+        histograms = self._network if network else self._functions
+        with self._lock:
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def error(self, name: str, network: bool = False) -> None:
+        key = ("network" if network else "function", name)
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def count(self, counter: str, value: float, function: str) -> None:
+        if not self.enabled:
+            return
+        key = (counter, function)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._functions.clear()
+            self._network.clear()
+            self._errors.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        возвращает копию всех метрик в виде словаря, пригодного для JSON.
+        """
+        with self._lock:
+            counters: dict[str, dict[str, float]] = {counter: {} for counter in COUNTERS}
+            for (counter, function), value in sorted(self._counters.items()):
+                counters.setdefault(counter, {})[function] = value
+            errors: dict[str, dict[str, int]] = {"function": {}, "network": {}}
+            for (kind, name), value in sorted(self._errors.items()):
+                errors[kind][name] = value
+            return {
+                "functions": {name: h.to_dict() for name, h in sorted(self._functions.items())},
+                "network": {name: h.to_dict() for name, h in sorted(self._network.items())},
+                "errors": errors,
+                "counters": counters,
+            }
+
+    def to_json(self, indent: Optional[int] = 4) -> str:
+        return json.dumps(self.snapshot(), indent=indent, ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """
+        возвращает метрики в текстовом формате Prometheus.
+        """
+        snapshot = self.snapshot()
+        lines: list[str] = []
+        for kind, label, title in (
+            ("functions", "function", "Длительность вызова функции, с"),
+            ("network", "target", "Длительность сетевого вызова, с"),
+        ):
+            metric = f"{PREFIX}_{'function' if kind == 'functions' else 'network'}_seconds"
+            lines += [f"# HELP {metric} {title}", f"# TYPE {metric} histogram"]
+            for name, histogram in snapshot[kind].items():
+                labels = f'{label}="{_escape(name)}"'
+                for bound, value in histogram["buckets"].items():
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {value}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram['sum']}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram['count']}")
+
+        metric = f"{PREFIX}_errors_total"
+        lines += [f"# HELP {metric} Число вызовов, завершившихся исключением", f"# TYPE {metric} counter"]
+        for kind, values in snapshot["errors"].items():
+            for name, value in values.items():
+                lines.append(f'{metric}{{kind="{kind}",name="{_escape(name)}"}} {value}')
+
+        for counter, values in snapshot["counters"].items():
+            metric = f"{PREFIX}_{counter}_total"
+            lines += [f"# HELP {metric} {COUNTERS.get(counter, counter)}", f"# TYPE {metric} counter"]
+            for function, value in values.items():
+                lines.append(f'{metric}{{function="{_escape(function)}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+def timed(func: Optional[Callable] = None, *, name: Optional[str] = None) -> Any:
+    """
+    Декоратор: записывает длительность вызова (time.perf_counter) в гистограмму функции
+    и считает вызовы, завершившиеся исключением. Исключение логируется и пробрасывается дальше.
+
+    Args:
+        func: Декорируемая функция.
+        name: Имя метрики (по умолчанию - имя функции).
+
+    Returns:
+        Обёрнутая функция.
+    """
+    if func is None:
+        return lambda f: timed(f, name=name)
+    metric = name or func.__name__
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not registry.enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            registry.error(metric)
+            logger.error("Ошибка в функции %s: %s", metric, e)
+            raise
+        finally:
+            registry.observe(metric, time.perf_counter() - start)
+
+    return wrapper
+
+
+@contextmanager
+def network_timer(target: str) -> Iterator[None]:
+    """
+    записывает длительность сетевого вызова target и ошибки этого вызова.
+    """
+    if not registry.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.error(target, network=True)
+        raise
+    finally:
+        registry.observe(target, time.perf_counter() - start, network=True)
+
+
+def count(counter: str, value: float, function: str) -> None:
+    """
+    увеличивает счётчик counter ('rows_scanned', 'rows_matched', 'bytes_read') для функции function.
+    """
+    registry.count(counter, value, function)
+
+
+def snapshot() -> dict[str, Any]:
+    return registry.snapshot()
+
+
+def to_prometheus() -> str:
+    return registry.to_prometheus()
+
+
+def write_snapshot(file_: Any) -> None:
+    """
+    сохраняет снимок метрик в JSON-файл.
+    """
+    with open(file_, "w", encoding="utf-8") as f:
+        f.write(registry.to_json())
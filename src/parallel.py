@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable, Optional
+
+from src.date_index import to_datetime64
+from src.lazy import lazy_import
+from src.query import to_kopecks, top_positions
+from src.store import TransactionStore
+from src.utils import setup_logging, start_logging
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = setup_logging()
+
+# Разделитель полей в общем текстовом буфере: строка поиска его не содержит,
+# поэтому найденное вхождение не может захватить соседнее поле или строку
+TEXT_SEPARATOR = "\x00"
+
+
+def _codes(store: TransactionStore, name: str) -> tuple[np.ndarray, list[Any]]:
+    """
+    возвращает коды int32 и словарь значений колонки (пропуск - код -1).
+    """
+    if store.is_dictionary(name):
+        return store.codes(name)
+    codes, uniques = pd.factorize(store.column(name))
+    return codes.astype(np.int32), uniques.tolist()
+
+
+def _timestamps(store: TransactionStore) -> np.ndarray:
+    """
+    возвращает даты операций в исходном порядке строк как int64 наносекунд (NaT - минимальное int64).
+    """
+    index = store.date_index
+    timestamps = np.empty_like(index.timestamps)
+    timestamps[index.order] = index.timestamps
+    return timestamps.astype("datetime64[ns]").view(np.int64)
+
+
+def _nanoseconds(value: Any) -> int:
+    return int(to_datetime64(value).astype("datetime64[ns]").view(np.int64))
+
+
+def _text(store: TransactionStore) -> tuple[np.ndarray, np.ndarray]:
+    """
+    возвращает тексты 'Категория' и 'Описание' всех строк в нижнем регистре одним буфером UTF-8
+    и смещения строк в нём. Строки с пропуском в любом из полей остаются пустыми - как в SearchIndex.
+    """
+    parts = []
+    offsets = np.zeros(len(store) + 1, dtype=np.int64)
+    for row, (category, description) in enumerate(zip(store.column("Категория"), store.column("Описание"))):
+        if not isinstance(category, float) and not isinstance(description, float):
+            text = f"{category.lower()}{TEXT_SEPARATOR}{description.lower()}{TEXT_SEPARATOR}".encode("utf-8")
+            parts.append(text)
+            offsets[row + 1] = len(text)
+    return np.frombuffer(b"".join(parts), dtype=np.uint8), np.cumsum(offsets)
+
+
+def _period_mask(timestamps: np.ndarray, period: Optional[tuple[int, int]]) -> np.ndarray:
+    if period is None:
+        return np.ones(len(timestamps), dtype=bool)
+    return (timestamps >= period[0]) & (timestamps <= period[1])
+
+
+def _card_partial(
+    columns: dict[str, np.ndarray], lo: int, hi: int, period: Optional[tuple[int, int]], size: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    возвращает суммы в копейках, число строк и число пропусков суммы по каждому коду карты в шарде [lo, hi).
+    """
+    codes = columns["cards"][lo:hi]
+    selected = (codes >= 0) & _period_mask(columns["timestamps"][lo:hi], period)
+    sums = np.bincount(codes[selected], weights=columns["kopecks"][lo:hi][selected], minlength=size)
+    missing = np.bincount(codes[selected], weights=np.isnan(columns["amounts"][lo:hi][selected]), minlength=size)
+    return sums.astype(np.int64), np.bincount(codes[selected], minlength=size), missing
+
+
+def _category_partial(
+    columns: dict[str, np.ndarray], lo: int, hi: int, codes: list[int], starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    """
+    возвращает суммы в копейках за окна [starts, ends] для каждой категории в шарде [lo, hi):
+    матрица категорий x дат, как в 'search_categories'.
+    """
+    categories = columns["categories"][lo:hi]
+    timestamps = columns["timestamps"][lo:hi]
+    kopecks = columns["kopecks"][lo:hi]
+    result = np.zeros((len(codes), len(ends)), dtype=np.int64)
+    for i, code in enumerate(codes):
+        rows = np.flatnonzero(categories == code)
+        order = np.argsort(timestamps[rows], kind="stable")
+        category_timestamps = timestamps[rows][order]
+        prefix = np.concatenate(([0], np.cumsum(kopecks[rows][order])))
+        low = np.searchsorted(category_timestamps, starts, side="left")
+        high = np.searchsorted(category_timestamps, ends, side="right")
+        result[i] = prefix[high] - prefix[low]
+    return result
+
+
+def _top_partial(
+    columns: dict[str, np.ndarray], lo: int, hi: int, period: Optional[tuple[int, int]], n: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    возвращает позиции и суммы n строк шарда [lo, hi) с наибольшей суммой операции.
+    """
+    rows = np.flatnonzero(_period_mask(columns["timestamps"][lo:hi], period))
+    amounts = columns["amounts"][lo:hi][rows]
+    order = top_positions(amounts, n)
+    return rows[order] + lo, amounts[order]
+
+
+def _search_partial(columns: dict[str, np.ndarray], lo: int, hi: int, query: bytes) -> np.ndarray:
+    """
+    возвращает позиции строк шарда [lo, hi), в тексте которых есть query.
+    """
+    offsets = columns["text_offsets"]
+    base = int(offsets[lo])
+    text = columns["text"][base : int(offsets[hi])].tobytes()
+    shard_offsets = offsets[lo : hi + 1] - base
+    rows = []
+    position = text.find(query)
+    while position >= 0:
+        row = int(np.searchsorted(shard_offsets, position, side="right")) - 1
+        rows.append(lo + row)
+        # Остальные вхождения в той же строке не нужны
+        position = text.find(query, int(shard_offsets[row + 1]))
+    return np.array(rows, dtype=np.int64)
+
+
+def _run_shard(task: Callable, spec: dict[str, tuple[str, str, tuple[int, ...]]], *args: Any) -> Any:
+    """
+    выполняет task в процессе пула над колонками, подключёнными из разделяемой памяти без копирования.
+    """
+    blocks = [shared_memory.SharedMemory(name=shm_name) for shm_name, _, _ in spec.values()]
+    columns = {
+        name: np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        for (name, (_, dtype, shape)), block in zip(spec.items(), blocks)
+    }
+    try:
+        return task(columns, *args)
+    finally:
+        columns.clear()
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Ссылку на буфер держит трассировка исключения; память освободится с процессом
+                pass
+
+
+class ShardedStore:
+    """
+    Колонки TransactionStore в разделяемой памяти и пул процессов для вычислений по шардам.
+
+    Нужные для агрегатов колонки (коды карт и категорий, даты, суммы, текст для поиска) копируются
+    в блоки multiprocessing.shared_memory один раз; процессы пула подключаются к ним по имени и
+    получают в задаче только границы шарда и параметры - строки не сериализуются. Частичные результаты
+    шардов объединяются в родительском процессе.
+
+    Суммы считаются в целых копейках, как и в последовательном варианте, поэтому не зависят
+    от разбиения на шарды и совпадают с ним полностью; топ и поиск тоже совпадают.
+    """
+
+    def __init__(self, store: TransactionStore, workers: Optional[int] = None, shards: Optional[int] = None) -> None:
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = max(1, min(shards or self.workers, len(store)))
+        self._blocks: list[shared_memory.SharedMemory] = []
+        self._spec: dict[str, tuple[str, str, tuple[int, ...]]] = {}
+        self._arrays: dict[str, np.ndarray] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._bounds = np.linspace(0, len(store), self.shards + 1).astype(int).tolist()
+
+        amounts = np.asarray(store.column("Сумма операции"), dtype=float)
+        self._card_codes, self._cards = _codes(store, "Номер карты")
+        self._category_codes, self._categories = _codes(store, "Категория")
+        self._share("cards", self._card_codes)
+        self._share("categories", self._category_codes)
+        self._share("timestamps", _timestamps(store))
+        self._share("amounts", amounts)
+        self._share("kopecks", to_kopecks(amounts))
+
+    def _share(self, name: str, array: np.ndarray) -> None:
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[...] = array
+        self._blocks.append(block)
+        self._arrays[name] = shared
+        self._spec[name] = (block.name, array.dtype.str, array.shape)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __enter__(self) -> "ShardedStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        останавливает пул и освобождает разделяемую память.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._arrays.clear()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+    def _map(self, task: Callable, *args: Any) -> list[Any]:
+        """
+        выполняет task над каждым шардом и возвращает частичные результаты в порядке шардов.
+        С одним процессом шарды обрабатываются в текущем процессе, без пула.
+        """
+        shards = list(zip(self._bounds[:-1], self._bounds[1:]))
+        if self.workers == 1:
+            return [task(self._arrays, lo, hi, *args) for lo, hi in shards]
+        if self._executor is None:
+            start_logging()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        futures = [self._executor.submit(_run_shard, task, self._spec, lo, hi, *args) for lo, hi in shards]
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def _period(start_date: Optional[str], end_date: Optional[str]) -> Optional[tuple[int, int]]:
+        if not (start_date and end_date):
+            return None
+        return _nanoseconds(start_date), _nanoseconds(end_date)
+
+    def card_totals(
+        self, cards: list[str], start_date: Optional[str] = None, end_date: Optional[str] = None
+    ) -> list[float]:
+        """
+        возвращает суммы операций по картам за период, как 'card_totals'.
+        """
+        partials = self._map(_card_partial, self._period(start_date, end_date), len(self._cards))
+        sums = sum(partial[0] for partial in partials)
+        counts = sum(partial[1] for partial in partials)
+        missing = sum(partial[2] for partial in partials)
+        positions = {value: i for i, value in enumerate(self._cards)}
+        totals: list[float] = []
+        for card in cards:
+            i = positions.get(card)
+            if not (card and i is not None and counts[i]):
+                totals.append(0)
+            else:
+                # Пропуск суммы в любом шарде даёт nan, как в последовательном варианте
+                totals.append(np.nan if missing[i] else int(sums[i]) / 100)
+        return totals
+
+    def category_totals(self, categories: Iterable[str], dates: Iterable[Any], days: int = 90) -> pd.DataFrame:
+        """
+        возвращает суммы операций по категориям за окна [дата - days, дата], как 'search_categories'.
+        """
+        categories = list(categories)
+        anchors = pd.DatetimeIndex([pd.Timestamp(date) for date in dates])
+        ends = anchors.to_numpy().astype("datetime64[ns]").view(np.int64)
+        starts = (anchors - timedelta(days=days)).to_numpy().astype("datetime64[ns]").view(np.int64)
+        positions = {value: i for i, value in enumerate(self._categories)}
+        codes = [positions.get(category, -2) for category in categories]
+        totals = sum(self._map(_category_partial, codes, starts, ends))
+        report = pd.DataFrame(
+            {category: -totals[i] / 100 for i, category in enumerate(categories)}, index=anchors, columns=categories
+        )
+        return report + 0.0
+
+    def top_rows(self, n: int, start_date: Optional[str] = None, end_date: Optional[str] = None) -> np.ndarray:
+        """
+        возвращает позиции n строк за период с наибольшей суммой операции, по убыванию суммы.
+        При равных суммах порядок исходный, как у устойчивой сортировки всей выборки.
+        """
+        partials = self._map(_top_partial, self._period(start_date, end_date), n)
+        rows = np.concatenate([partial[0] for partial in partials])
+        amounts = np.concatenate([partial[1] for partial in partials])
+        # Кандидаты шардов идут в порядке строк, поэтому равные суммы остаются в исходном порядке
+        return rows[top_positions(amounts, n)]
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        возвращает позиции строк, где query входит в категорию или описание (без учёта регистра).
+        """
+        if not query:
+            return np.array([], dtype=np.int64)
+        if "text" not in self._spec:
+            # Текстовый буфер нужен только поиску, поэтому строится при первом запросе
+            text, offsets = _text(self.store)
+            self._share("text", text)
+            self._share("text_offsets", offsets)
+        return np.concatenate(self._map(_search_partial, query.lower().encode("utf-8")))
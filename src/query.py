@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Optional
+
+from src.date_index import DATE_FORMAT, to_datetime64
+from src.lazy import lazy_import
+from src.store import TransactionStore
+from src.utils import setup_logging
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = setup_logging()
+
+DATE_COLUMN = "Дата операции"
+AMOUNT_COLUMN = "Сумма операции"
+# Поля, по которым ищет 'contains' - как 'filter_state' и SearchIndex
+TEXT_COLUMNS = ("Категория", "Описание")
+
+
+def _values(data: Any, name: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    возвращает значения колонки name в строках rows (None - во всех строках) в виде массива.
+    Для колонок-словарей TransactionStore раскодируются только выбранные строки.
+    """
+    if isinstance(data, TransactionStore):
+        if data.is_dictionary(name):
+            codes, values = data.codes(name)
+            codes = codes if rows is None else codes[rows]
+            return np.array(values + [np.nan], dtype=object).take(codes)
+        column = data.column(name)
+    elif isinstance(data, pd.DataFrame):
+        column = data[name].to_numpy()
+    else:
+        indices = range(len(data)) if rows is None else rows.tolist()
+        # Строка без поля: текст считается пустым (как 'operation.get(..., "")'), остальное - пропуском
+        default = "" if name in TEXT_COLUMNS else np.nan
+        return np.array([data[i].get(name, default) for i in indices], dtype=object)
+    return column if rows is None else column[rows]
+
+
+def _records(data: Any, rows: np.ndarray, columns: Optional[tuple[str, ...]]) -> list[Any]:
+    """
+    возвращает строки rows в виде словарей (только колонки columns, если они заданы).
+    Без проекции для списка словарей возвращаются исходные объекты.
+    """
+    if isinstance(data, TransactionStore):
+        if columns is None:
+            return data.to_records(rows)
+        return [{name: data.value(name, i) for name in columns} for i in rows.tolist()]
+    if isinstance(data, pd.DataFrame):
+        frame = data.iloc[rows]
+        return (frame if columns is None else frame[list(columns)]).to_dict("records")
+    if columns is None:
+        return [data[i] for i in rows.tolist()]
+    return [{name: data[i][name] for name in columns} for i in rows.tolist()]
+
+
+def _parse_dates(values: np.ndarray) -> np.ndarray:
+    """
+    возвращает даты операций как datetime64; строки разбираются один раз для всей колонки.
+    """
+    if values.dtype.kind == "M":
+        return values
+    try:
+        return pd.to_datetime(pd.Series(values), format=DATE_FORMAT).to_numpy()
+    except ValueError:
+        return pd.to_datetime(pd.Series(values), dayfirst=True).to_numpy()
+
+
+def _text_mask(categories: np.ndarray, descriptions: np.ndarray, text: str) -> np.ndarray:
+    """
+    возвращает маску строк, где text входит в категорию или описание; строки с пропуском не подходят.
+    """
+    return np.array(
+        [
+            not isinstance(category, float)
+            and not isinstance(description, float)
+            and (text in category.lower() or text in description.lower())
+            for category, description in zip(categories, descriptions)
+        ],
+        dtype=bool,
+    )
+
+
+def sequential_sum(values: Any, skipna: bool = False) -> Any:
+    """
+    возвращает сумму значений, накопленную по порядку (как цикл 'total += amount'),
+    а не попарно, как numpy.sum - поэтому результат совпадает с построчным суммированием.
+    Для пустого набора возвращается 0.
+    """
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = values.astype(float)
+    if skipna and values.dtype.kind == "f":
+        values = values[~np.isnan(values)]
+    if not len(values):
+        return 0
+    return np.cumsum(values)[-1].item()
+
+
+def to_kopecks(values: Any) -> np.ndarray:
+    """
+    возвращает суммы в целых копейках (int64), каждая округляется отдельно; пропуск - 0.
+    """
+    return np.rint(np.nan_to_num(np.asarray(values, dtype=float)) * 100).astype(np.int64)
+
+
+def top_positions(values: Any, n: int, codes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    возвращает позиции не более n наибольших значений каждой группы: сначала по коду группы,
+    внутри группы - по убыванию значения, при равенстве - в исходном порядке, как у list.sort(reverse=True).
+    codes - коды групп (None - одна группа), строки с кодом -1 не учитываются; nan меньше любого числа.
+
+    Полной сортировки нет: за n проходов частичного выбора находится порог каждой группы
+    (n-е по величине различное значение), и упорядочиваются только строки не ниже порога.
+    """
+    values = np.asarray(values, dtype=float)
+    values = np.where(np.isnan(values), -np.inf, values)
+    if codes is None:
+        codes = np.zeros(len(values), dtype=np.int64)
+    codes = np.asarray(codes, dtype=np.int64)
+    remaining = codes >= 0
+    if n <= 0 or not remaining.any():
+        return np.array([], dtype=np.int64)
+    size = int(codes.max()) + 1
+    groups = np.where(remaining, codes, 0)
+    threshold = np.full(size, -np.inf)
+    for _ in range(n):
+        present = np.bincount(groups[remaining], minlength=size) > 0
+        if not present.any():
+            break
+        current = np.full(size, -np.inf)
+        np.maximum.at(current, groups[remaining], values[remaining])
+        threshold = np.where(present, current, threshold)
+        remaining &= values < current[groups]
+    candidates = np.flatnonzero((codes >= 0) & (values >= threshold[groups]))
+    candidates = candidates[np.lexsort((candidates, -values[candidates], codes[candidates]))]
+    candidate_codes = codes[candidates]
+    starts = np.flatnonzero(np.r_[True, candidate_codes[1:] != candidate_codes[:-1]])
+    ranks = np.arange(len(candidates)) - np.repeat(starts, np.diff(np.r_[starts, len(candidates)]))
+    return candidates[ranks < n]
+
+
+class Query:
+    """
+    Ленивый запрос к операциям: список словарей, DataFrame или TransactionStore.
+
+    Условия (период, равенство значения колонки, подстрока в категории или описании), проекция,
+    агрегаты и топ-k задаются цепочкой методов. Каждый метод возвращает новый запрос, данные
+    при этом не просматриваются. План выполняется один раз, при первом терминальном методе
+    (rows, count, records, sum, group_sum, top): сначала индексы TransactionStore сужают набор строк,
+    затем остальные условия проверяются только на оставшихся строках, и колонки читаются только в них.
+
+        Query(store).where("Номер карты", "*7197").where("Категория", "Супермаркеты").last_days(30).sum()
+    """
+
+    __slots__ = ("_data", "_start", "_end", "_equals", "_texts", "_columns", "_rows")
+
+    def __init__(self, data: Any) -> None:
+        self._data = data
+        self._start: Optional[np.datetime64] = None
+        self._end: Optional[np.datetime64] = None
+        self._equals: tuple[tuple[str, Any], ...] = ()
+        self._texts: tuple[str, ...] = ()
+        self._columns: Optional[tuple[str, ...]] = None
+        self._rows: Optional[np.ndarray] = None
+
+    def _derive(self, **changes: Any) -> "Query":
+        query = Query(self._data)
+        for name in ("start", "end", "equals", "texts", "columns"):
+            setattr(query, f"_{name}", changes.get(name, getattr(self, f"_{name}")))
+        return query
+
+    def period(self, start: Any, end: Any) -> "Query":
+        """
+        оставляет операции с датой в [start, end]; границы - datetime, pd.Timestamp или 'DD.MM.YYYY'.
+        Если одна из границ не задана, период не ограничивается - как в 'sum_amount_of_card'.
+        Несколько периодов пересекаются.
+        """
+        if not (start and end):
+            return self
+        start, end = to_datetime64(start), to_datetime64(end)
+        if self._start is not None:
+            start, end = max(start, self._start), min(end, self._end)
+        return self._derive(start=start, end=end)
+
+    def last_days(self, days: int, anchor: Optional[Any] = None) -> "Query":
+        """
+        оставляет операции за days дней до anchor включительно (по умолчанию - сейчас).
+        """
+        end = pd.Timestamp(anchor) if anchor is not None else pd.Timestamp.now()
+        return self.period(end - timedelta(days=days), end)
+
+    def where(self, column: str, value: Any) -> "Query":
+        """
+        оставляет операции, у которых значение колонки равно value.
+        """
+        return self._derive(equals=self._equals + ((column, value),))
+
+    def contains(self, text: str) -> "Query":
+        """
+        оставляет операции, где text входит в категорию или описание (без учёта регистра).
+        Строки с пропуском в любом из полей и пустой text не подходят - как в SearchIndex.
+        """
+        return self._derive(texts=self._texts + (text.lower(),))
+
+    def select(self, *columns: str) -> "Query":
+        """
+        задаёт колонки, которые попадут в результат records и top.
+        """
+        return self._derive(columns=columns)
+
+    def explain(self) -> list[str]:
+        """
+        возвращает шаги плана в порядке выполнения и способ выполнения каждого.
+        """
+        store = isinstance(self._data, TransactionStore)
+        steps = []
+        if self._start is not None:
+            how = "date_index" if store else f"scan '{DATE_COLUMN}'"
+            steps.append(f"period [{self._start}, {self._end}]: {how}")
+        for column, value in self._equals:
+            how = "dictionary codes" if store and self._data.is_dictionary(column) else "scan"
+            steps.append(f"{column} == {value!r}: {how}")
+        narrowed = self._start is not None or bool(self._equals)
+        for text in self._texts:
+            how = "search_index" if self._use_search_index(not narrowed) else "scan"
+            steps.append(f"contains {text!r}: {how}")
+            narrowed = True
+        return steps
+
+    def _use_search_index(self, all_rows: bool) -> bool:
+        # Построение поискового индекса дороже проверки нескольких строк, поэтому без готового
+        # индекса он строится, только если иначе пришлось бы проверять все строки.
+        data = self._data
+        return isinstance(data, TransactionStore) and (all_rows or data.has_search_index())
+
+    def _period_rows(self) -> np.ndarray:
+        data = self._data
+        if isinstance(data, TransactionStore):
+            return data.date_index.between(self._start, self._end)
+        dates = _parse_dates(_values(data, DATE_COLUMN))
+        return np.flatnonzero((dates >= self._start) & (dates <= self._end))
+
+    def _equal_rows(self, rows: Optional[np.ndarray], column: str, value: Any) -> np.ndarray:
+        data = self._data
+        if isinstance(data, TransactionStore):
+            mask = data.equals(column, value, rows)
+        else:
+            mask = np.asarray(_values(data, column, rows) == value, dtype=bool)
+        return np.flatnonzero(mask) if rows is None else rows[mask]
+
+    def _text_rows(self, rows: Optional[np.ndarray], text: str) -> np.ndarray:
+        data = self._data
+        if not text:
+            return np.array([], dtype=np.int64)
+        if self._use_search_index(rows is None):
+            found = data.search_index.search(text)
+            return found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        category, description = (_values(data, column, rows) for column in TEXT_COLUMNS)
+        mask = _text_mask(category, description, text)
+        return np.flatnonzero(mask) if rows is None else rows[mask]
+
+    def rows(self) -> np.ndarray:
+        """
+        возвращает позиции подходящих строк в исходном порядке; план выполняется один раз.
+        """
+        if self._rows is not None:
+            return self._rows
+        data = self._data
+        rows = None
+        if data is None or len(data) == 0:
+            rows = np.array([], dtype=np.int64)
+        elif self._start is not None:
+            rows = self._period_rows()
+        for column, value in self._equals:
+            if rows is not None and not len(rows):
+                break
+            rows = self._equal_rows(rows, column, value)
+        for text in self._texts:
+            if rows is not None and not len(rows):
+                break
+            rows = self._text_rows(rows, text)
+        self._rows = np.arange(len(data)) if rows is None else rows
+        logger.debug("Запрос %s: %s строк", self.explain(), len(self._rows))
+        return self._rows
+
+    def count(self) -> int:
+        """
+        возвращает число подходящих строк.
+        """
+        return len(self.rows())
+
+    def records(self, positions: Optional[np.ndarray] = None) -> list[Any]:
+        """
+        возвращает подходящие строки в исходном порядке (или строки с номерами positions среди них)
+        в виде словарей.
+        """
+        rows = self.rows() if positions is None else self.rows()[positions]
+        return _records(self._data, rows, self._columns)
+
+    def values(self, column: str) -> np.ndarray:
+        """
+        возвращает значения колонки в подходящих строках.
+        """
+        return _values(self._data, column, self.rows())
+
+    def dates(self) -> np.ndarray:
+        """
+        возвращает даты операций подходящих строк как datetime64; для TransactionStore - из индекса дат.
+        """
+        if isinstance(self._data, TransactionStore):
+            index = self._data.date_index
+            timestamps = np.empty_like(index.timestamps)
+            timestamps[index.order] = index.timestamps
+            return timestamps[self.rows()]
+        return _parse_dates(self.values(DATE_COLUMN))
+
+    def sum(self, column: str = AMOUNT_COLUMN, skipna: bool = False, kopecks: bool = False) -> Any:
+        """
+        возвращает сумму колонки по подходящим строкам, накопленную в исходном порядке строк.
+        kopecks=True - сумма считается в целых копейках и возвращается в рублях: без ошибки округления
+        и независимо от порядка строк, как в 'search_categories'. Пропуск, как и без kopecks,
+        даёт nan, а при skipna=True не учитывается.
+        """
+        values = _values(self._data, column, self.rows())
+        if kopecks:
+            values = np.asarray(values, dtype=float)
+            if not skipna and np.isnan(values).any():
+                return np.nan
+            return int(to_kopecks(values).sum()) / 100
+        return sequential_sum(values, skipna)
+
+    def group_sum(self, by: str, column: str = AMOUNT_COLUMN, kopecks: bool = False) -> dict[Any, float]:
+        """
+        возвращает суммы колонки по значениям колонки by (пропуски в by не учитываются).
+        В результат попадают только значения, у которых есть подходящие строки.
+        kopecks=True - суммы считаются в целых копейках, как в 'sum'; сумма группы с пропуском - nan.
+        """
+        data, rows = self._data, self.rows()
+        if isinstance(data, TransactionStore) and data.is_dictionary(by):
+            codes, keys = data.codes(by)
+            codes = codes[rows]
+        else:
+            codes, uniques = pd.factorize(_values(data, by, rows))
+            keys = uniques.tolist()
+        amounts = np.asarray(_values(data, column, rows), dtype=float)
+        selected = codes >= 0
+        if kopecks:
+            missing = np.bincount(codes[selected], weights=np.isnan(amounts[selected]), minlength=len(keys)) > 0
+            amounts = to_kopecks(amounts)
+        counts = np.bincount(codes[selected], minlength=len(keys))
+        sums = np.bincount(codes[selected], weights=amounts[selected], minlength=len(keys))
+        if kopecks:
+            # Целые копейки меньше 2**53 складываются в float64 без потерь
+            sums = np.where(missing, np.nan, sums / 100)
+        return {key: float(total) for key, total, used in zip(keys, sums, counts) if used}
+
+    def top(self, n: int, by: str = AMOUNT_COLUMN) -> list[Any]:
+        """
+        возвращает n подходящих строк с наибольшим значением колонки by, по убыванию.
+        Порядок как у list.sort(reverse=True): при равенстве сохраняется исходный порядок.
+        """
+        return self.records(top_positions(self.values(by), n))
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src.utils import setup_logging
+
+logger = setup_logging()
+
+FRESH = "fresh"
+STALE = "stale"
+MISSING = "missing"
+
+
+class QuoteCache:
+    """
+    Кэш котировок с временем жизни записи (TTL), вытеснением LRU и сохранением на диск.
+
+    В режиме stale_while_revalidate устаревшее значение возвращается сразу,
+    а обновление запускается в фоновом потоке.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        ttls: Optional[dict[str, float]] = None,
+        max_size: int = 256,
+        path: Optional[Any] = None,
+        stale_while_revalidate: bool = False,
+    ) -> None:
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_size = max_size
+        self.path = Path(path) if path is not None else None
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._refreshing: set[str] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"hits": 0, "misses": 0, "stale_hits": 0, "refreshes": 0, "evictions": 0}
+        self._load()
+
+    def ttl_for(self, key: str) -> float:
+        return self.ttls.get(key, self.ttl)
+
+    def lookup(self, key: str) -> tuple[Any, str]:
+        """
+        возвращает значение и его состояние: FRESH, STALE (только в режиме stale_while_revalidate) или MISSING.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, MISSING
+            value, fetched_at = entry
+            self._entries.move_to_end(key)
+            if time.time() - fetched_at < self.ttl_for(key):
+                self._stats["hits"] += 1
+                return value, FRESH
+            if self.stale_while_revalidate:
+                self._stats["stale_hits"] += 1
+                return value, STALE
+            self._stats["misses"] += 1
+            return None, MISSING
+
+    def put(self, key: str, value: Any, fetched_at: Optional[float] = None) -> None:
+        """
+        сохраняет значение, при переполнении вытесняет давно не использованные записи.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.time() if fetched_at is None else fetched_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._save()
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        возвращает значение из кэша или загружает его через loader.
+        """
+        value, state = self.lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self.refresh(key, loader)
+            return value
+        value = loader()
+        self.put(key, value)
+        return value
+
+    def refresh(self, key: str, loader: Callable[[], Any]) -> None:
+        """
+        обновляет значение в фоновом потоке; повторные запросы на ту же запись не дублируются.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="quote-refresh")
+            self._stats["refreshes"] += 1
+        self._executor.submit(self._refresh, key, loader)
+
+    def _refresh(self, key: str, loader: Callable[[], Any]) -> None:
+        try:
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+        except Exception as e:
+            logger.error("Ошибка фонового обновления %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> dict[str, int]:
+        """
+        возвращает счётчики попаданий и промахов.
+        """
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def wait(self) -> None:
+        """
+        дожидается завершения фоновых обновлений.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            for key, (value, fetched_at) in stored.items():
+                self._entries[key] = (value, float(fetched_at))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Не удалось прочитать кэш котировок %s: %s", self.path, e)
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({key: list(entry) for key, entry in self._entries.items()}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error("Не удалось сохранить кэш котировок %s: %s", self.path, e)
@@ -1,73 +1,129 @@
+from __future__ import annotations
+
 import json
-import time
 from datetime import datetime, timedelta
-from typing import Any, Optional, Callable
-from functools import wraps
-
-import pandas as pd
-
+from typing import Any, Iterable, Optional
+
+from src import metrics
+from src.incremental import IncrementalAggregates
+from src.lazy import lazy_import
+from src.memo import memoize
+from src.parallel import ShardedStore
+from src.query import Query, to_kopecks
+from src.store import TransactionStore
 from src.utils import read_files, setup_logging
 
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
 logger = setup_logging()
 
 
-def log_execution_time(func: Callable) -> Callable:
+@metrics.timed
+def search_category(transactions: pd.DataFrame, category: str, date: Optional[pd.Timestamp] = None) -> dict[str, Any]:
     """
-    Декоратор для логирования времени выполнения функции и обработки ошибок.
+    Возвращает сумму операций по указанной категории за последние 90 дней.
 
     Args:
-        func: Декорируемая функция.
+        transactions: DataFrame с данными транзакций, TransactionStore
+            (для него период находится по индексу дат без просмотра всех строк)
+            IncrementalAggregates (сумма берётся из дневных агрегатов)
+            или ShardedStore (сумма считается по шардам в процессах пула).
+        category: Категория для фильтрации.
+        date: Дата, от которой отсчитывается период (по умолчанию - текущая дата).
 
     Returns:
-        Обёрнутая функция.
+        Словарь с категорией и общей суммой операций. Сумма считается в целых копейках,
+        поэтому совпадает с 'search_categories' и не накапливает ошибку округления.
     """
+    result = {"category": category, "total": 0.0}
+    if isinstance(transactions, IncrementalAggregates):
+        if date is not None:
+            date = pd.Timestamp(date).to_pydatetime()
+        result["total"] = transactions.category_total(category, date)
+        logger.info("Result - %s", result)
+        return result
 
-    @wraps(func)
-    def wrapper(*args, **kwargs) -> Any:
-        start_time = time.time()
-        try:
-            result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            logger.info(f"Функция {func.__name__} выполнена за {execution_time:.4f} секунд")
-            return result
-        except Exception as e:
-            logger.error(f"Ошибка в функции {func.__name__}: {str(e)}")
-            raise
-
-    return wrapper
+    if date is None:
+        # Текущее время в ключе не повторяется, поэтому результат для даты по умолчанию не кэшируется
+        return _category_total.__wrapped__(transactions, category, pd.to_datetime("today"))
+    return _category_total(transactions, category, date)
 
 
-@log_execution_time
-def search_category(transactions: pd.DataFrame, category: str, date: Optional[pd.Timestamp] = None) -> dict[str, Any]:
+@memoize
+def _category_total(transactions: Any, category: str, date: Any) -> dict[str, Any]:
     """
-    Возвращает сумму операций по указанной категории за последние 90 дней.
+    возвращает результат 'search_category' для заданной даты; кэшируется по отпечатку данных.
+    """
+    result = {"category": category, "total": 0.0}
+    if isinstance(transactions, ShardedStore):
+        result["total"] = float(transactions.category_totals([category], [date]).iloc[0, 0])
+        logger.info("Result - %s", result)
+        return result
+
+    query = Query(transactions).where("Категория", category).last_days(90, date)
+    metrics.count("rows_scanned", len(transactions), "search_category")
+    metrics.count("rows_matched", query.count(), "search_category")
+    if query.count():
+        result["total"] = -query.sum(skipna=True, kopecks=True) + 0.0
+
+    logger.info("Result - %s", result)
+    return result
 
-    Args:
-        transactions: DataFrame с данными транзакций.
-        category: Категория для фильтрации.
-        date: Дата, от которой отсчитывается период (по умолчанию - текущая дата).
 
-    Returns:
-        Словарь с категорией и общей суммой операций.
+@metrics.timed
+def search_categories(
+    transactions: Any, categories: Iterable[str], dates: Iterable[Any], days: int = 90
+) -> pd.DataFrame:
     """
-    transactions = pd.DataFrame(transactions)
-    if date is None:
-        date = pd.to_datetime("today")
-    result = {"category": category, "total": 0.0}
+    Возвращает суммы операций для многих категорий и многих дат за один проход.
 
-    transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], dayfirst=True)
-    filtered_transactions = transactions[
-        (transactions["Дата операции"] >= date - timedelta(days=90))
-        & (transactions["Дата операции"] <= date)
-        & (transactions["Категория"] == category)
-    ]
+    Для каждой категории строки сортируются по дате и накапливаются префиксные суммы
+    (в копейках, поэтому без накопления ошибки округления); сумма за окно [дата - days, дата]
+    находится бинарным поиском границ. Значения совпадают с 'search_category'.
 
-    if not filtered_transactions.empty:
-        total = -filtered_transactions["Сумма операции"].sum()
-        result["total"] = total
+    Args:
+        transactions: DataFrame, список словарей, TransactionStore или ShardedStore.
+        categories: Категории для отчёта.
+        dates: Даты, от которых отсчитывается период.
+        days: Длина периода в днях.
 
-    logger.info(f"Result - {result}")
-    return result
+    Returns:
+        DataFrame: строки - даты, колонки - категории, значения - суммы со знаком как в 'search_category'.
+    """
+    if isinstance(transactions, ShardedStore):
+        return transactions.category_totals(categories, dates, days)
+
+    categories = list(categories)
+    anchors = pd.DatetimeIndex([pd.Timestamp(date) for date in dates])
+    if isinstance(transactions, TransactionStore):
+        index = transactions.date_index
+        timestamps = index.timestamps
+        category_column = transactions.column("Категория")[index.order]
+        amounts = transactions.column("Сумма операции")[index.order]
+    else:
+        frame = pd.DataFrame(transactions)
+        parsed = pd.to_datetime(frame["Дата операции"], dayfirst=True).to_numpy()
+        order = np.argsort(parsed, kind="stable")
+        timestamps = parsed[order]
+        category_column = frame["Категория"].to_numpy(dtype=object)[order]
+        amounts = frame["Сумма операции"].to_numpy(dtype=float)[order]
+
+    metrics.count("rows_scanned", len(timestamps), "search_categories")
+    kopecks = to_kopecks(amounts)
+    ends = anchors.to_numpy()
+    starts = (anchors - timedelta(days=days)).to_numpy()
+    result = {}
+    for category in categories:
+        rows = category_column == category
+        category_timestamps = timestamps[rows]
+        prefix = np.concatenate(([0], np.cumsum(kopecks[rows])))
+        low = np.searchsorted(category_timestamps, starts, side="left")
+        high = np.searchsorted(category_timestamps, ends, side="right")
+        result[category] = -(prefix[high] - prefix[low]) / 100
+    report = pd.DataFrame(result, index=anchors, columns=categories)
+    logger.info("Отчёт 'search_categories': %s категорий x %s дат", len(categories), len(anchors))
+    return report + 0.0
 
 
 def reports_() -> None:
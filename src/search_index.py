@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Iterable, Sequence
+
+from src.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    возвращает множество триграмм строки.
+    """
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Поисковый индекс по полям 'Категория' и 'Описание'.
+
+    Тексты приводятся к нижнему регистру один раз при построении, строки с пропуском (nan)
+    в любом из полей в индекс не попадают - как в 'filter_state'. Запрос длиной от трёх символов
+    отбирает кандидатов пересечением списков триграмм и проверяет только их.
+    """
+
+    __slots__ = ("rows", "categories", "descriptions", "postings")
+
+    def __init__(self, categories: Sequence[Any], descriptions: Sequence[Any]) -> None:
+        rows = []
+        self.categories: list[str] = []
+        self.descriptions: list[str] = []
+        postings: dict[str, list[int]] = defaultdict(list)
+        for row, (category, description) in enumerate(zip(categories, descriptions)):
+            if isinstance(category, float) or isinstance(description, float):
+                continue
+            category, description = category.lower(), description.lower()
+            for trigram in trigrams(category) | trigrams(description):
+                postings[trigram].append(len(rows))
+            rows.append(row)
+            self.categories.append(category)
+            self.descriptions.append(description)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.postings = {trigram: np.array(ids, dtype=np.int32) for trigram, ids in postings.items()}
+
+    @classmethod
+    def from_records(cls, operations: Iterable[dict[str, Any]]) -> "SearchIndex":
+        operations = list(operations)
+        return cls(
+            [operation.get("Категория", "") for operation in operations],
+            [operation.get("Описание", "") for operation in operations],
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        if len(query) < 3:
+            return range(len(self.rows))
+        lists = []
+        for trigram in trigrams(query):
+            ids = self.postings.get(trigram)
+            if ids is None:
+                return []
+            lists.append(ids)
+        lists.sort(key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+            if not len(result):
+                break
+        return result.tolist()
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        возвращает позиции исходных строк, где query входит в категорию или описание (без учёта регистра).
+        """
+        if not query:
+            return np.array([], dtype=np.int64)
+        query = query.lower()
+        matched = [i for i in self._candidates(query) if query in self.categories[i] or query in self.descriptions[i]]
+        return self.rows[np.array(matched, dtype=np.int64)]
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from src import metrics
+from src.reports import search_category
+from src.services import filter_state
+from src.store import TransactionStore
+from src.utils import read_files, setup_logging
+from src.views import card_info, create_operations, send_greeting
+
+logger = setup_logging()
+
+MAX_HEADER_LINES = 100
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def jsonable(value: Any) -> Any:
+    """
+    приводит результат к виду, пригодному для JSON: nan -> None, кортежи -> списки.
+    """
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if hasattr(value, "item"):
+        return jsonable(value.item())
+    return value
+
+
+class DatasetRegistry:
+    """
+    Держит загруженные выписки в памяти и перечитывает файл, только если он изменился
+    (по времени изменения и размеру). Пути ограничены каталогом data_dir.
+    """
+
+    def __init__(self, data_dir: Any) -> None:
+        self.data_dir = Path(data_dir).resolve()
+        self._datasets: dict[Path, tuple[tuple[int, int], TransactionStore]] = {}
+        self._locks: dict[Path, asyncio.Lock] = {}
+
+    def resolve(self, name: str) -> Path:
+        path = (self.data_dir / name).resolve()
+        if not path.is_relative_to(self.data_dir) or path.suffix.lower() != ".xlsx":
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Недопустимый файл")
+        if not path.is_file():
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Файл не найден")
+        return path
+
+    async def get(self, name: str, run: Callable) -> TransactionStore:
+        path = self.resolve(name)
+        lock = self._locks.setdefault(path, asyncio.Lock())
+        async with lock:
+            stat = path.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+            cached = self._datasets.get(path)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            store = await run(partial(read_files, path, output="store"))
+            self._datasets[path] = (key, store)
+            logger.info("Загружен набор данных %s: %s строк", path, len(store))
+            return store
+
+
+def _operations(store: TransactionStore, params: dict[str, str]) -> Any:
+    greeting = send_greeting(params.get("time") or None)
+    return create_operations(
+        greeting, card_info(store), store, params.get("start_date") or None, params.get("end_date") or None
+    )
+
+
+def _search(store: TransactionStore, params: dict[str, str]) -> Any:
+    return filter_state(store, params.get("query", ""), output=None)
+
+
+def _category(store: TransactionStore, params: dict[str, str]) -> Any:
+    if "category" not in params:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Не указана категория")
+    date = datetime.strptime(params["date"], "%d.%m.%Y") if params.get("date") else None
+    return search_category(store, params["category"], date)
+
+
+ROUTES: dict[str, Callable[[TransactionStore, dict[str, str]], Any]] = {
+    "/operations": _operations,
+    "/search": _search,
+    "/reports/category": _category,
+}
+
+
+class Service:
+    """
+    HTTP-сервис на asyncio: /operations, /search, /reports/category и /metrics.
+    Вычисления выполняются в пуле потоков, цикл событий занят только вводом-выводом.
+    """
+
+    def __init__(self, data_dir: Any, workers: Optional[int] = None) -> None:
+        self.registry = DatasetRegistry(data_dir)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service")
+
+    async def run(self, func: Callable) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func)
+
+    async def dispatch(self, target: str) -> Any:
+        url = urlsplit(target)
+        if url.path == "/metrics":
+            # Prometheus по умолчанию, снимок JSON - при format=json
+            fmt = parse_qs(url.query).get("format", ["prometheus"])[-1]
+            return metrics.snapshot() if fmt == "json" else metrics.to_prometheus()
+        handler = ROUTES.get(url.path)
+        if handler is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Неизвестный адрес")
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        store = await self.registry.get(params.get("file", "operations.xlsx"), self.run)
+        return await self.run(lambda: jsonable(handler(store, params)))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode("latin-1").split()
+                keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and headers.get("connection") != "close"
+                status, body = await self._respond(parts)
+                self._write(writer, status, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, parts: list[str]) -> tuple[HTTPStatus, Any]:
+        if len(parts) != 3:
+            return HTTPStatus.BAD_REQUEST, {"error": "Некорректный запрос"}
+        if parts[0] != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Поддерживается только GET"}
+        try:
+            return HTTPStatus.OK, await self.dispatch(parts[1])
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            logger.error("Ошибка обработки запроса %s: %s", parts[1], e)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Внутренняя ошибка"}
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, status: HTTPStatus, body: Any, keep_alive: bool) -> None:
+        if isinstance(body, str):
+            payload, content_type = body.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            payload, content_type = (
+                json.dumps(body, ensure_ascii=False).encode("utf-8"),
+                "application/json; charset=utf-8",
+            )
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + payload)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host: str, port: int, data_dir: Any, workers: Optional[int] = None) -> None:
+    service = Service(data_dir, workers)
+    server = await service.start(host, port)
+    logger.info("Сервис запущен на %s:%s, данные - %s", host, port, service.registry.data_dir)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    режим сервиса: python -m src.server [--host] [--port] [--data-dir].
+    """
+    parser = argparse.ArgumentParser(description="HTTP-сервис банковского приложения")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.data_dir, args.workers))
+
+
+if __name__ == "__main__":
+    main()
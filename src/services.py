@@ -1,17 +1,29 @@
-from typing import Any, List, Dict
+from typing import Any, Dict, List, Optional
 
-from src.utils import setup_logging, write_data, read_files
+from src import metrics
+from src.aho_corasick import AhoCorasick
+from src.memo import memoize
+from src.parallel import ShardedStore
+from src.query import Query
+from src.store import TransactionStore
+from src.utils import setup_logging, write_stream, read_files
 
 logger = setup_logging()
 
 
-def filter_state(operations: List[Dict[Any, Any]], search_query: str) -> List[Dict[Any, Any]]:
+@metrics.timed
+def filter_state(
+    operations: List[Dict[Any, Any]], search_query: str, output: Optional[str] = "services.json"
+) -> List[Dict[Any, Any]]:
     """
     Фильтрует операции по строке поиска в полях 'Категория' или 'Описание'.
 
     Args:
-        operations: Список словарей с данными транзакций.
+        operations: Список словарей с данными транзакций, TransactionStore
+            или ShardedStore (поиск выполняется по шардам в процессах пула).
         search_query: Строка для поиска (регистронезависимая).
+        output: Файл для сохранения результата (компактный JSON-массив, '.ndjson' - по строке на операцию,
+            '.gz' - со сжатием); None - результат не записывается.
 
     Returns:
         Список отфильтрованных операций.
@@ -20,21 +32,80 @@ def filter_state(operations: List[Dict[Any, Any]], search_query: str) -> List[Di
         logger.info("Операции или строка поиска отсутствуют")
         return []
 
-    result = []
     search_query = search_query.lower()  # Приводим к нижнему регистру для регистронезависимого поиска
+    result = _search(operations, search_query)
 
-    for operation in operations:
-        category = operation.get("Категория", "").lower()
-        description = operation.get("Описание", "").lower()
-        # Проверяем, содержится ли строка поиска в категории или описании
-        if type(operation.get("Категория")) != float and type(operation.get("Описание")) != float:
-            if search_query in category or search_query in description:
-                result.append(operation)
+    metrics.count("rows_scanned", len(operations), "filter_state")
+    metrics.count("rows_matched", len(result), "filter_state")
+    logger.info("Результат 'filter_state' для запроса '%s' - %s операций", search_query, len(result))
+    if output is not None:
+        try:
+            write_stream(output, result)
+        except OSError as e:
+            logger.error("Ошибка записи результата 'filter_state' в %s: %s", output, e)
+    return result
+
+
+@memoize
+def _search(operations: Any, search_query: str) -> List[Dict[Any, Any]]:
+    """
+    возвращает операции, где search_query (в нижнем регистре) входит в категорию или описание.
+    """
+    if isinstance(operations, ShardedStore):
+        return operations.store.to_records(operations.search(search_query))
+    # Для TransactionStore поиск идёт по индексу, который строится один раз для набора данных
+    return Query(operations).contains(search_query).records()
+
+
+@metrics.timed
+def filter_states(operations: Any, search_queries: List[str]) -> Dict[str, List[Dict[Any, Any]]]:
+    """
+    Фильтрует операции сразу по многим строкам поиска за один проход по данным.
 
-    logger.info("Результат 'filter_state' для запроса '%s' - %s операций" % (search_query, len(result)))
-    write_data("services.json", result)  # Исправлено имя файла
+    Все запросы объединяются в автомат Ахо-Корасик, поэтому каждая операция просматривается
+    один раз независимо от числа запросов. Для каждого запроса результат совпадает с 'filter_state'.
+
+    Args:
+        operations: Список словарей с данными транзакций, TransactionStore или ShardedStore.
+        search_queries: Строки для поиска (регистронезависимые).
+
+    Returns:
+        Словарь: строка поиска -> список найденных операций.
+    """
+    result: Dict[str, List[Dict[Any, Any]]] = {query: [] for query in search_queries}
+    patterns = sorted({query.lower() for query in search_queries if query})
+    if not operations or not patterns:
+        logger.info("Операции или строки поиска отсутствуют")
+        return result
+
+    operations = operations.store if isinstance(operations, ShardedStore) else operations
+    automaton = AhoCorasick(patterns)
+    matches: List[List[Any]] = [[] for _ in patterns]
+    if isinstance(operations, TransactionStore):
+        # Тексты в поисковом индексе уже приведены к нижнему регистру, пропуски отброшены
+        index = operations.search_index
+        for row, category, description in zip(index.rows.tolist(), index.categories, index.descriptions):
+            for pattern_id in automaton.find(category) | automaton.find(description):
+                matches[pattern_id].append(row)
+        matches = [operations.to_records(rows) for rows in matches]
+    else:
+        for operation in operations:
+            if type(operation.get("Категория")) != float and type(operation.get("Описание")) != float:
+                category = operation.get("Категория", "").lower()
+                description = operation.get("Описание", "").lower()
+                for pattern_id in automaton.find(category) | automaton.find(description):
+                    matches[pattern_id].append(operation)
+
+    metrics.count("rows_scanned", len(operations), "filter_states")
+    metrics.count("rows_matched", sum(map(len, matches)), "filter_states")
+    by_pattern = dict(zip(patterns, matches))
+    for query in search_queries:
+        if query:
+            result[query] = by_pattern[query.lower()]
+    logger.info("Результат 'filter_states' для %s запросов", len(patterns))
     return result
 
+
 def servies_() -> None:
     """
     Запрашивает строку поиска и выводит отфильтрованные операции из Excel-файла.
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Iterable, Iterator, Optional
+
+from src.date_index import DateIndex
+from src.lazy import lazy_import
+from src.search_index import SearchIndex
+from src.utils import setup_logging
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = setup_logging()
+
+# Колонки с небольшим числом повторяющихся значений всегда кодируются словарём.
+DICTIONARY_COLUMNS = ("Номер карты", "Статус", "Валюта операции", "Валюта платежа", "Категория")
+
+
+class TransactionRow:
+    """
+    Представление одной строки TransactionStore без копирования данных.
+    Поддерживает доступ как у словаря: row["Категория"], row.get("Описание").
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "TransactionStore", index: int) -> None:
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, name: str) -> Any:
+        return self._store.value(name, self._index)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name not in self._store.columns:
+            return default
+        return self._store.value(name, self._index)
+
+    def keys(self) -> list[str]:
+        return list(self._store.columns)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: self._store.value(name, self._index) for name in self._store.columns}
+
+    def __repr__(self) -> str:
+        return f"TransactionRow({self.to_dict()!r})"
+
+
+class TransactionStore:
+    """
+    Колоночное хранилище транзакций.
+
+    Числовые колонки хранятся массивами numpy, строковые - кодами int32 и словарём значений
+    (пропуски имеют код -1). Строки доступны через TransactionRow, список словарей - через to_records().
+    """
+
+    __slots__ = ("_names", "_arrays", "_dictionaries", "_length", "_date_index", "_search_index", "_fingerprint")
+
+    def __init__(self, arrays: dict[str, np.ndarray], dictionaries: dict[str, list[Any]], length: int) -> None:
+        self._names = tuple(arrays)
+        self._arrays = arrays
+        self._dictionaries = dictionaries
+        self._length = length
+        self._date_index: Optional[DateIndex] = None
+        self._search_index: Optional[SearchIndex] = None
+        self._fingerprint: Optional[str] = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TransactionStore":
+        """
+        создаёт хранилище из DataFrame.
+        """
+        arrays: dict[str, np.ndarray] = {}
+        dictionaries: dict[str, list[Any]] = {}
+        for name in df.columns:
+            series = df[name]
+            if series.dtype.kind in "biufcmM":
+                arrays[name] = series.to_numpy()
+                continue
+            codes, uniques = pd.factorize(series)
+            if name in DICTIONARY_COLUMNS or len(uniques) * 2 <= len(series):
+                arrays[name] = codes.astype(np.int32)
+                dictionaries[name] = uniques.tolist()
+            else:
+                arrays[name] = series.to_numpy(dtype=object, na_value=np.nan)
+        return cls(arrays, dictionaries, len(df))
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict[str, Any]]) -> "TransactionStore":
+        """
+        создаёт хранилище из списка словарей.
+        """
+        return cls.from_frame(pd.DataFrame(list(records)))
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return self._names
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def date_index(self) -> DateIndex:
+        """
+        индекс по 'Дата операции', строится при первом обращении и переиспользуется.
+        """
+        if self._date_index is None:
+            self._date_index = DateIndex(self.column("Дата операции"))
+        return self._date_index
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """
+        поисковый индекс по 'Категория' и 'Описание', строится при первом обращении.
+        """
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.column("Категория"), self.column("Описание"))
+        return self._search_index
+
+    def fingerprint(self) -> str:
+        """
+        возвращает хэш содержимого всех колонок; считается при первом обращении,
+        так как колонки хранилища не изменяются (with_columns создаёт новое хранилище).
+        """
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for name in self._names:
+                array = self._arrays[name]
+                digest.update(f"{name}:{array.dtype.str}:{self._dictionaries.get(name)!r}".encode("utf-8"))
+                if array.dtype == object:
+                    array = pd.util.hash_pandas_object(pd.Series(array), index=False).to_numpy()
+                digest.update(np.ascontiguousarray(array).view(np.uint8))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def has_search_index(self) -> bool:
+        """
+        возвращает True, если поисковый индекс уже построен.
+        """
+        return self._search_index is not None
+
+    def __getitem__(self, index: int) -> TransactionRow:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("TransactionStore index out of range")
+        return TransactionRow(self, index)
+
+    def __iter__(self) -> Iterator[TransactionRow]:
+        return (TransactionRow(self, i) for i in range(self._length))
+
+    def is_dictionary(self, name: str) -> bool:
+        return name in self._dictionaries
+
+    def codes(self, name: str) -> tuple[np.ndarray, list[Any]]:
+        """
+        возвращает коды и словарь значений для колонки, закодированной словарём.
+        """
+        return self._arrays[name], self._dictionaries[name]
+
+    def value(self, name: str, index: int) -> Any:
+        """
+        возвращает значение колонки в строке index в виде объекта Python.
+        """
+        array = self._arrays[name]
+        if name in self._dictionaries:
+            code = array[index]
+            return self._dictionaries[name][code] if code >= 0 else np.nan
+        item = array[index]
+        return item.item() if isinstance(item, np.generic) else item
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        возвращает колонку целиком, колонки-словари раскодируются в массив объектов.
+        """
+        array = self._arrays[name]
+        if name in self._dictionaries:
+            values = np.array(self._dictionaries[name] + [np.nan], dtype=object)
+            return values.take(array)
+        return array
+
+    def unique(self, name: str) -> list[Any]:
+        """
+        возвращает уникальные значения колонки, пропуск (nan) - не более одного раза.
+        """
+        if name in self._dictionaries:
+            codes, values = self.codes(name)
+            present = np.zeros(len(values) + 1, dtype=bool)
+            present[codes] = True
+            result = [value for value, used in zip(values, present[:-1]) if used]
+            return result + [np.nan] if present[-1] else result
+        return pd.unique(self.column(name)).tolist()
+
+    def equals(self, name: str, value: Any, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        возвращает маску строк (всех или позиций rows), где значение колонки равно value.
+        Для колонок-словарей сравниваются коды, без раскодирования строк.
+        """
+        array = self._arrays[name] if rows is None else self._arrays[name][rows]
+        if name in self._dictionaries:
+            values = self._dictionaries[name]
+            if value not in values:
+                return np.zeros(len(array), dtype=bool)
+            return array == values.index(value)
+        return array == value
+
+    def contains(self, name: str, query: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        возвращает маски строк: в значении колонки есть подстрока query (без учёта регистра)
+        и значение колонки не пропущено.
+        """
+        query = query.lower()
+        if name in self._dictionaries:
+            codes, values = self.codes(name)
+            matched = np.array([query in str(value).lower() for value in values] + [False], dtype=bool)
+            return matched[codes], codes >= 0
+        present = np.array([not isinstance(value, float) for value in self._arrays[name]], dtype=bool)
+        matched = np.array([ok and query in value.lower() for ok, value in zip(present, self._arrays[name])])
+        return matched.astype(bool), present
+
+    def to_records(self, indices: Optional[Iterable[int]] = None) -> list[dict[str, Any]]:
+        """
+        возвращает строки (все или по списку индексов) в виде списка словарей.
+        """
+        if indices is None:
+            indices = range(self._length)
+        return [TransactionRow(self, int(i)).to_dict() for i in indices]
+
+    def with_columns(self, columns: dict[str, np.ndarray]) -> "TransactionStore":
+        """
+        возвращает новое хранилище, в котором колонки columns заменены (или добавлены).
+        Остальные колонки и уже построенные индексы по незатронутым колонкам не копируются.
+        """
+        arrays = {**self._arrays, **columns}
+        dictionaries = {name: values for name, values in self._dictionaries.items() if name not in columns}
+        store = TransactionStore(arrays, dictionaries, self._length)
+        if "Дата операции" not in columns:
+            store._date_index = self._date_index
+        if "Категория" not in columns and "Описание" not in columns:
+            store._search_index = self._search_index
+        return store
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({name: self.column(name) for name in self._names})
+
+    def nbytes(self) -> int:
+        """
+        возвращает примерный объём памяти, занятой колонками.
+        """
+        return sum(array.nbytes for array in self._arrays.values())
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import heapq
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Iterator, Optional, Protocol
+
+from src.date_index import DATE_FORMAT
+from src.lazy import lazy_import
+from src.utils import setup_logging
+
+openpyxl = lazy_import("openpyxl")
+
+logger = setup_logging()
+
+FLOAT_COLUMNS = ("Сумма операции", "Сумма платежа", "Кэшбэк", "MCC", "Сумма операции с округлением")
+INT_COLUMNS = ("Бонусы (включая кэшбэк)", "Округление на инвесткопилку")
+NAN = float("nan")
+
+
+class RowBatch:
+    """
+    Пачка строк выписки: словари в формате read_files и один раз разобранные даты операций.
+    """
+
+    __slots__ = ("rows", "dates", "offset")
+
+    def __init__(self, rows: list[dict[str, Any]], offset: int) -> None:
+        self.rows = rows
+        self.offset = offset
+        self.dates = [datetime.strptime(row["Дата операции"], DATE_FORMAT) for row in rows]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def _convert(name: str, value: Any) -> Any:
+    """
+    приводит значение ячейки к тому же типу, что даёт pd.read_excel: пустая ячейка - nan,
+    числа в денежных колонках - float.
+    """
+    if value is None or value == "":
+        return NAN
+    if name in FLOAT_COLUMNS:
+        return float(value)
+    if name in INT_COLUMNS:
+        return int(value)
+    return value
+
+
+def iter_batches(file_path: Any, batch_size: int = 10_000) -> Iterator[RowBatch]:
+    """
+    читает '.xlsx' построчно (режим read-only) и возвращает пачки строк,
+    в памяти одновременно находится не больше одной пачки.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        offset = 0
+        batch: list[dict[str, Any]] = []
+        for values in rows:
+            batch.append({name: _convert(name, value) for name, value in zip(header, values)})
+            if len(batch) >= batch_size:
+                yield RowBatch(batch, offset)
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield RowBatch(batch, offset)
+    finally:
+        workbook.close()
+
+
+class Consumer(Protocol):
+    """
+    Потребитель пачек для 'run_pipeline': получает каждую пачку и в конце возвращает результат.
+    """
+
+    def update(self, batch: RowBatch) -> None:
+        """
+        учитывает строки пачки.
+        """
+
+    def result(self) -> Any:
+        """
+        возвращает результат по всем переданным пачкам.
+        """
+
+
+class _PeriodConsumer(ABC):
+    """
+    Базовый потребитель пачек с фильтром по периоду [start_date, end_date] в формате 'DD.MM.YYYY'.
+    """
+
+    def __init__(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> None:
+        self.start = datetime.strptime(start_date, "%d.%m.%Y") if start_date and end_date else None
+        self.end = datetime.strptime(end_date, "%d.%m.%Y") if start_date and end_date else None
+
+    def in_period(self, date: datetime) -> bool:
+        return self.start is None or self.start <= date <= self.end  # type: ignore[operator]
+
+    @abstractmethod
+    def update(self, batch: RowBatch) -> None:
+        """
+        учитывает строки пачки, попадающие в период.
+        """
+
+    @abstractmethod
+    def result(self) -> Any:
+        """
+        возвращает результат по всем переданным пачкам.
+        """
+
+
+class CardTotals(_PeriodConsumer):
+    """
+    суммы операций по картам, как в 'sum_amount_of_card'.
+    """
+
+    def __init__(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> None:
+        super().__init__(start_date, end_date)
+        self.totals: dict[str, float] = {}
+
+    def update(self, batch: RowBatch) -> None:
+        for row, date in zip(batch.rows, batch.dates):
+            card = row["Номер карты"]
+            if isinstance(card, str) and self.in_period(date):
+                self.totals[card] = self.totals.get(card, 0) + row["Сумма операции"]
+
+    def result(self) -> dict[str, float]:
+        return {card: round(total, 2) for card, total in self.totals.items()}
+
+
+class CategorySums(_PeriodConsumer):
+    """
+    суммы операций по категориям.
+    """
+
+    def __init__(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> None:
+        super().__init__(start_date, end_date)
+        self.totals: dict[str, float] = {}
+
+    def update(self, batch: RowBatch) -> None:
+        for row, date in zip(batch.rows, batch.dates):
+            category = row["Категория"]
+            if isinstance(category, str) and self.in_period(date):
+                self.totals[category] = self.totals.get(category, 0) + row["Сумма операции"]
+
+    def result(self) -> dict[str, float]:
+        return {category: round(total, 2) for category, total in self.totals.items()}
+
+
+class TopN(_PeriodConsumer):
+    """
+    n крупнейших операций, результат в формате 'top_5_transactions'.
+    Хранит не больше n строк; при равных суммах выше стоит более ранняя строка.
+    """
+
+    def __init__(self, n: int = 5, start_date: Optional[str] = None, end_date: Optional[str] = None) -> None:
+        super().__init__(start_date, end_date)
+        self.n = n
+        self.heap: list[tuple[float, int, dict[str, Any]]] = []
+
+    def update(self, batch: RowBatch) -> None:
+        for i, (row, date) in enumerate(zip(batch.rows, batch.dates)):
+            if not self.in_period(date):
+                continue
+            item = (row["Сумма операции"], -(batch.offset + i), row)
+            if len(self.heap) < self.n:
+                heapq.heappush(self.heap, item)
+            elif item[:2] > self.heap[0][:2]:
+                heapq.heapreplace(self.heap, item)
+
+    def result(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "date": row["Дата операции"],
+                "amount": round(amount, 2),
+                "category": row["Категория"],
+                "description": row["Описание"],
+            }
+            for amount, _, row in sorted(self.heap, key=lambda item: item[:2], reverse=True)
+        ]
+
+
+class Search:
+    """
+    операции, где строка поиска входит в категорию или описание, как в 'filter_state'.
+    """
+
+    def __init__(self, search_query: str) -> None:
+        self.query = search_query.lower()
+        self.matches: list[dict[str, Any]] = []
+
+    def update(self, batch: RowBatch) -> None:
+        if not self.query:
+            return
+        for row in batch.rows:
+            category, description = row["Категория"], row["Описание"]
+            if isinstance(category, float) or isinstance(description, float):
+                continue
+            if self.query in category.lower() or self.query in description.lower():
+                self.matches.append(row)
+
+    def result(self) -> list[dict[str, Any]]:
+        return self.matches
+
+
+def run_pipeline(file_path: Any, *consumers: Consumer, batch_size: int = 10_000) -> list[Any]:
+    """
+    читает файл один раз и передаёт каждую пачку всем потребителям, возвращает их результаты.
+    """
+    rows = 0
+    for batch in iter_batches(file_path, batch_size):
+        for consumer in consumers:
+            consumer.update(batch)
+        rows += len(batch)
+    logger.info("Потоковая обработка %s: %s строк", file_path, rows)
+    return [consumer.result() for consumer in consumers]
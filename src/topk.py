@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional
+
+from src import metrics
+from src.lazy import lazy_import
+from src.memo import memoize
+from src.query import AMOUNT_COLUMN, Query, top_positions
+from src.utils import setup_logging, summarize
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = setup_logging()
+
+# Группировки: имя -> колонка; 'all' - без группировки, 'month' - месяц даты операции
+GROUPINGS = {"all": None, "card": "Номер карты", "category": "Категория", "month": "Дата операции"}
+# Направления: 'amount' - по сумме со знаком (как 'top_5_transactions'),
+# 'spend' - крупнейшие траты (отрицательные суммы по модулю), 'income' - крупнейшие поступления
+DIRECTIONS = ("amount", "spend", "income")
+TOP_COLUMNS = ("Дата операции", "Сумма операции", "Категория", "Описание")
+
+
+def top_entry(operation: Any) -> dict[str, Any]:
+    """
+    возвращает операцию в формате топа главной страницы.
+    """
+    return {
+        "date": operation["Дата операции"],
+        "amount": round(operation["Сумма операции"], 2),
+        "category": operation["Категория"],
+        "description": operation["Описание"],
+    }
+
+
+def _group_codes(query: Query, grouping: str) -> tuple[np.ndarray, list[Any]]:
+    """
+    возвращает коды групп подходящих строк (пропуск - -1) и значения групп.
+    """
+    column = GROUPINGS[grouping]
+    if column is None:
+        return np.zeros(query.count(), dtype=np.int64), ["all"]
+    if grouping == "month":
+        months = query.dates().astype("datetime64[M]")
+        codes, uniques = pd.factorize(months)
+        return codes, np.datetime_as_string(np.asarray(uniques, dtype="datetime64[M]"), unit="M").tolist()
+    codes, uniques = pd.factorize(query.values(column))
+    return codes, uniques.tolist()
+
+
+def _direction_values(amounts: np.ndarray, direction: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    возвращает значения, по которым выбираются наибольшие, и маску строк, подходящих направлению.
+    """
+    if direction == "amount":
+        return amounts, np.ones(len(amounts), dtype=bool)
+    if direction == "spend":
+        return -amounts, amounts < 0
+    if direction == "income":
+        return amounts, amounts > 0
+    raise ValueError(f"Неизвестное направление топа: {direction}")
+
+
+@metrics.timed
+@memoize
+def grouped_top(
+    data: Any,
+    n: int = 5,
+    groupings: Iterable[str] = ("card", "category", "month"),
+    directions: Iterable[str] = ("spend", "income"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> dict[str, dict[str, dict[Any, list[dict[str, Any]]]]]:
+    """
+    возвращает топ-n операций за период для каждой группировки и направления:
+    {группировка: {направление: {группа: [операции по убыванию]}}}.
+
+    Строки периода находятся один раз (для TransactionStore - по индексу дат), суммы читаются один раз
+    для всех группировок. Для каждой пары группировка/направление наибольшие значения всех групп
+    выбираются частичным выбором ('top_positions') без сортировки всей выборки; входные данные
+    не копируются и не переупорядочиваются. При равных суммах сохраняется исходный порядок строк.
+    """
+    query = Query(data).period(start_date, end_date).select(*TOP_COLUMNS)
+    amounts = np.asarray(query.values(AMOUNT_COLUMN), dtype=float)
+    metrics.count("rows_scanned", len(data) if data is not None else 0, "grouped_top")
+    metrics.count("rows_matched", len(amounts), "grouped_top")
+    result: dict[str, dict[str, dict[Any, list[dict[str, Any]]]]] = {}
+    for grouping in groupings:
+        codes, keys = _group_codes(query, grouping)
+        result[grouping] = {}
+        for direction in directions:
+            values, selected = _direction_values(amounts, direction)
+            positions = top_positions(values, n, np.where(selected, codes, -1))
+            groups: dict[Any, list[dict[str, Any]]] = {}
+            for code, operation in zip(codes[positions].tolist(), query.records(positions)):
+                groups.setdefault(keys[code], []).append(top_entry(operation))
+            result[grouping][direction] = groups
+    logger.info("Результат 'grouped_top' - %s", summarize(result))
+    return result
@@ -1,60 +1,303 @@
+from __future__ import annotations
+
+import atexit
+import functools
+import gzip
 import json
 import logging
+import multiprocessing
+import os
+import queue
+import random
+import reprlib
+import threading
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Iterable, Optional
 
-import pandas as pd
+from src import metrics
+from src.lazy import lazy_import
 
+pd = lazy_import("pandas")
 
-def setup_logging() -> Logger:
+LOG_FORMAT = "%(asctime)s - %(module)s - %(levelname)s - %(message)s"
+LOG_MAX_CHARS = 500
+
+
+class SamplingFilter(logging.Filter):
     """
-    функция, которая настраивает логирование.
+    Пропускает долю rate записей уровня ниже WARNING; предупреждения и ошибки проходят всегда.
+    """
+
+    def __init__(self, rate: float = 1.0) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
+
+class Summary:
+    """
+    Краткое представление значения для логов. Строка строится через reprlib только при выводе
+    записи, её длина ограничена LOG_MAX_CHARS, поэтому стоимость не зависит от размера значения.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __str__(self) -> str:
+        text = _summary_repr.repr(self.value)
+        if len(text) > _log_settings["max_chars"]:
+            text = text[: _log_settings["max_chars"] - 3] + "..."
+        return text
+
+    __repr__ = __str__
+
+
+def summarize(value: Any) -> Summary:
+    """
+    возвращает ленивое краткое представление value для передачи в аргументы логгера.
+    """
+    return Summary(value)
+
+
+_summary_repr = reprlib.Repr()
+_summary_repr.maxlevel = 3
+_summary_repr.maxlist = _summary_repr.maxtuple = _summary_repr.maxset = _summary_repr.maxdict = 5
+_summary_repr.maxstring = _summary_repr.maxother = 80
+
+_log_lock = threading.Lock()
+_log_settings: dict[str, Any] = {"max_chars": LOG_MAX_CHARS}
+_log_sampling = SamplingFilter()
+_log_handler: Optional[QueueHandler] = None
+_log_listener: Optional[QueueListener] = None
+_log_configured = False
+
+
+@functools.cache
+def load_config() -> None:
+    """
+    загружает переменные окружения из файла .env. Выполняется один раз, при первом обращении к настройкам.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def get_setting(name: str, default: str = "") -> str:
+    """
+    возвращает настройку из переменной окружения; файл .env читается при первом обращении.
+    """
+    load_config()
+    return os.getenv(name, default)
+
+
+def _log_handlers(mode: str) -> list[logging.Handler]:
+    file_ = os.getenv("LOG_FILE", "logs.log")
+    if mode == "w":
+        # Файл очищается один раз, а пишется дописыванием: иначе запись с текущей позиции
+        # затирала бы строки, которые в тот же файл дописывают процессы пула
+        open(file_, "w").close()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: list[logging.Handler] = [
+        logging.FileHandler(file_, mode="a", encoding="utf-8"),
+        logging.StreamHandler(),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _write_directly() -> None:
+    """
+    в дочернем процессе фоновый поток не нужен: записи пишутся в файл (дописыванием) напрямую.
+    """
+    global _log_listener
+    package = logging.getLogger("src")
+    if _log_handler is not None:
+        package.removeHandler(_log_handler)
+    for handler in _log_handlers("a"):
+        handler.addFilter(_log_sampling)
+        package.addHandler(handler)
+    _log_listener = None
+
+
+def _stop_listener() -> None:
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
+def _configure_output() -> None:
+    """
+    читает настройки журнала и запускает вывод: в основном процессе - фоновый поток QueueListener,
+    в дочернем процессе (spawn) - запись напрямую в уже созданный родителем файл.
+    """
+    global _log_listener, _log_configured
+    load_config()
+    _log_settings["max_chars"] = int(os.getenv("LOG_MAX_CHARS", str(LOG_MAX_CHARS)))
+    _log_sampling.rate = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+    logging.getLogger("src").setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    if multiprocessing.parent_process() is not None:
+        _write_directly()
+    elif _log_handler is not None:
+        _log_listener = QueueListener(_log_handler.queue, *_log_handlers("w"))
+        _log_listener.start()
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=_write_directly)
+    _log_configured = True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, который настраивает вывод при первой записи: импорт модулей не читает .env,
+    не открывает файл журнала и не запускает поток.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(module)s - %(levelname)s - %(message)s",
-        encoding="utf-8",
-    )
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
 
-    file_handler = logging.FileHandler("logs.log", mode="w")
-    file_handler.setLevel(logging.INFO)
+    def handle(self, record: logging.LogRecord) -> Any:
+        if _log_configured:
+            return super().handle(record)
+        with _log_lock:
+            if not _log_configured:
+                _configure_output()
+        # Уровень и обработчики могли измениться - запись проходит через них заново
+        package = logging.getLogger("src")
+        if package.isEnabledFor(record.levelno):
+            package.handle(record)
+        return True
 
-    formatter = logging.Formatter("%(asctime)s - %(module)s - %(levelname)s - %(message)s")
-    file_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
+def start_logging() -> None:
+    """
+    настраивает вывод журнала сразу, не дожидаясь первой записи. Вызывается в основном процессе
+    перед запуском пула процессов: иначе первая запись родителя открыла бы файл журнала заново (mode "w")
+    и стёрла бы строки, которые процессы пула уже дописали в него.
+    """
+    with _log_lock:
+        if not _log_configured:
+            _configure_output()
 
-    return logger
+
+def setup_logging() -> Logger:
+    """
+    функция, которая настраивает логирование.
+
+    Настройка выполняется один раз на процесс, повторные вызовы возвращают тот же логгер.
+    Записи ставятся в очередь, а в файл и консоль их пишет фоновый поток, поэтому вызов логгера
+    не ждёт ввода-вывода. Файл журнала и настройки из окружения открываются при первой записи:
+    LOG_LEVEL, LOG_FILE, LOG_MAX_CHARS (ограничение длины 'summarize')
+    и LOG_SAMPLE_RATE (доля сохраняемых записей ниже WARNING).
+    """
+    global _log_handler
+    with _log_lock:
+        if _log_handler is None:
+            package = logging.getLogger("src")
+            package.setLevel(logging.INFO)
+            package.propagate = False
+            _log_handler = _DeferredQueueHandler(queue.SimpleQueue())
+            _log_handler.addFilter(_log_sampling)
+            package.addHandler(_log_handler)
+    return logging.getLogger(__name__)
 
 
 logger = setup_logging()
 
 
-def read_files(file_path: Any) -> Any:
-    """открытие файла '.xls'"""
+@metrics.timed
+def read_files(file_path: Any, output: str = "records", use_cache: bool = True) -> Any:
+    """
+    открытие файла '.xls'.
+
+    Для '.xlsx' output="records" возвращает список словарей, output="frame" - DataFrame,
+    output="store" - колоночное хранилище TransactionStore.
+    При use_cache=True файл читается из колоночного снимка (см. src.cache).
+    """
     if Path(file_path).suffix.lower() == ".xlsx":
-        df = pd.read_excel(file_path)
+        if use_cache:
+            from src.cache import load_frame
+
+            df = load_frame(file_path)
+        else:
+            df = pd.read_excel(file_path)
+        metrics.count("bytes_read", Path(file_path).stat().st_size, "read_files")
+        metrics.count("rows_scanned", len(df), "read_files")
+        if output == "frame":
+            return df
+        if output == "store":
+            from src.store import TransactionStore
+
+            return TransactionStore.from_frame(df)
         return df.to_dict(orient="records")
-    elif Path(file_path).suffix.lower() == ".json":
-        with open(file_path, "r", encoding="utf-8") as f:
+    suffixes = [suffix.lower() for suffix in Path(file_path).suffixes]
+    if suffixes and suffixes[-1] == ".gz":
+        suffixes.pop()
+    if suffixes and suffixes[-1] in (".json", ".ndjson"):
+        metrics.count("bytes_read", Path(file_path).stat().st_size, "read_files")
+        with _open_text(str(file_path), "r") as f:
+            if suffixes[-1] == ".ndjson":
+                return [json.loads(line) for line in f if line.strip()]
             return json.load(f)
     else:
         print("Неверный формат файла")
 
 
-def write_data(file_: str, results: Any) -> None:
+def _open_text(file_: str, mode: str, compress: Optional[bool] = None) -> IO[str]:
+    """
+    открывает текстовый файл в UTF-8, сжатый gzip при compress=True или расширении '.gz'.
+    """
+    if compress or (compress is None and file_.endswith(".gz")):
+        return gzip.open(file_, mode + "t", encoding="utf-8")  # type: ignore[return-value]
+    return open(file_, mode, encoding="utf-8")
+
+
+@metrics.timed
+def write_data(file_: str, results: Any, compact: bool = False) -> None:
     """
     функция, которая записывает результаты в указанный файл.
+    compact=True пишет JSON без отступов и пробелов; файлы '.gz' сжимаются gzip.
     """
     try:
         if file_.endswith(".txt"):
             with open(file_, "a") as file:
                 file.write(results)
         else:
-            with open(file_, "w", encoding="utf8") as f:
-                json.dump(results, f, indent=4, ensure_ascii=False)
+            with _open_text(file_, "w") as f:
+                if compact:
+                    json.dump(results, f, separators=(",", ":"), ensure_ascii=False)
+                else:
+                    json.dump(results, f, indent=4, ensure_ascii=False)
     except Exception as e:
-        logger.error(f"Ошибка :{e}")
+        logger.error("Ошибка :%s", e)
+
+
+@metrics.timed
+def write_stream(
+    file_: str, items: Iterable[Any], ndjson: Optional[bool] = None, compress: Optional[bool] = None
+) -> int:
+    """
+    функция, которая записывает элементы в файл по одному, не собирая их в памяти.
+
+    ndjson=True пишет по одному JSON-объекту в строке, иначе - компактный JSON-массив
+    (по умолчанию формат выбирается по расширению '.ndjson'). Возвращает число записанных элементов.
+    """
+    if ndjson is None:
+        ndjson = file_.removesuffix(".gz").endswith(".ndjson")
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    count = 0
+    with _open_text(file_, "w", compress) as f:
+        if not ndjson:
+            f.write("[")
+        for item in items:
+            if count and not ndjson:
+                f.write(",")
+            for chunk in encoder.iterencode(item):
+                f.write(chunk)
+            if ndjson:
+                f.write("\n")
+            count += 1
+        if not ndjson:
+            f.write("]")
+    return count
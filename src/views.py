@@ -1,19 +1,29 @@
+from __future__ import annotations
+
 import json
 import os
 from datetime import datetime
-from typing import Any
-
-import requests
-import yfinance as yf
-from dotenv import load_dotenv
-
-from src.utils import read_files, setup_logging, write_data
+from typing import Any, Optional
+
+from src import metrics
+from src.aggregation import card_totals
+from src.incremental import IncrementalAggregates
+from src.lazy import lazy_import
+from src.market import default_quote_cache, fetch_market_data
+from src.memo import memoize
+from src.parallel import ShardedStore
+from src.query import Query
+from src.store import TransactionStore
+from src.topk import TOP_COLUMNS, top_entry
+from src.utils import load_config, read_files, setup_logging, summarize, write_data
+
+requests = lazy_import("requests")
+yf = lazy_import("yfinance")
 
-load_dotenv()
-api_key = os.getenv("API_KEY")
 logger = setup_logging()
 
 
+@metrics.timed
 def send_greeting(h: Any) -> str:
     """
     возвращает приветственное сообщение в зависимости от времени суток.
@@ -33,107 +43,104 @@ def send_greeting(h: Any) -> str:
         return "Доброй ночи!"
 
 
+@metrics.timed
 def card_info(data: Any) -> list[str]:
     """
     возвращает список уникальных номеров карт пользователя.
     """
+    if isinstance(data, IncrementalAggregates):
+        unique_cards = data.card_list()
+        logger.info("Результат 'card_info' - %s", summarize(unique_cards))
+        return unique_cards
+    if isinstance(data, ShardedStore):
+        data = data.store
+    if isinstance(data, TransactionStore):
+        metrics.count("rows_scanned", len(data), "card_info")
+        unique_cards = data.unique("Номер карты")
+        logger.info("Результат 'card_info' - %s", summarize(unique_cards))
+        return unique_cards
     if data is not None:
+        metrics.count("rows_scanned", len(data), "card_info")
         unique_cards = list(set(transaction["Номер карты"] for transaction in data))
-        logger.info("Результат 'card_info' - %s" % unique_cards)
+        logger.info("Результат 'card_info' - %s", summarize(unique_cards))
         return unique_cards
     else:
         logger.info("Данных не найдено")
         return []
 
 
+@metrics.timed
 def sum_amount_of_card(data: Any, card: str, start_date: str = None, end_date: str = None) -> float:
     """
-    возвращает общую сумму транзакций для указанной карты за указанный период.
+    возвращает общую сумму транзакций для указанной карты за указанный период (в целых копейках).
     """
     total = 0
-    if card and data:
-        for transaction in data:
-            transaction_date = datetime.strptime(transaction["Дата операции"], "%d.%m.%Y %H:%M:%S")
-            # Проверяем, попадает ли дата транзакции в указанный период
-            if start_date and end_date:
-                start = datetime.strptime(start_date, "%d.%m.%Y")
-                end = datetime.strptime(end_date, "%d.%m.%Y")
-                if not (start <= transaction_date <= end):
-                    continue
-            if transaction["Номер карты"] == card:
-                total += transaction["Сумма операции"]
-    logger.info("Результат 'sum_amount_of_card' для карты %s - %s" % (card, total))
+    if data:
+        metrics.count("rows_scanned", len(data), "sum_amount_of_card")
+    if isinstance(data, ShardedStore) and card:
+        total = data.card_totals([card], start_date, end_date)[0]
+    elif card and data:
+        total = Query(data).where("Номер карты", card).period(start_date, end_date).sum(kopecks=True)
+    logger.info("Результат 'sum_amount_of_card' для карты %s - %s", card, total)
     return round(total, 2)
 
 
+@metrics.timed
 def total_cashback(sum: int) -> int:
     """
     возвращает весь кешбек
     """
     total = sum // 100
-    logger.info("Результат 'total_cashback' - %s" % total)
+    logger.info("Результат 'total_cashback' - %s", total)
     return total
 
 
+@metrics.timed
+@memoize
 def top_5_transactions(data: Any, start_date: str = None, end_date: str = None) -> list[dict[str, Any]] | None:
     """
     возвращает топ-5 транзакций пользователя по сумме за указанный период.
+    Входные данные не изменяются; топ по картам, категориям и месяцам - 'topk.grouped_top'.
     """
-    if data is not None:
-        filtered_data = []
-        if start_date and end_date:
-            start = datetime.strptime(start_date, "%d.%m.%Y")
-            end = datetime.strptime(end_date, "%d.%m.%Y")
-            for transaction in data:
-                transaction_date = datetime.strptime(transaction["Дата операции"], "%d.%m.%Y %H:%M:%S")
-                if start <= transaction_date <= end:
-                    filtered_data.append(transaction)
-        else:
-            filtered_data = data
-
-        def sum_of_operation(transaction: Any) -> Any:
-            return transaction["Сумма операции"]
-
-        filtered_data.sort(key=sum_of_operation, reverse=True)
-
-        result = []
-        for operation in filtered_data:
-            if len(result) < 5:
-                result.append(
-                    {
-                        "date": operation["Дата операции"],
-                        "amount": round(operation["Сумма операции"], 2),
-                        "category": operation["Категория"],
-                        "description": operation["Описание"],
-                    }
-                )
-            else:
-                break
-        logger.info("Результат 'top_5_transactions' - %s" % result)
-        return result
-    else:
+    if data is None:
         logger.error("Данных не найдено")
         return None
 
+    metrics.count("rows_scanned", len(data), "top_5_transactions")
+    if isinstance(data, ShardedStore):
+        top = [data.store[int(i)] for i in data.top_rows(5, start_date, end_date)]
+    else:
+        query = Query(data).period(start_date, end_date).select(*TOP_COLUMNS)
+        top = query.top(5)
+        metrics.count("rows_matched", query.count(), "top_5_transactions")
+    result = [top_entry(operation) for operation in top]
+    logger.info("Результат 'top_5_transactions' - %s", summarize(result))
+    return result
+
 
+@metrics.timed
 def currency_rate(currency: Any) -> Any:
     """
     возвращает курс валюты.
     """
     url = f"https://api.apilayer.com/exchangerates_data/latest?symbols=RUB&base={currency}"
-    response = requests.get(url, headers={"apikey": api_key}, timeout=15)
+    load_config()
+    with metrics.network_timer("exchange_rates"):
+        response = requests.get(url, headers={"apikey": os.getenv("API_KEY")}, timeout=15)
     response_data = json.loads(response.text)
     rate = response_data["rates"]
-    logger.info("Результат 'currency_rate' - %s" % rate)
+    logger.info("Результат 'currency_rate' - %s", summarize(rate))
     return rate["RUB"]
 
 
+@metrics.timed
 def stock_currency(stock: str) -> Any:
     """
     возвращает курс акции из S&P 500.
     """
     ticker = yf.Ticker(stock)
-    todays_data = ticker.history(period="1d")
+    with metrics.network_timer("yfinance"):
+        todays_data = ticker.history(period="1d")
 
     if not todays_data.empty:
         high_price = todays_data["High"].iloc[0]
@@ -142,21 +149,19 @@ def stock_currency(stock: str) -> Any:
         return 0.0
 
 
-def create_operations(greetin: str, cards: list[str], data: Any, start_date: str = None, end_date: str = None) -> dict:
+@memoize
+def card_summary(data: Any, cards: list[str], start_date: str = None, end_date: str = None) -> dict[str, list]:
     """
-    возвращает словарь с данными пользователя, включая группировку по картам.
+    возвращает суммы и кешбэк по картам и топ-5 транзакций за период - часть главной страницы без котировок.
     """
-    result = {
-        "greeting": greetin,
-        "cards": [],
-        "top_transactions": [],
-        "currency_rates": [],
-        "stock_prices": [],
-    }
-
-    # Добавляем информацию по каждой карте
-    for card in cards:
-        total_sum = sum_amount_of_card(data, card, start_date, end_date)
+    result: dict[str, list] = {"cards": [], "top_transactions": []}
+    # Добавляем информацию по каждой карте (суммы по всем картам считаются за один проход)
+    if isinstance(data, IncrementalAggregates):
+        totals = data.card_totals(cards, start_date, end_date)
+    else:
+        totals = card_totals(data, cards, start_date, end_date)
+    for card, total in zip(cards, totals):
+        total_sum = round(total, 2)
         cashback = total_cashback(total_sum)
         result["cards"].append(
             {
@@ -167,25 +172,57 @@ def create_operations(greetin: str, cards: list[str], data: Any, start_date: str
         )
 
     # Топ-5 транзакций (фильтруем по периоду, если указан)
-    result["top_transactions"] = top_5_transactions(data, start_date, end_date)
+    if isinstance(data, IncrementalAggregates):
+        result["top_transactions"] = data.top_transactions(start_date, end_date)
+    else:
+        result["top_transactions"] = top_5_transactions(data, start_date, end_date)
+    return result
+
+
+@metrics.timed
+def create_operations(
+    greetin: str,
+    cards: list[str],
+    data: Any,
+    start_date: str = None,
+    end_date: str = None,
+    market: Optional[dict] = None,
+) -> dict:
+    """
+    возвращает словарь с данными пользователя, включая группировку по картам.
+    data может быть IncrementalAggregates - тогда суммы и топ берутся из материализованных агрегатов.
+    market - заранее полученный результат 'fetch_market_data'; если не передан, котировки запрашиваются.
+    """
+    result = {
+        "greeting": greetin,
+        "cards": [],
+        "top_transactions": [],
+        "currency_rates": [],
+        "stock_prices": [],
+    }
+
+    # Суммы по картам и топ-5 зависят только от данных и периода и кэшируются, котировки - нет
+    summary = card_summary(data, cards, start_date, end_date)
+    result["cards"] = summary["cards"]
+    result["top_transactions"] = summary["top_transactions"]
 
+    # Курсы валют и цены акций запрашиваются параллельно, списки берутся из настроек окружения
+    if market is None:
+        market = fetch_market_data(cache=default_quote_cache())
     result["currency_rates"].append(
-        (
-            {"currency": "USD", "rate": round(currency_rate("USD"), 2)},
-            {"currency": "EUR", "rate": round(currency_rate("EUR"), 2)},
+        tuple(
+            {"currency": currency, "rate": round(rate, 2) if rate is not None else None}
+            for currency, rate in market["currency_rates"].items()
         )
     )
     result["stock_prices"].append(
         [
-            {"stock": "AAPL", "price": round(stock_currency("AAPL"), 2)},
-            {"stock": "AMZN", "price": round(stock_currency("AMZN"), 2)},
-            {"stock": "GOOGL", "price": round(stock_currency("GOOGL"), 2)},
-            {"stock": "MSFT", "price": round(stock_currency("MSFT"), 2)},
-            {"stock": "TSLA", "price": round(stock_currency("TSLA"), 2)},
+            {"stock": stock, "price": round(price, 2) if price is not None else None}
+            for stock, price in market["stock_prices"].items()
         ]
     )
 
-    logger.info("Результат 'create_operations' - %s" % result)
+    logger.info("Результат 'create_operations' - %s", summarize(result))
     return result
 
 
@@ -199,4 +236,4 @@ def views_() -> None:
     card_numbers = card_info(data)
     created = create_operations(greetin, card_numbers, data, start_date, end_date)
     write_data("views.json", created)
-    print(f'Главная: {read_files("views.json")}')
+    print(f"Главная: {created}")
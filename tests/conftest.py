@@ -0,0 +1,44 @@
+from typing import Any, Callable, Optional
+
+import pandas as pd
+from pytest import fixture
+
+from src.utils import read_files
+
+STATEMENT = {
+    "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00", "29.12.2021 12:30:00"],
+    "Номер карты": ["*7197", "*4556", "*7197"],
+    "Сумма операции": [-160.89, -800.0, 1500.0],
+    "Категория": ["Супермаркеты", "Переводы", "Супермаркеты"],
+    "Описание": ["Магнит", "Азер Г.", None],
+}
+
+
+@fixture()
+def date_with_data() -> Any:
+    return read_files("data/operations.xlsx")
+
+
+@fixture
+def statement_frame() -> Callable[..., pd.DataFrame]:
+    """возвращает фабрику небольших выписок: первые rows строк, сумма первой операции и замена столбцов"""
+
+    def make(rows: int = 2, amount: float = -160.89, columns: Optional[dict[str, list]] = None) -> pd.DataFrame:
+        frame = pd.DataFrame(STATEMENT).head(rows)
+        frame.loc[0, "Сумма операции"] = amount
+        for name, values in (columns or {}).items():
+            frame[name] = values
+        return frame
+
+    return make
+
+
+@fixture
+def same_records() -> Callable[[list, list], bool]:
+    """возвращает сравнение списков словарей, в которых могут быть nan"""
+
+    def compare(result: list, expected: list) -> bool:
+        # В строках есть nan, поэтому сравниваются таблицы, а не списки словарей
+        return pd.DataFrame(result).equals(pd.DataFrame(expected))
+
+    return compare
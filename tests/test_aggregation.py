@@ -0,0 +1,26 @@
+from typing import Any
+
+import pandas as pd
+from pytest import mark
+
+from src.aggregation import card_totals
+from src.views import card_info, sum_amount_of_card
+
+
+@mark.parametrize(
+    "start_date, end_date",
+    [(None, None), ("01.10.2021", "31.12.2021"), ("01.01.2018", "01.06.2019")],
+)
+def test_card_totals_match_sum_amount_of_card(date_with_data: Any, start_date: Any, end_date: Any) -> None:
+    cards = card_info(date_with_data) + ["*0000"]
+    expected = [sum_amount_of_card(date_with_data, card, start_date, end_date) for card in cards]
+    assert [round(total, 2) for total in card_totals(date_with_data, cards, start_date, end_date)] == expected
+
+
+def test_card_totals_accepts_dataframe(date_with_data: Any) -> None:
+    frame = pd.DataFrame(date_with_data)
+    assert card_totals(frame, ["*7197"]) == card_totals(date_with_data, ["*7197"])
+
+
+def test_card_totals_empty() -> None:
+    assert card_totals([], ["*7197"]) == [0]
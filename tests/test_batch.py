@@ -0,0 +1,58 @@
+import json
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+from pytest import fixture
+
+from src.batch import collect_files, main
+
+
+@fixture
+def statements(tmp_path: Path, statement_frame: Callable[..., pd.DataFrame]) -> Path:
+    source = tmp_path / "statements"
+    source.mkdir()
+    for i in range(3):
+        statement_frame(amount=-160.89 * (i + 1)).to_excel(source / f"client_{i}.xlsx", index=False)
+    (source / "broken.xlsx").write_text("not a workbook")
+    return source
+
+
+def test_collect_files_manifest(statements: Path) -> None:
+    manifest = statements / "manifest.txt"
+    manifest.write_text("client_0.xlsx\n# комментарий\nclient_2.xlsx\n")
+    assert collect_files(manifest) == [statements / "client_0.xlsx", statements / "client_2.xlsx"]
+    assert len(collect_files(statements)) == 4
+
+
+def test_batch_main(statements: Path, tmp_path: Path) -> None:
+    output_dir = tmp_path / "out"
+    summary = main(
+        [
+            str(statements),
+            "--output-dir",
+            str(output_dir),
+            "--offline",
+            "--workers",
+            "2",
+            "--query",
+            "магнит",
+            "--category",
+            "Супермаркеты",
+            "--report-date",
+            "01.01.2022",
+            "--time",
+            "31.12.2021 10:00",
+        ]
+    )
+    assert summary["files"] == 3
+    assert summary["rows"] == 6
+    assert summary["failed"] == [str(statements / "broken.xlsx")]
+    with open(output_dir / "client_1" / "views.json", encoding="utf-8") as f:
+        views = json.load(f)
+    assert views["greeting"] == "Доброе утро!"
+    assert views["cards"][0]["total_spent"] in (-321.78, -800.0)
+    with open(output_dir / "client_1" / "reports.json", encoding="utf-8") as f:
+        assert json.load(f) == {"category": "Супермаркеты", "total": 321.78}
+    with open(output_dir / "client_1" / "services.json", encoding="utf-8") as f:
+        assert len(json.load(f)["магнит"]) == 1
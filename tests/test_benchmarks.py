@@ -0,0 +1,41 @@
+from pytest import MonkeyPatch
+
+from benchmarks.run import compare, run_benchmarks
+from benchmarks.startup import eager_heavy_modules, import_profile
+from benchmarks.synthetic import generate_transactions, parse_size
+from src import memo
+from src.memo import MemoCache
+from src.store import TransactionStore
+from src.views import card_info
+
+
+def test_generate_transactions() -> None:
+    first = generate_transactions(1000, seed=1)
+    assert first.equals(generate_transactions(1000, seed=1))
+    assert not first.equals(generate_transactions(1000, seed=2))
+    assert len(first) == 1000
+    assert first["Дата операции"].str.len().eq(19).all()
+    assert "*7197" in card_info(TransactionStore.from_frame(first))
+    assert parse_size("1M") == 1_000_000
+    assert parse_size("2500") == 2500
+
+
+def test_run_benchmarks_and_compare(monkeypatch: MonkeyPatch) -> None:
+    cache = MemoCache()
+    monkeypatch.setattr(memo, "_default_cache", cache)
+    results = run_benchmarks(["300"], repeat=1)
+    # Замеры не попадают в кэш результатов
+    assert cache.stats()["size"] == 0
+    assert {"read_files", "filter_state[store]", "create_operations[records]"} <= set(results["300"])
+    assert compare(results, results, 2.0) == []
+    slow = {"300": {"read_files": {"seconds": results["300"]["read_files"]["seconds"] * 10 + 1, "peak_mb": 0.0}}}
+    regressions = compare(slow, results, 2.0)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("300 read_files: seconds")
+
+
+def test_startup_does_not_load_heavy_modules() -> None:
+    for module in ("src.main", "src.services"):
+        profile = import_profile(module)
+        assert module in profile
+        assert eager_heavy_modules(profile) == []
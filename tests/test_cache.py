@@ -0,0 +1,48 @@
+import os
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+import pandas as pd
+from pytest import fixture
+
+from src.cache import load_frame, snapshot_dir
+from src.utils import read_files
+
+
+@fixture
+def excel_file(tmp_path: Path, statement_frame: Callable[..., pd.DataFrame]) -> Path:
+    path = tmp_path / "operations.xlsx"
+    statement_frame(
+        rows=3, columns={"Номер карты": ["*7197", None, "*4556"], "Бонусы (включая кэшбэк)": [3, 0, 0]}
+    ).to_excel(path, index=False)
+    return path
+
+
+def test_cached_records_match_excel(excel_file: Path) -> None:
+    expected = pd.read_excel(excel_file).to_dict(orient="records")
+    cold = read_files(excel_file)
+    warm = read_files(excel_file)
+    assert snapshot_dir(excel_file).exists()
+    for records in (cold, warm):
+        assert len(records) == len(expected)
+        assert records[0] == expected[0]
+        assert records[2] == expected[2]
+        assert type(records[1]["Номер карты"]) is float
+
+
+def test_warm_load_skips_excel(excel_file: Any) -> None:
+    load_frame(excel_file)
+    with patch("src.cache.pd.read_excel") as mock_read_excel:
+        df = read_files(excel_file, output="frame")
+        mock_read_excel.assert_not_called()
+    pd.testing.assert_frame_equal(df, pd.read_excel(excel_file))
+
+
+def test_snapshot_rebuilt_on_change(excel_file: Path) -> None:
+    load_frame(excel_file)
+    pd.DataFrame({"Сумма операции": [1.0, 2.0]}).to_excel(excel_file, index=False)
+    os.utime(excel_file, ns=(1, 1))
+    df = load_frame(excel_file)
+    assert list(df.columns) == ["Сумма операции"]
+    assert df["Сумма операции"].tolist() == [1.0, 2.0]
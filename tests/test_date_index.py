@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+from pytest import fixture, mark
+
+from src.date_index import DateIndex
+from src.reports import search_category
+from src.store import TransactionStore
+from src.utils import read_files
+
+
+@fixture
+def dates() -> list[str]:
+    return [
+        "31.12.2021 16:44:00",
+        "01.10.2021 00:00:00",
+        "15.11.2021 10:00:00",
+        "31.12.2021 00:00:00",
+        "30.09.2021 23:59:59",
+    ]
+
+
+def test_between(dates: list[str]) -> None:
+    index = DateIndex(dates)
+    assert index.between("01.10.2021", "31.12.2021").tolist() == [1, 2, 3]
+    assert index.between(datetime(2022, 1, 1), datetime(2022, 2, 1)).tolist() == []
+
+
+def test_last_days(dates: list[str]) -> None:
+    index = DateIndex(dates)
+    assert index.last_days(91, datetime(2021, 12, 31)).tolist() == [1, 2, 3]
+    assert index.last_days(1, datetime(2022, 1, 1)).tolist() == [0, 3]
+
+
+def test_store_date_index_is_cached(dates: list[str]) -> None:
+    store = TransactionStore.from_records({"Дата операции": date} for date in dates)
+    assert store.date_index is store.date_index
+    assert np.array_equal(store.date_index.between("01.10.2021", "31.12.2021"), [1, 2, 3])
+
+
+@mark.parametrize("category", ["Супермаркеты", "Переводы", "Несуществующая"])
+def test_search_category_store(category: str) -> None:
+    records: Any = read_files("data/operations.xlsx")
+    store = read_files("data/operations.xlsx", output="store")
+    for date in (datetime(2021, 12, 10), datetime(2020, 5, 1, 12, 30)):
+        assert search_category(store, category, date) == search_category(records, category, date)
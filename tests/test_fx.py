@@ -0,0 +1,194 @@
+import json
+import threading
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+from pytest import MonkeyPatch, approx, fixture
+
+from src.fx import RateTable, fetch_timeseries, normalize_transactions, to_rub
+from src.store import TransactionStore
+
+BASE_RATES = {"USD": 90.0, "EUR": 100.0, "CNY": 12.5}
+REQUESTS: list[dict[str, str]] = []
+
+
+def daily_rate(currency: str, day: date) -> float:
+    return BASE_RATES[currency] + (day - date(2021, 1, 1)).days / 100
+
+
+class TimeseriesHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        REQUESTS.append({"path": url.path, **params})
+        if params["base"] not in BASE_RATES:
+            self.send_response(500)
+            self.end_headers()
+            return
+        start = datetime.strptime(params["start_date"], "%Y-%m-%d").date()
+        end = datetime.strptime(params["end_date"], "%Y-%m-%d").date()
+        rates = {}
+        day = start
+        while day <= end:
+            # Как у реального API, за выходные курсов нет
+            if day.weekday() < 5:
+                rates[day.isoformat()] = {"RUB": daily_rate(params["base"], day)}
+            day += timedelta(days=1)
+        body = json.dumps({"success": True, "timeseries": True, "rates": rates}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@fixture
+def rates_server(monkeypatch: MonkeyPatch) -> Iterator[str]:
+    REQUESTS.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TimeseriesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("EXCHANGE_API_URL", url)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def operations() -> list[dict[str, Any]]:
+    return [
+        {
+            "Дата операции": "30.08.2021 21:24:30",
+            "Сумма операции": -8.61,
+            "Валюта операции": "USD",
+            "Сумма платежа": -648.76,
+            "Валюта платежа": "RUB",
+        },
+        {
+            "Дата операции": "05.09.2021 10:00:00",
+            "Сумма операции": -10.0,
+            "Валюта операции": "USD",
+            "Сумма платежа": -10.0,
+            "Валюта платежа": "USD",
+        },
+        {
+            "Дата операции": "01.03.2021 12:00:00",
+            "Сумма операции": -20.0,
+            "Валюта операции": "EUR",
+            "Сумма платежа": -2000.0,
+            "Валюта платежа": "RUB",
+        },
+        {
+            "Дата операции": "01.03.2021 13:00:00",
+            "Сумма операции": -160.89,
+            "Валюта операции": "RUB",
+            "Сумма платежа": -160.89,
+            "Валюта платежа": "RUB",
+        },
+    ]
+
+
+def test_normalize_records(rates_server: str) -> None:
+    table = RateTable()
+    result = normalize_transactions(operations(), table)
+
+    assert len(REQUESTS) == 2
+    assert {request["base"] for request in REQUESTS} == {"USD", "EUR"}
+    usd = next(request for request in REQUESTS if request["base"] == "USD")
+    assert (usd["path"], usd["start_date"], usd["end_date"]) == ("/timeseries", "2021-08-23", "2021-09-05")
+
+    assert result[0]["Сумма операции"] == approx(-8.61 * daily_rate("USD", date(2021, 8, 30)))
+    # 05.09.2021 - воскресенье: берётся курс пятницы
+    assert result[1]["Сумма операции"] == approx(-10.0 * daily_rate("USD", date(2021, 9, 3)))
+    assert result[1]["Сумма платежа"] == result[1]["Сумма операции"]
+    assert result[2]["Сумма операции"] == approx(-20.0 * daily_rate("EUR", date(2021, 3, 1)))
+    assert result[3]["Сумма операции"] == -160.89
+    assert {row["Валюта операции"] for row in result} == {"RUB"}
+    assert operations()[0]["Валюта операции"] == "USD"
+
+    normalize_transactions(operations(), table)
+    assert len(REQUESTS) == 2
+
+
+def test_only_missing_dates_are_requested(rates_server: str) -> None:
+    table = RateTable()
+    normalize_transactions(operations()[:1], table)
+    normalize_transactions(operations(), table)
+    usd = [(request["start_date"], request["end_date"]) for request in REQUESTS if request["base"] == "USD"]
+    assert usd == [("2021-08-23", "2021-08-30"), ("2021-08-31", "2021-09-05")]
+
+
+def test_store_and_frame_match_records(rates_server: str) -> None:
+    table = RateTable()
+    expected = pd.DataFrame(normalize_transactions(operations(), table))
+    frame = normalize_transactions(pd.DataFrame(operations()), table)
+    store = TransactionStore.from_records(operations())
+    date_index = store.date_index
+    normalized = normalize_transactions(store, table)
+
+    assert len(REQUESTS) == 2
+    for name in ("Сумма операции", "Сумма платежа"):
+        assert np.allclose(frame[name], expected[name])
+        assert np.allclose(normalized.column(name), expected[name])
+    assert normalized.unique("Валюта платежа") == ["RUB"]
+    assert normalized.date_index is date_index
+    assert store.unique("Валюта платежа") == ["RUB", "USD"]
+
+
+def test_missing_rates_keep_original(rates_server: str) -> None:
+    rows = operations()
+    rows[0]["Валюта операции"] = "XXX"
+    result = normalize_transactions(rows, RateTable())
+    assert result[0]["Сумма операции"] == -8.61
+    assert result[0]["Валюта операции"] == "XXX"
+    assert result[1]["Валюта операции"] == "RUB"
+
+    converted = to_rub(rows, RateTable(), fetch=False)
+    assert np.isnan(converted["Сумма операции"][:3]).all()
+    assert converted["Сумма операции"][3] == -160.89
+
+
+def test_long_range_is_split(rates_server: str, tmp_path: Path) -> None:
+    rates = fetch_timeseries("CNY", date(2020, 1, 1), date(2021, 6, 30))
+    assert len(REQUESTS) == 2
+    assert REQUESTS[0]["end_date"] == "2020-12-30"
+    assert rates["2021-06-30"] == daily_rate("CNY", date(2021, 6, 30))
+
+    table = RateTable(tmp_path / "fx_rates.json")
+    table.put("CNY", rates, date(2020, 1, 1), date(2021, 6, 30))
+    restored = RateTable(tmp_path / "fx_rates.json")
+    assert restored.rate("CNY", date(2021, 6, 30)) == rates["2021-06-30"]
+    assert restored.missing("CNY", date(2019, 12, 1), date(2021, 7, 2)) == [
+        (date(2019, 12, 1), date(2019, 12, 31)),
+        (date(2021, 7, 1), date(2021, 7, 2)),
+    ]
+
+
+def test_disjoint_ranges_keep_gap(rates_server: str, tmp_path: Path) -> None:
+    table = RateTable(tmp_path / "fx_rates.json")
+    for start, end in ((date(2019, 1, 1), date(2019, 1, 31)), (date(2022, 1, 1), date(2022, 1, 31))):
+        table.put("USD", fetch_timeseries("USD", start, end), start, end)
+    assert table.missing("USD", date(2020, 6, 1), date(2020, 6, 30)) == [(date(2020, 6, 1), date(2020, 6, 30))]
+    assert table.missing("USD", date(2018, 12, 25), date(2022, 2, 2)) == [
+        (date(2018, 12, 25), date(2018, 12, 31)),
+        (date(2019, 2, 1), date(2021, 12, 31)),
+        (date(2022, 2, 1), date(2022, 2, 2)),
+    ]
+    assert RateTable(tmp_path / "fx_rates.json").missing("USD", date(2019, 1, 5), date(2022, 1, 5)) == [
+        (date(2019, 2, 1), date(2021, 12, 31))
+    ]
+
+    # Без запроса недостающего периода курс января 2019 года не подставляется в июнь 2020 года
+    row = {**operations()[0], "Дата операции": "15.06.2020 12:00:00"}
+    assert np.isnan(to_rub([row], table, fetch=False)["Сумма операции"][0])
+    converted = to_rub([row], table)
+    assert converted["Сумма операции"][0] == approx(-8.61 * daily_rate("USD", date(2020, 6, 15)))
+    assert table.missing("USD", date(2020, 6, 8), date(2020, 6, 15)) == []
@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+from pytest import approx, fixture, raises
+
+from src.incremental import TOP_SIZE, IncrementalAggregates, bucket_key
+from src.reports import search_category
+from src.store import TransactionStore
+from src.views import card_info, card_totals, create_operations, top_5_transactions
+
+
+@fixture()
+def records_2021(date_with_data: Any) -> Any:
+    return [record for record in date_with_data if record["Дата операции"][6:10] == "2021"]
+
+
+@fixture
+def statements(tmp_path: Path, records_2021: Any) -> tuple[Path, Path]:
+    # Выписка отсортирована по убыванию даты: старая выписка - без последних 100 операций
+    old_path, new_path = tmp_path / "old.xlsx", tmp_path / "new.xlsx"
+    pd.DataFrame(records_2021[100:]).to_excel(old_path, index=False)
+    pd.DataFrame(records_2021).to_excel(new_path, index=False)
+    return old_path, new_path
+
+
+def test_bucket_key() -> None:
+    assert bucket_key(datetime(2021, 12, 31, 16, 44)) == "2021-12-31"
+    assert bucket_key(datetime(2021, 12, 31)) == "2021-12-31T00"
+
+
+def test_ingest_only_new_rows(statements: tuple[Path, Path], tmp_path: Path, records_2021: Any) -> None:
+    old_path, new_path = statements
+    state_path = tmp_path / "state.json"
+    assert IncrementalAggregates(state_path).ingest(old_path) == len(records_2021) - 100
+
+    aggregates = IncrementalAggregates(state_path)
+    assert aggregates.ingest(new_path) == 100
+    assert aggregates.ingest(new_path) == 0
+    assert aggregates.rows == len(records_2021)
+
+
+def test_answers_match_full_recompute(statements: tuple[Path, Path], records_2021: Any) -> None:
+    aggregates = IncrementalAggregates()
+    aggregates.ingest(statements[0])
+    aggregates.ingest(statements[1])
+    cards = ["*7197", "*4556", "*0000"]
+    for period in ((None, None), ("01.10.2021", "31.12.2021")):
+        expected = card_totals(records_2021, cards, *period)
+        assert aggregates.card_totals(cards, *period) == approx(expected)
+        assert aggregates.top_transactions(*period) == top_5_transactions(list(records_2021), *period)
+    for category in ("Супермаркеты", "Переводы"):
+        expected = search_category(records_2021, category, datetime(2021, 12, 10))
+        assert search_category(aggregates, category, datetime(2021, 12, 10)) == expected
+
+
+def test_missing_card_matches_row_level(
+    statements: tuple[Path, Path], tmp_path: Path, records_2021: Any, same_records: Callable[[list, list], bool]
+) -> None:
+    IncrementalAggregates(tmp_path / "state.json").ingest(statements[1])
+    aggregates = IncrementalAggregates(tmp_path / "state.json")
+    store = TransactionStore.from_records(records_2021)
+    cards = card_info(store)
+    assert pd.isna(cards[-1])
+    assert pd.Series(card_info(aggregates)).equals(pd.Series(cards))
+    market = {"currency_rates": {}, "stock_prices": {}}
+    expected = create_operations("Привет", cards, store, market=market)["cards"]
+    result = create_operations("Привет", card_info(aggregates), aggregates, market=market)["cards"]
+    assert same_records(result, expected)
+
+
+def test_category_total_truncates_to_day(statements: tuple[Path, Path]) -> None:
+    aggregates = IncrementalAggregates()
+    aggregates.ingest(statements[1])
+    midnight = search_category(aggregates, "Супермаркеты", datetime(2021, 12, 10))
+    assert search_category(aggregates, "Супермаркеты", datetime(2021, 12, 10, 12, 30)) == midnight
+
+
+def test_old_state_categories_in_rubles(statements: tuple[Path, Path], tmp_path: Path) -> None:
+    state_path = tmp_path / "state.json"
+    IncrementalAggregates(state_path).ingest(statements[1])
+    expected = IncrementalAggregates(state_path).category_total("Переводы", datetime(2021, 12, 10))
+    state = json.loads(state_path.read_text(encoding="utf-8"))
+    kopecks = state.pop("category_kopecks")
+    state["categories"] = {
+        name: {key: total / 100 for key, total in buckets.items()} for name, buckets in kopecks.items()
+    }
+    state_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    assert IncrementalAggregates(state_path).category_total("Переводы", datetime(2021, 12, 10)) == expected
+
+
+def test_top_larger_than_buckets_is_rejected() -> None:
+    with raises(ValueError):
+        IncrementalAggregates().top_transactions(n=TOP_SIZE + 1)
@@ -0,0 +1,35 @@
+import sys
+import threading
+from typing import Any
+
+from src.lazy import is_loaded, lazy_import
+
+
+def test_lazy_import_defers_execution(monkeypatch: Any) -> None:
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    module = lazy_import("colorsys")
+    assert sys.modules["colorsys"] is module
+    assert not is_loaded("colorsys")
+    assert lazy_import("colorsys") is module
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(module.rgb_to_hsv(1.0, 0.0, 0.0))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [(0.0, 1.0, 1.0)] * 8
+    assert is_loaded("colorsys")
+
+    import colorsys
+
+    assert colorsys is module
+
+
+def test_lazy_import_missing_module() -> None:
+    try:
+        lazy_import("no_such_module_for_tests")
+    except ModuleNotFoundError as e:
+        assert e.name == "no_such_module_for_tests"
+    else:
+        raise AssertionError("ModuleNotFoundError expected")
@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+from pytest import MonkeyPatch, fixture
+
+from src.market import fetch_market_data, fetch_stock_prices, user_currencies, user_stocks
+
+RATES = {"USD": 90.0, "EUR": 100.0, "CNY": 12.5}
+
+
+class RatesHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        base = parse_qs(urlparse(self.path).query)["base"][0]
+        if base == "SLOW":
+            time.sleep(1)
+        body = json.dumps({"rates": {"RUB": RATES.get(base, 1.0)}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@fixture
+def rates_server(monkeypatch: MonkeyPatch) -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RatesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("EXCHANGE_API_URL", url)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_settings_from_env(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("USER_CURRENCIES", "USD, CNY")
+    monkeypatch.setenv("USER_STOCKS", "AAPL")
+    assert user_currencies() == ["USD", "CNY"]
+    assert user_stocks() == ["AAPL"]
+
+
+def test_fetch_market_data(rates_server: str) -> None:
+    with patch("src.market.fetch_stock_prices", return_value={"AAPL": 150.0}):
+        result = fetch_market_data(["USD", "EUR", "CNY"], ["AAPL"])
+    assert result["currency_rates"] == {"USD": 90.0, "EUR": 100.0, "CNY": 12.5}
+    assert result["stock_prices"] == {"AAPL": 150.0}
+
+
+def test_fetch_market_data_deadline(rates_server: str) -> None:
+    start = time.perf_counter()
+    result = fetch_market_data(["USD", "SLOW"], [], deadline=0.3)
+    assert time.perf_counter() - start < 0.9
+    assert result["currency_rates"] == {"USD": 90.0, "SLOW": None}
+
+
+@patch("src.market.yf.download")
+def test_fetch_stock_prices_single_request(mock_download: Any) -> None:
+    columns = pd.MultiIndex.from_product([["AAPL", "TSLA"], ["High", "Low"]])
+    mock_download.return_value = pd.DataFrame([[150.0, 140.0, float("nan"), float("nan")]], columns=columns)
+    assert fetch_stock_prices(["AAPL", "TSLA", "MSFT"]) == {"AAPL": 150.0, "TSLA": 0.0, "MSFT": 0.0}
+    mock_download.assert_called_once()
@@ -0,0 +1,119 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pandas as pd
+from pytest import MonkeyPatch, fixture
+
+from src import memo
+from src.memo import MemoCache, dataset_fingerprint, memoize
+from src.reports import search_category
+from src.services import filter_state
+from src.store import TransactionStore
+from src.views import create_operations, top_5_transactions
+
+MARKET = {"currency_rates": {"USD": 90.0}, "stock_prices": {}}
+
+
+@fixture
+def cache(monkeypatch: MonkeyPatch) -> Iterator[MemoCache]:
+    cache = MemoCache(max_entries=16)
+    monkeypatch.setattr(memo, "_default_cache", cache)
+    yield cache
+
+
+def test_repeated_calls_hit_cache(cache: MemoCache, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    store = TransactionStore.from_frame(statement_frame())
+    first = top_5_transactions(store, "01.12.2021", "31.12.2021")
+    assert top_5_transactions(store, start_date="01.12.2021", end_date="31.12.2021") == first
+    date = datetime(2022, 1, 1)
+    assert search_category(store, "Супермаркеты", date) == search_category(store, "Супермаркеты", date)
+    assert filter_state(store, "Магнит", output=None) == filter_state(store, "магнит", output=None)
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 3
+
+
+def test_hits_return_copies(cache: MemoCache, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    store = TransactionStore.from_frame(statement_frame())
+    filter_state(store, "магнит", output=None).clear()
+    assert len(filter_state(store, "магнит", output=None)) == 1
+    top_5_transactions(store)[0]["amount"] = 0
+    top = top_5_transactions(store)
+    top[0]["amount"] = 0
+    assert top_5_transactions(store)[0]["amount"] == -160.89
+    assert cache.stats()["hits"] == 3
+
+
+def test_default_date_is_not_cached(cache: MemoCache, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    store = TransactionStore.from_frame(statement_frame())
+    for _ in range(3):
+        assert search_category(store, "Супермаркеты")["category"] == "Супермаркеты"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (0, 0, 0)
+
+
+def test_changed_statement_invalidates(cache: MemoCache, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    old = TransactionStore.from_frame(statement_frame())
+    new = TransactionStore.from_frame(statement_frame(amount=-200.0))
+    assert dataset_fingerprint(old) == TransactionStore.from_frame(statement_frame()).fingerprint()
+    assert dataset_fingerprint(old) != dataset_fingerprint(new)
+    date = datetime(2022, 1, 1)
+    assert search_category(old, "Супермаркеты", date)["total"] == 160.89
+    assert search_category(new, "Супермаркеты", date)["total"] == 200.0
+
+
+def test_mutable_data_is_not_cached(cache: MemoCache, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    records = statement_frame().to_dict("records")
+    top_5_transactions(records)
+    top_5_transactions(records)
+    assert dataset_fingerprint(records) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (0, 0, 0)
+
+
+def test_quotes_are_not_cached(cache: MemoCache, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    store = TransactionStore.from_frame(statement_frame())
+    first = create_operations("Привет", ["*7197"], store, market=MARKET)
+    second = create_operations("Привет", ["*7197"], store, market={**MARKET, "currency_rates": {"USD": 95.0}})
+    assert second["cards"] == first["cards"]
+    assert cache.stats()["hits"] == 1
+    assert second["currency_rates"] == [({"currency": "USD", "rate": 95.0},)]
+
+
+def test_disk_tier(tmp_path: Path, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    calls = []
+
+    def total(data: Any, card: str) -> float:
+        calls.append(card)
+        return float(data.column("Сумма операции")[data.equals("Номер карты", card)].sum())
+
+    store = TransactionStore.from_frame(statement_frame())
+    first = memoize(total, cache=MemoCache(path=tmp_path))
+    assert first(store, "*7197") == first(store, card="*7197") == -160.89
+    # Новый процесс: память пуста, запись читается с диска
+    restarted = MemoCache(path=tmp_path)
+    assert memoize(total, cache=restarted)(store, "*7197") == -160.89
+    assert calls == ["*7197"]
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_memory_size_eviction() -> None:
+    cache = MemoCache(max_bytes=3000)
+    for i in range(10):
+        cache.put(f"key{i}", "x" * 1000)
+    cache.put("large", "x" * 5000)
+    assert cache.stats()["bytes"] <= 3000
+    assert cache.lookup("key9") == (True, "x" * 1000)
+    assert cache.lookup("key0") == (False, None)
+    assert cache.lookup("large") == (False, None)
+    assert cache.stats()["evictions"] >= 8
+
+
+def test_disk_size_eviction(tmp_path: Path) -> None:
+    cache = MemoCache(path=tmp_path, max_disk_bytes=3000)
+    for i in range(10):
+        cache.put(f"key{i}", "x" * 1000)
+    assert sum(file_.stat().st_size for file_ in tmp_path.glob("*.pkl")) <= 3000
+    assert (tmp_path / "key9.pkl").exists()
+    assert not (tmp_path / "key0.pkl").exists()
+    assert cache.stats()["disk_evictions"] >= 7
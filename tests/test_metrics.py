@@ -0,0 +1,89 @@
+import os
+from typing import Any
+
+import pytest
+
+from src import metrics, utils
+from src.metrics import MetricsRegistry
+from src.services import filter_state
+from src.views import stock_currency
+
+
+@pytest.fixture(autouse=True)
+def clean_registry() -> Any:
+    metrics.registry.reset()
+    yield
+    metrics.registry.reset()
+
+
+def test_histogram_buckets() -> None:
+    registry = MetricsRegistry(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.01, 0.05, 2.0):
+        registry.observe("work", seconds)
+    histogram = registry.snapshot()["functions"]["work"]
+    assert histogram["count"] == 4
+    assert histogram["sum"] == pytest.approx(2.065)
+    assert histogram["max"] == 2.0
+    assert histogram["buckets"] == {"0.01": 2, "0.1": 3, "+Inf": 4}
+
+
+def test_timed_records_calls_and_errors() -> None:
+    @metrics.timed(name="fails")
+    def fails() -> None:
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        fails()
+    operations = [{"Категория": "Переводы", "Описание": "Перевод"}, {"Категория": "Фастфуд", "Описание": "Бургер"}]
+    filter_state(operations, "перевод", output=None)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["functions"]["fails"]["count"] == 1
+    assert snapshot["functions"]["filter_state"]["count"] == 1
+    assert snapshot["errors"]["function"] == {"fails": 1}
+    assert snapshot["counters"]["rows_scanned"] == {"filter_state": 2}
+    assert snapshot["counters"]["rows_matched"] == {"filter_state": 1}
+
+
+def test_network_timer(monkeypatch: Any) -> None:
+    class Ticker:
+        def __init__(self, stock: str) -> None:
+            pass
+
+        def history(self, period: str) -> Any:
+            raise ConnectionError("offline")
+
+    monkeypatch.setattr("src.views.yf.Ticker", Ticker)
+    with pytest.raises(ConnectionError):
+        stock_currency("AAPL")
+    snapshot = metrics.snapshot()
+    assert snapshot["network"]["yfinance"]["count"] == 1
+    assert snapshot["errors"] == {"function": {"stock_currency": 1}, "network": {"yfinance": 1}}
+
+
+def test_prometheus_format() -> None:
+    metrics.registry.observe('say "hi"', 0.002)
+    metrics.count("bytes_read", 2048, "read_files")
+    text = metrics.to_prometheus()
+    assert "# TYPE bank_function_seconds histogram" in text
+    assert 'bank_function_seconds_bucket{function="say \\"hi\\"",le="0.0025"} 1' in text
+    assert 'bank_function_seconds_bucket{function="say \\"hi\\"",le="+Inf"} 1' in text
+    assert 'bank_function_seconds_count{function="say \\"hi\\""} 1' in text
+    assert 'bank_bytes_read_total{function="read_files"} 2048' in text
+    assert text.endswith("\n")
+
+
+def test_disabled_registry(monkeypatch: Any) -> None:
+    monkeypatch.setattr(metrics.registry, "enabled", False)
+    filter_state([{"Категория": "Переводы", "Описание": "Перевод"}], "перевод", output=None)
+    assert metrics.snapshot()["functions"] == {}
+    assert metrics.snapshot()["counters"]["rows_scanned"] == {}
+
+
+def test_enabled_setting_is_read_on_first_use(monkeypatch: Any) -> None:
+    registry = MetricsRegistry()
+    monkeypatch.setenv("METRICS_ENABLED", "1")
+    # Как будто METRICS_ENABLED=0 задан в файле .env, который читается при первом обращении к настройкам
+    monkeypatch.setattr(utils, "load_config", lambda: os.environ.update(METRICS_ENABLED="0"))
+    assert registry.enabled is False
+    assert MetricsRegistry(enabled=True).enabled is True
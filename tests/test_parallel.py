@@ -0,0 +1,102 @@
+import json
+from datetime import datetime
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pandas as pd
+from pytest import fixture, mark, raises
+
+from src.aggregation import card_totals
+from src.batch import main
+from src.parallel import ShardedStore
+from src.reports import search_categories, search_category
+from src.services import filter_state
+from src.store import TransactionStore
+from src.utils import read_files
+from src.views import card_info, sum_amount_of_card, top_5_transactions
+
+PERIODS = [(None, None), ("01.10.2021", "31.12.2021"), ("01.01.2018", "01.06.2019")]
+
+
+@fixture(scope="module")
+def store() -> Any:
+    return read_files("data/operations.xlsx", output="store")
+
+
+@fixture(scope="module", params=[(1, 3), (2, 5)], ids=["inline", "processes"])
+def sharded(request: Any, store: Any) -> Iterator[ShardedStore]:
+    workers, shards = request.param
+    with ShardedStore(store, workers=workers, shards=shards) as sharded_store:
+        yield sharded_store
+
+
+@mark.parametrize("start_date, end_date", PERIODS)
+def test_views_match_serial(sharded: ShardedStore, store: Any, start_date: Any, end_date: Any) -> None:
+    cards = card_info(store) + ["*0000"]
+    assert card_info(sharded) == card_info(store)
+    assert card_totals(sharded, cards, start_date, end_date) == card_totals(store, cards, start_date, end_date)
+    assert sum_amount_of_card(sharded, "*7197", start_date, end_date) == sum_amount_of_card(
+        store, "*7197", start_date, end_date
+    )
+    assert top_5_transactions(sharded, start_date, end_date) == top_5_transactions(store, start_date, end_date)
+
+
+def test_reports_and_search_match_serial(
+    sharded: ShardedStore, store: Any, same_records: Callable[[list, list], bool]
+) -> None:
+    categories = ["Супермаркеты", "Переводы", "Несуществующая"]
+    dates = list(pd.date_range("2018-01-01", "2022-01-05", freq="90D"))
+    assert search_categories(sharded, categories, dates).equals(search_categories(store, categories, dates))
+    date = datetime(2021, 12, 10)
+    assert search_category(sharded, "Супермаркеты", date) == search_category(store, "Супермаркеты", date)
+    for query in ["Магнит", "ка", "Переводы", "", "Несуществующий"]:
+        assert same_records(filter_state(sharded, query, output=None), filter_state(store, query, output=None))
+
+
+def test_missing_amount_gives_nan() -> None:
+    store = TransactionStore.from_frame(
+        pd.DataFrame(
+            {
+                "Дата операции": ["01.12.2021 10:00:00", "02.12.2021 10:00:00", "03.12.2021 10:00:00"],
+                "Номер карты": ["*7197", "*7197", "*4556"],
+                "Сумма операции": [-5.0, None, -1.5],
+                "Категория": ["Супермаркеты", "Супермаркеты", "Супермаркеты"],
+                "Описание": ["Магнит", "Магнит", "Магнит"],
+            }
+        )
+    )
+    with ShardedStore(store, workers=1, shards=2) as sharded_store:
+        for data in (store, sharded_store):
+            totals = card_totals(data, ["*7197", "*4556"])
+            assert pd.isna(totals[0]) and totals[1] == -1.5
+            assert pd.isna(sum_amount_of_card(data, "*7197"))
+            # В отчёте по категории пропуски не учитываются, как в pandas
+            assert search_category(data, "Супермаркеты", datetime(2021, 12, 10))["total"] == 6.5
+
+
+def test_close_releases_shared_memory(store: Any) -> None:
+    sharded_store = ShardedStore(store, workers=1)
+    names = [block.name for block in sharded_store._blocks]
+    sharded_store.close()
+    for name in names:
+        with raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_batch_shards_match_serial(tmp_path: Path) -> None:
+    source = tmp_path / "statements"
+    source.mkdir()
+    read_files("data/operations.xlsx", output="frame").head(2000).to_excel(source / "client.xlsx", index=False)
+    common = ["--offline", "--workers", "1", "--query", "магнит", "--category", "Супермаркеты"]
+    common += ["--report-date", "01.01.2022", "--time", "31.12.2021 10:00"]
+    main([str(source), "--output-dir", str(tmp_path / "serial"), *common])
+    main([str(source), "--output-dir", str(tmp_path / "sharded"), "--shards", "2", *common])
+    results = {}
+    for run in ("serial", "sharded"):
+        for name in ("views", "services", "reports"):
+            with open(tmp_path / run / "client" / f"{name}.json", encoding="utf-8") as f:
+                results[run, name] = json.load(f)
+    assert results["sharded", "views"] == results["serial", "views"]
+    assert results["sharded", "services"] == results["serial", "services"]
+    assert results["sharded", "reports"] == results["serial", "reports"]
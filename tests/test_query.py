@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import Any
+
+import pandas as pd
+from pytest import approx, fixture
+
+from src.query import Query, sequential_sum
+from src.services import filter_state
+from src.store import TransactionStore
+from src.utils import read_files
+
+
+@fixture(scope="module")
+def records() -> Any:
+    return read_files("data/operations.xlsx")
+
+
+@fixture(scope="module")
+def store() -> Any:
+    return read_files("data/operations.xlsx", output="store")
+
+
+def combined(data: Any) -> Query:
+    return (
+        Query(data)
+        .where("Номер карты", "*7197")
+        .where("Категория", "Супермаркеты")
+        .last_days(30, datetime(2021, 12, 10))
+        .contains("магнит")
+    )
+
+
+def test_combined_query_matches_manual_filter(records: Any, store: Any) -> None:
+    start, end = datetime(2021, 11, 10), datetime(2021, 12, 10)
+    expected = [
+        i
+        for i, row in enumerate(records)
+        if row["Номер карты"] == "*7197"
+        and row["Категория"] == "Супермаркеты"
+        and start <= datetime.strptime(row["Дата операции"], "%d.%m.%Y %H:%M:%S") <= end
+        and isinstance(row["Описание"], str)
+        and "магнит" in row["Описание"].lower()
+    ]
+    assert expected
+    for data in (records, pd.DataFrame(records), store):
+        assert combined(data).rows().tolist() == expected
+        assert combined(data).sum() == approx(sum(records[i]["Сумма операции"] for i in expected))
+
+
+def test_records_projection_and_top(records: Any, store: Any) -> None:
+    query = Query(records).period("01.10.2021", "31.12.2021")
+    assert query.records()[0] is records[query.rows()[0]]
+    top = query.select("Сумма операции", "Категория").top(3)
+    assert [row["Сумма операции"] for row in top] == sorted(
+        (row["Сумма операции"] for row in query.records()), reverse=True
+    )[:3]
+    assert top == Query(store).period("01.10.2021", "31.12.2021").select("Сумма операции", "Категория").top(3)
+
+
+def test_group_sum_and_contains_match_wrappers(records: Any, store: Any) -> None:
+    sums = Query(records).group_sum("Номер карты")
+    assert Query(store).group_sum("Номер карты") == sums
+    assert sums["*7197"] == sequential_sum([row["Сумма операции"] for row in records if row["Номер карты"] == "*7197"])
+    assert Query(records).contains("Магнит").records() == filter_state(records, "Магнит", output=None)
+    assert Query(records).contains("").count() == 0
+
+
+def test_query_is_lazy_and_immutable() -> None:
+    data = [{"Дата операции": "01.01.2022 10:00:00", "Сумма операции": 1.0, "Номер карты": "*1"}]
+    base = Query(data)
+    narrowed = base.where("Номер карты", "*2")
+    assert base.count() == 1
+    assert narrowed.count() == 0
+    assert narrowed.sum() == 0
+    assert Query([]).period("01.01.2022", "02.01.2022").count() == 0
+
+
+def test_plan_uses_indexes() -> None:
+    frame = pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2022 10:00:00", "02.01.2022 10:00:00"],
+            "Сумма операции": [-1.0, -2.0],
+            "Номер карты": ["*1", "*2"],
+            "Категория": ["Еда", "Еда"],
+            "Описание": ["Магнит", "Пятёрочка"],
+        }
+    )
+    store = TransactionStore.from_frame(frame)
+    query = Query(store).period("01.01.2022", "02.01.2022").where("Номер карты", "*1").contains("маг")
+    assert query.explain()[0].endswith("date_index")
+    assert query.explain()[1].endswith("dictionary codes")
+    # Без готового поискового индекса уже суженный набор строк проверяется напрямую
+    assert query.explain()[2].endswith("scan")
+    assert query.rows().tolist() == [0]
+    assert not store.has_search_index()
+    assert Query(store).contains("маг").explain() == ["contains 'маг': search_index"]
+    assert Query(frame).period("01.01.2022", "01.01.2022").explain()[0].endswith("scan 'Дата операции'")
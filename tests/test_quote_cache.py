@@ -0,0 +1,56 @@
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from src.market import fetch_market_data
+from src.quote_cache import FRESH, MISSING, STALE, QuoteCache
+
+
+def test_ttl_and_stats() -> None:
+    cache = QuoteCache(ttl=60, ttls={"rate:USD": 0})
+    cache.put("rate:EUR", 100.0)
+    cache.put("rate:USD", 90.0)
+    assert cache.lookup("rate:EUR") == (100.0, FRESH)
+    assert cache.lookup("rate:USD") == (None, MISSING)
+    assert cache.lookup("rate:CNY") == (None, MISSING)
+    assert cache.stats() == {"hits": 1, "misses": 2, "stale_hits": 0, "refreshes": 0, "evictions": 0, "size": 2}
+
+
+def test_lru_eviction() -> None:
+    cache = QuoteCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.lookup("a")
+    cache.put("c", 3)
+    assert cache.lookup("b") == (None, MISSING)
+    assert cache.lookup("a") == (1, FRESH)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_persistence(tmp_path: Path) -> None:
+    path = tmp_path / "quotes.json"
+    QuoteCache(path=path).put("stock:AAPL", 150.0)
+    restored = QuoteCache(path=path)
+    assert restored.lookup("stock:AAPL") == (150.0, FRESH)
+
+
+def test_stale_while_revalidate() -> None:
+    cache = QuoteCache(ttl=10, stale_while_revalidate=True)
+    cache.put("rate:USD", 90.0, fetched_at=0)
+    loader = MagicMock(return_value=95.0)
+    assert cache.lookup("rate:USD") == (90.0, STALE)
+    assert cache.get("rate:USD", loader) == 90.0
+    cache.wait()
+    loader.assert_called_once()
+    assert cache.lookup("rate:USD") == (95.0, FRESH)
+
+
+@patch("src.market.fetch_stock_prices", return_value={"AAPL": 150.0})
+@patch("src.market.fetch_rate", return_value=90.0)
+def test_market_data_uses_cache(mock_rate: Any, mock_stocks: Any) -> None:
+    cache = QuoteCache()
+    first = fetch_market_data(["USD"], ["AAPL"], cache=cache)
+    second = fetch_market_data(["USD"], ["AAPL"], cache=cache)
+    assert first == second == {"currency_rates": {"USD": 90.0}, "stock_prices": {"AAPL": 150.0}}
+    mock_rate.assert_called_once()
+    mock_stocks.assert_called_once()
@@ -2,9 +2,9 @@ from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
-import pytest
 
-from src.reports import search_category
+from src.reports import search_categories, search_category
+from src.utils import read_files
 
 
 def test_search_category() -> None:
@@ -38,3 +38,42 @@ def test_search_category_empty_result() -> None:
         assert result["category"] == "еда"
         assert result["total"] == 0.0
         assert "amount" not in result
+
+
+def test_search_categories_matches_search_category() -> None:
+    records = read_files("data/operations.xlsx")
+    store = read_files("data/operations.xlsx", output="store")
+    categories = ["Супермаркеты", "Переводы", "Несуществующая"]
+    dates = list(pd.date_range("2018-01-01", "2022-01-05", freq="45D")) + [datetime(2021, 12, 10, 12, 30)]
+    for data in (records, store):
+        report = search_categories(data, categories, dates)
+        assert list(report.columns) == categories
+        assert len(report) == len(dates)
+        for category in categories:
+            for date in dates:
+                expected = search_category(records, category, date)["total"]
+                assert report.loc[date, category] == expected
+
+
+def test_search_category_sums_kopecks() -> None:
+    transactions = pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2022 10:00:00", "02.01.2022 10:00:00", "03.01.2022 10:00:00"],
+            "Сумма операции": [-0.1, -0.2, None],
+            "Категория": ["еда", "еда", "еда"],
+        }
+    )
+    # Сумма с плавающей точкой дала бы 0.30000000000000004
+    assert search_category(transactions, "еда", datetime(2022, 1, 10))["total"] == 0.3
+
+
+def test_search_categories_window() -> None:
+    transactions = pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2022 00:00:00", "15.01.2022 12:00:00", "01.02.2022 00:00:00"],
+            "Сумма операции": [-100.0, -200.0, -300.0],
+            "Категория": ["еда", "еда", "еда"],
+        }
+    )
+    report = search_categories(transactions, ["еда"], [datetime(2022, 1, 31), datetime(2022, 2, 1)], days=30)
+    assert report["еда"].tolist() == [300.0, 500.0]
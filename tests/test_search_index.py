@@ -0,0 +1,33 @@
+from typing import Any
+
+from pytest import mark
+
+from src.search_index import SearchIndex, trigrams
+from src.services import filter_state
+from src.utils import read_files
+
+
+def test_trigrams() -> None:
+    assert trigrams("кафе") == {"каф", "афе"}
+    assert trigrams("ка") == set()
+
+
+def test_search_skips_nan() -> None:
+    index = SearchIndex(["Переводы", float("nan"), "Кафе"], ["Азер Г.", "Перевод", "Кофейня"])
+    assert index.search("пере").tolist() == [0]
+    assert index.search("ко").tolist() == [2]
+    assert index.search("").tolist() == []
+    assert len(index) == 2
+
+
+@mark.parametrize("query", ["Переводы", "магнит", "ка", "а", "пЕрЕв", "Несуществующий"])
+def test_search_matches_filter_state(date_with_data: Any, query: str) -> None:
+    index = SearchIndex.from_records(date_with_data)
+    assert [date_with_data[i] for i in index.search(query)] == filter_state(date_with_data, query)
+
+
+def test_filter_state_store_uses_index(date_with_data: Any) -> None:
+    store = read_files("data/operations.xlsx", output="store")
+    result = filter_state(store, "Переводы")
+    assert len(result) == len(filter_state(date_with_data, "Переводы"))
+    assert store.search_index is store.search_index
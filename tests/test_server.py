@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+import pandas as pd
+from pytest import fixture
+
+from src.server import Service
+
+MARKET = {"currency_rates": {"USD": 90.0}, "stock_prices": {"AAPL": 150.0}}
+COLUMNS = {"Номер карты": ["*7197", "*7197"], "Описание": ["Магнит", None]}
+
+
+@fixture
+def data_dir(tmp_path: Path, statement_frame: Callable[..., pd.DataFrame]) -> Path:
+    statement_frame(columns=COLUMNS).to_excel(tmp_path / "operations.xlsx", index=False)
+    return tmp_path
+
+
+async def get(port: int, *targets: str) -> list[tuple[int, Any]]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    responses = []
+    for target in targets:
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("utf-8"))
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.lower()] = value.strip()
+        body = await reader.readexactly(int(headers["content-length"]))
+        responses.append((status, json.loads(body)))
+    writer.close()
+    return responses
+
+
+def run_service(data_dir: Path, scenario: Any) -> Any:
+    async def main() -> Any:
+        service = Service(data_dir)
+        server = await service.start("127.0.0.1", 0)
+        try:
+            return await scenario(service, server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(main())
+
+
+@patch("src.views.fetch_market_data", return_value=MARKET)
+def test_endpoints(mock_market: Any, data_dir: Path) -> None:
+    async def scenario(service: Service, port: int) -> Any:
+        return await get(
+            port,
+            "/operations?start_date=01.12.2021&end_date=31.12.2021&time=31.12.2021%2010:00",
+            "/search?query=%D0%BC%D0%B0%D0%B3%D0%BD%D0%B8%D1%82",
+            "/reports/category?category=%D0%9F%D0%B5%D1%80%D0%B5%D0%B2%D0%BE%D0%B4%D1%8B&date=01.01.2022",
+            "/unknown",
+            "/search?file=../secret.xlsx&query=a",
+            "/metrics?format=json",
+        )
+
+    operations, search, report, unknown, outside, snapshot = run_service(data_dir, scenario)
+    assert operations[0] == 200
+    assert operations[1]["greeting"] == "Доброе утро!"
+    assert operations[1]["cards"] == [{"last_digits": "*7197", "total_spent": -800.0, "cashback": -8.0}]
+    assert operations[1]["currency_rates"] == [[{"currency": "USD", "rate": 90.0}]]
+    assert search[0] == 200 and [row["Описание"] for row in search[1]] == ["Магнит"]
+    assert report == (200, {"category": "Переводы", "total": 800.0})
+    assert unknown[0] == 404
+    assert outside[0] == 400
+    assert snapshot[0] == 200 and snapshot[1]["functions"]["filter_state"]["count"] >= 1
+
+
+def test_dataset_reloaded_on_change(data_dir: Path, statement_frame: Callable[..., pd.DataFrame]) -> None:
+    async def scenario(service: Service, port: int) -> Any:
+        first = await get(port, "/search?query=magnit", "/reports/category?category=Supermarkets")
+        store = await service.registry.get("operations.xlsx", service.run)
+        assert await service.registry.get("operations.xlsx", service.run) is store
+        statement_frame(amount=-1000.0, columns=COLUMNS).to_excel(data_dir / "operations.xlsx", index=False)
+        os.utime(data_dir / "operations.xlsx", ns=(1, 1))
+        assert await service.registry.get("operations.xlsx", service.run) is not store
+        return first
+
+    first = run_service(data_dir, scenario)
+    assert first == [(200, []), (200, {"category": "Supermarkets", "total": 0.0})]
@@ -1,6 +1,8 @@
 from typing import Any
 from pytest import fixture
-from src.services import filter_state
+from src.aho_corasick import AhoCorasick
+from src.services import filter_state, filter_states
+from src.utils import read_files
 
 
 @fixture
@@ -58,4 +60,36 @@ def test_filter_state(sample_operations: list[dict[str, Any]]) -> None:
     assert len(result) == 0
 
     result = filter_state(sample_operations, "Несуществующий")
-    assert len(result) == 0
\ No newline at end of file
+    assert len(result) == 0
+
+
+def test_filter_state_missing_fields() -> None:
+    operations = [{"Описание": "abc"}, {"Категория": "Tab"}, {"Категория": "Еда"}]
+    assert filter_state(operations, "ab", output=None) == operations[:2]
+    assert filter_states(operations, ["ab"])["ab"] == operations[:2]
+
+
+def test_aho_corasick() -> None:
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert automaton.find("ushers") == {0, 1, 3}
+    assert automaton.find("ahis") == {2}
+    assert automaton.find("xyz") == set()
+
+
+def test_filter_states(sample_operations: list[dict[str, Any]]) -> None:
+    queries = ["Переводы", "северо-западная", "а", "", "Несуществующий"]
+    result = filter_states(sample_operations, queries)
+    assert list(result) == queries
+    for query in queries:
+        assert result[query] == filter_state(sample_operations, query)
+
+
+def test_filter_states_matches_filter_state() -> None:
+    records = read_files("data/operations.xlsx")
+    store = read_files("data/operations.xlsx", output="store")
+    queries = ["Переводы", "магнит", "ка", "Супер", "Несуществующий"]
+    expected = {query: filter_state(records, query) for query in queries}
+    assert filter_states(records, queries) == expected
+    store_result = filter_states(store, queries)
+    for query in queries:
+        assert len(store_result[query]) == len(expected[query])
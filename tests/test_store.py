@@ -0,0 +1,60 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pytest import fixture, raises
+
+from src.services import filter_state
+from src.store import TransactionStore
+from src.utils import read_files
+from src.views import card_info, sum_amount_of_card, top_5_transactions
+
+
+@fixture()
+def store() -> TransactionStore:
+    return read_files("data/operations.xlsx", output="store")
+
+
+def test_store_dictionary_columns(store: TransactionStore) -> None:
+    for name in ("Номер карты", "Статус", "Валюта операции", "Категория"):
+        assert store.is_dictionary(name)
+    codes, values = store.codes("Номер карты")
+    assert codes.dtype == np.int32
+    assert "*7197" in values
+
+
+def test_store_rows_match_records(store: TransactionStore, date_with_data: Any) -> None:
+    assert len(store) == len(date_with_data)
+    assert pd.Series(store[0].to_dict()).equals(pd.Series(date_with_data[0]))
+    assert store[-1]["Сумма операции"] == date_with_data[-1]["Сумма операции"]
+    assert store[0].get("Нет такой колонки", "default") == "default"
+    with raises(IndexError):
+        store[len(store)]
+
+
+def test_store_records_roundtrip() -> None:
+    records = [
+        {"Номер карты": "*7197", "Категория": "Супермаркеты", "Сумма операции": -10.0},
+        {"Номер карты": None, "Категория": "Переводы", "Сумма операции": 5.0},
+    ]
+    store = TransactionStore.from_records(records)
+    restored = store.to_records()
+    assert restored[0] == records[0]
+    assert type(restored[1]["Номер карты"]) is float
+
+
+def test_functions_accept_store(store: TransactionStore, date_with_data: Any) -> None:
+    assert sorted(map(str, card_info(store))) == sorted(map(str, card_info(date_with_data)))
+    assert sum_amount_of_card(store, "*7197", "01.10.2021", "31.12.2021") == sum_amount_of_card(
+        date_with_data, "*7197", "01.10.2021", "31.12.2021"
+    )
+    assert top_5_transactions(store, "01.10.2021", "31.12.2021") == top_5_transactions(
+        date_with_data, "01.10.2021", "31.12.2021"
+    )
+    assert top_5_transactions(store) == top_5_transactions(list(date_with_data))
+
+
+def test_filter_state_store(store: TransactionStore) -> None:
+    result = filter_state(store, "магнит")
+    assert result
+    assert all("магнит" in operation["Описание"].lower() for operation in result)
@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+from pytest import fixture
+
+from src.services import filter_state
+from src.streaming import CardTotals, CategorySums, Search, TopN, iter_batches, run_pipeline
+from src.views import card_info, sum_amount_of_card, top_5_transactions
+
+
+@fixture
+def excel_file(tmp_path: Path, statement_frame: Callable[..., pd.DataFrame]) -> Path:
+    path = tmp_path / "operations.xlsx"
+    statement_frame(rows=3, columns={"Номер карты": ["*7197", None, "*7197"]}).to_excel(path, index=False)
+    return path
+
+
+def test_iter_batches(excel_file: Path) -> None:
+    batches = list(iter_batches(excel_file, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[1].offset == 2
+    assert batches[0].rows[0]["Номер карты"] == "*7197"
+    assert isinstance(batches[0].rows[1]["Номер карты"], float)
+    assert batches[1].dates[0].day == 29
+
+
+def test_run_pipeline_small(excel_file: Path) -> None:
+    cards, categories, top, search = run_pipeline(
+        excel_file, CardTotals(), CategorySums(), TopN(2), Search("маг"), batch_size=2
+    )
+    assert cards == {"*7197": 1339.11}
+    assert categories == {"Супермаркеты": 1339.11, "Переводы": -800.0}
+    assert [operation["amount"] for operation in top] == [1500.0, -160.89]
+    assert [operation["Описание"] for operation in search] == ["Магнит"]
+
+
+def test_run_pipeline_matches_in_memory(date_with_data: Any) -> None:
+    start, end = "01.10.2021", "31.12.2021"
+    cards, top, search = run_pipeline(
+        "data/operations.xlsx", CardTotals(start, end), TopN(5, start, end), Search("Переводы"), batch_size=500
+    )
+    for card in card_info(date_with_data):
+        if isinstance(card, str):
+            assert cards.get(card, 0) == sum_amount_of_card(date_with_data, card, start, end)
+    assert top == top_5_transactions(list(date_with_data), start, end)
+    assert len(search) == len(filter_state(date_with_data, "Переводы"))
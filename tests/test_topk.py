@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+from pytest import fixture, mark
+
+from src.query import top_positions
+from src.topk import grouped_top, top_entry
+from src.utils import read_files
+from src.views import top_5_transactions
+
+
+@fixture(scope="module")
+def records() -> Any:
+    return read_files("data/operations.xlsx")
+
+
+def sorted_top(values: list[float], n: int) -> list[int]:
+    return sorted(range(len(values)), key=lambda i: values[i], reverse=True)[:n]
+
+
+def test_top_positions_matches_stable_sort() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        size = int(rng.integers(0, 40))
+        values = rng.integers(-5, 5, size).astype(float)
+        codes = rng.integers(-1, 4, size)
+        n = int(rng.integers(0, 6))
+        assert top_positions(values, n).tolist() == sorted_top(values.tolist(), n)
+        expected = []
+        for code in sorted(set(codes[codes >= 0].tolist())):
+            rows = [i for i in range(size) if codes[i] == code]
+            expected += [rows[i] for i in sorted_top(values[rows].tolist(), n)]
+        assert top_positions(values, n, codes).tolist() == expected
+
+
+@mark.parametrize("period", [(None, None), ("01.10.2021", "31.12.2021")])
+def test_top_5_does_not_mutate_input(records: Any, period: Any) -> None:
+    data = list(records)
+    result = top_5_transactions(data, *period)
+    assert data == records
+    rows = [row for row in records if not period[0] or _in_period(row, *period)]
+    expected = sorted(rows, key=lambda row: row["Сумма операции"], reverse=True)[:5]
+    assert result == [top_entry(row) for row in expected]
+
+
+def _in_period(row: dict, start: str, end: str) -> bool:
+    date = datetime.strptime(row["Дата операции"], "%d.%m.%Y %H:%M:%S")
+    return datetime.strptime(start, "%d.%m.%Y") <= date <= datetime.strptime(end, "%d.%m.%Y")
+
+
+def test_grouped_top_matches_per_group_sort(records: Any) -> None:
+    store = read_files("data/operations.xlsx", output="store")
+    result = grouped_top(records, 3, ("card", "category", "month", "all"), ("spend", "income", "amount"))
+    assert grouped_top(store, 3, ("card", "category", "month", "all"), ("spend", "income", "amount")) == result
+    assert result["all"]["amount"]["all"] == top_5_transactions(records)[:3]
+
+    spends = [row for row in records if row["Номер карты"] == "*7197" and row["Сумма операции"] < 0]
+    expected = sorted(spends, key=lambda row: -row["Сумма операции"], reverse=True)[:3]
+    assert result["card"]["spend"]["*7197"] == [top_entry(row) for row in expected]
+
+    december = [row for row in records if row["Дата операции"][3:10] == "12.2021" and row["Сумма операции"] > 0]
+    expected = sorted(december, key=lambda row: row["Сумма операции"], reverse=True)[:3]
+    assert result["month"]["income"]["2021-12"] == [top_entry(row) for row in expected]
+    assert all(len(rows) <= 3 for rows in result["category"]["spend"].values())
@@ -0,0 +1,102 @@
+import gzip
+import json
+import logging
+import os
+import subprocess
+import sys
+from logging.handlers import QueueHandler
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.services import filter_state
+from src.utils import SamplingFilter, read_files, setup_logging, summarize, write_data, write_stream
+
+
+def operations(count: int) -> Iterator[dict[str, Any]]:
+    for i in range(count):
+        yield {"Категория": "Переводы", "Описание": f"Перевод {i}", "Сумма операции": -float(i)}
+
+
+def test_write_stream_json_array(tmp_path: Path) -> None:
+    path = tmp_path / "services.json"
+    assert write_stream(str(path), operations(3)) == 3
+    assert read_files(path) == list(operations(3))
+    assert "\n" not in path.read_text(encoding="utf-8")
+
+
+def test_write_stream_ndjson_gzip(tmp_path: Path) -> None:
+    path = tmp_path / "services.ndjson.gz"
+    assert write_stream(str(path), operations(2)) == 2
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == list(operations(2))
+    assert read_files(path) == list(operations(2))
+
+
+def test_write_stream_empty(tmp_path: Path) -> None:
+    path = tmp_path / "empty.json"
+    assert write_stream(str(path), iter([])) == 0
+    assert read_files(path) == []
+
+
+def test_write_data_compact(tmp_path: Path) -> None:
+    path = tmp_path / "views.json"
+    write_data(str(path), {"greeting": "Добрый день!", "cards": []}, compact=True)
+    assert path.read_text(encoding="utf-8") == '{"greeting":"Добрый день!","cards":[]}'
+
+
+def test_filter_state_without_output(tmp_path: Path, monkeypatch: Any) -> None:
+    monkeypatch.chdir(tmp_path)
+    result = filter_state(list(operations(2)), "перевод 1", output=None)
+    assert len(result) == 1
+    assert not (tmp_path / "services.json").exists()
+
+
+def test_filter_state_streams_output(tmp_path: Path) -> None:
+    path = tmp_path / "services.json"
+    result = filter_state(list(operations(3)), "перевод", output=str(path))
+    assert len(result) == 3
+    text = path.read_text(encoding="utf-8")
+    assert "\n" not in text
+    assert json.loads(text) == result
+
+
+def test_start_logging_keeps_worker_lines(tmp_path: Path) -> None:
+    log_file = tmp_path / "logs.log"
+    # Процесс пула дописывает строку до первой записи родителя
+    script = (
+        "from src.utils import setup_logging, start_logging; "
+        f"start_logging(); open({str(log_file)!r}, 'a', encoding='utf-8').write('worker\\n'); "
+        "setup_logging().info('parent')"
+    )
+    env = {**os.environ, "LOG_FILE": str(log_file)}
+    subprocess.run([sys.executable, "-c", script], check=True, env=env, cwd=Path(__file__).parents[1])
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "worker"
+    assert lines[-1].endswith("parent")
+
+
+def test_setup_logging_once() -> None:
+    package = logging.getLogger("src")
+    handlers = list(package.handlers)
+    assert setup_logging() is setup_logging()
+    assert package.handlers == handlers
+    assert sum(isinstance(handler, QueueHandler) for handler in handlers) == 1
+    assert not package.propagate
+
+
+def test_summarize_is_bounded() -> None:
+    result = [{"description": "x" * 1000, "amount": float(i)} for i in range(100_000)]
+    text = str(summarize(result))
+    assert len(text) <= 500
+    assert text.startswith("[{'amount': 0.0")
+    assert str(summarize({"greeting": "Добрый день!"})) == "{'greeting': 'Добрый день!'}"
+
+
+def test_sampling_filter() -> None:
+    def record(level: int) -> logging.LogRecord:
+        return logging.LogRecord("src", level, __file__, 1, "message", None, None)
+
+    drop_all, keep_all = SamplingFilter(0.0), SamplingFilter(1.0)
+    assert not drop_all.filter(record(logging.INFO))
+    assert drop_all.filter(record(logging.WARNING))
+    assert keep_all.filter(record(logging.INFO))
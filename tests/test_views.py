@@ -4,17 +4,11 @@ from unittest import mock
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
-from pytest import fixture, mark
+from pytest import mark
 
-from src.utils import read_files
 from src.views import card_info, currency_rate, send_greeting, stock_currency, sum_amount_of_card, total_cashback
 
 
-@fixture()
-def date_with_data() -> Any:
-    return read_files("data/operations.xlsx")
-
-
 @patch("yfinance.Ticker")
 def test_stock_currency(mock_yfinance: Any) -> None:
     # Создаем объект DataFrame, который будет возвращен моком
@@ -76,5 +70,3 @@ def test_get_currency_rate(mock_get: Any) -> None:
 )
 def test_greeting(hour: str, expected: str) -> None:
     assert send_greeting(hour) == expected
-
-